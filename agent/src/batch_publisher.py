@@ -0,0 +1,102 @@
+import threading
+import time
+
+
+class BatchPublisher:
+    """
+    Groups serialized readings into batched MQTT messages.
+
+    A batch is published once it holds batch_size readings or its oldest
+    reading has waited flush_interval seconds, whichever comes first. The
+    interval is enforced by a timer thread, so a partial batch does not
+    wait for the next reading. on_flush(result, count) is called after
+    every published batch, from whichever thread published it. The
+    envelope is built by the serializer, so batch_size=1 publishes exactly
+    the single-reading payload.
+    """
+
+    def __init__(
+        self,
+        client,
+        topic: str,
+        serializer,
+        batch_size: int = 1,
+        flush_interval: float = None,
+        on_flush=None,
+    ):
+        max_batch_size = getattr(serializer, "max_batch_size", None)
+        if batch_size < 1 or (max_batch_size is not None and batch_size > max_batch_size):
+            raise ValueError(
+                f"batch_size must be between 1 and {max_batch_size or 'unbounded'} "
+                f"for {type(serializer).__name__}, got {batch_size}"
+            )
+        self.client = client
+        self.topic = topic
+        self.serializer = serializer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.lock = threading.Lock()
+        self.timer = None
+        self.pending = []
+        self.first_added = None
+        self.last_payload = None
+        self.last_count = 0
+
+    def add(self, msg):
+        """Queue one serialized reading; return the publish result if a batch was sent"""
+        with self.lock:
+            if not self.pending:
+                self.first_added = time.monotonic()
+                self._start_timer()
+            self.pending.append(msg)
+            if len(self.pending) < self.batch_size and not self._window_elapsed():
+                return None
+            result, count = self._flush(), self.last_count
+        return self._report(result, count)
+
+    def flush(self):
+        with self.lock:
+            result, count = self._flush(), self.last_count
+        return self._report(result, count)
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return None
+        if self.batch_size == 1:
+            payload = self.pending[0]
+        else:
+            payload = self.serializer.dumps_batch(self.pending)
+        self.last_count = len(self.pending)
+        self.last_payload = payload
+        self.pending = []
+        return self.client.publish(self.topic, payload)
+
+    def _start_timer(self):
+        if self.flush_interval is None or self.batch_size == 1:
+            return
+        self.timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _flush_on_timer(self):
+        with self.lock:
+            # A size flush or a later batch may have replaced this timer
+            if self.timer is not threading.current_thread():
+                return
+            result, count = self._flush(), self.last_count
+        self._report(result, count)
+
+    def _report(self, result, count: int):
+        # Outside the lock, on_flush may take its time
+        if result is not None and self.on_flush is not None:
+            self.on_flush(result, count)
+        return result
+
+    def _window_elapsed(self) -> bool:
+        if self.flush_interval is None:
+            return False
+        return time.monotonic() - self.first_added >= self.flush_interval
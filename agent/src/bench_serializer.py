@@ -0,0 +1,44 @@
+"""
+Microbenchmark of the agent message serializers.
+
+Run from agent/src:
+    python bench_serializer.py [number_of_messages]
+"""
+import sys
+import timeit
+
+from main import DATA_FILES
+from sensor_table import SensorTable
+from serializer import MarshmallowSerializer, TemplateSerializer
+from schema.aggregated_data_schema import AggregatedDataSchema
+from utils.monotonic_clock import MonotonicClock
+
+
+def bench(label, func, rows):
+    seconds = timeit.timeit(lambda: [func(row) for row in rows], number=1)
+    per_message = seconds / len(rows) * 1e6
+    print(f"{label:<42} {per_message:8.2f} us/msg  {len(rows) / seconds:10.0f} msg/s")
+    return per_message
+
+
+def main(number=20000):
+    table = SensorTable.from_files(*DATA_FILES)
+    clock = MonotonicClock()
+    indices = [i % len(table) for i in range(number)]
+    data = [table.aggregated(i, clock.now(), 1) for i in indices]
+    rows = [(table.row(i), clock.now(), 1) for i in indices]
+
+    marshmallow = MarshmallowSerializer()
+    template = TemplateSerializer()
+    assert all(marshmallow.dumps(d) == template.dumps(d) for d in data)
+
+    print(f"Serializing {number} AggregatedData messages")
+    baseline = bench("marshmallow, new schema per message", lambda d: AggregatedDataSchema().dumps(d), data)
+    bench("marshmallow, cached schema", marshmallow.dumps, data)
+    fast = bench("template", template.dumps, data)
+    row = bench("template from SensorTable row", lambda r: template.dumps_row(*r), rows)
+    print(f"Speedup vs per-message schema: {baseline / fast:.1f}x (dataclass), {baseline / row:.1f}x (row)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -8,6 +8,21 @@ def try_parse(type, value: str):
         return None
 
 
+def parse_bool(value: str) -> bool:
+    return (value or "").lower() in ("1", "true", "yes")
+
+
+def parse_thresholds(value: str) -> dict:
+    """Parse "sensor=threshold,..." into a dict, ignoring malformed entries"""
+    thresholds = {}
+    for item in (value or "").split(","):
+        name, _, threshold = item.partition("=")
+        threshold = try_parse(float, threshold)
+        if name.strip() and threshold is not None:
+            thresholds[name.strip()] = threshold
+    return thresholds
+
+
 USER_ID = 1
 # MQTT config
 MQTT_BROKER_HOST = os.environ.get("MQTT_BROKER_HOST") or "localhost"
@@ -16,3 +31,43 @@ MQTT_TOPIC = os.environ.get("MQTT_TOPIC") or "agent"
 
 # Delay for sending data to mqtt in seconds
 DELAY = try_parse(float, os.environ.get("DELAY")) or 1
+# What to do with missed sends when publishing falls behind: "catch_up" or "skip"
+SCHEDULER_POLICY = os.environ.get("SCHEDULER_POLICY") or "catch_up"
+# Do not print every sent message, only periodic rate/jitter statistics
+QUIET = parse_bool(os.environ.get("QUIET"))
+# Seconds between publish statistics reports
+STATS_INTERVAL = try_parse(float, os.environ.get("STATS_INTERVAL")) or 60
+
+# How the datasource replays the CSV files:
+#   "eager"     - parse every file up front (default)
+#   "streaming" - pull rows from the files on demand, constant memory
+#   "loop"      - parse once and replay the dataset forever
+#   "columnar"  - load into a NumPy table and read it once
+#   "columnar_loop" - load into a NumPy table and replay it forever
+DATASOURCE_MODE = os.environ.get("DATASOURCE_MODE") or "eager"
+# Fixed timestamp increment in seconds for looping replay; real elapsed time if unset
+TIMESTAMP_STEP = try_parse(float, os.environ.get("TIMESTAMP_STEP"))
+
+# Message serializer: "template" (fast path) or "marshmallow"; both
+# produce identical JSON. "binary" uses the compact struct wire format
+# understood by the edge
+SERIALIZER = os.environ.get("SERIALIZER") or "template"
+
+# Readings per MQTT message and the longest time in seconds a reading may
+# wait for its batch; BATCH_SIZE=1 publishes every reading on its own
+BATCH_SIZE = try_parse(int, os.environ.get("BATCH_SIZE")) or 1
+BATCH_FLUSH_INTERVAL = try_parse(float, os.environ.get("BATCH_FLUSH_INTERVAL"))
+
+# Dead-band compression: only sensors that changed beyond their dead-band
+# are sent, with a full keyframe every KEYFRAME_INTERVAL messages. Always
+# JSON, so it takes precedence over SERIALIZER. DEADBAND_THRESHOLDS
+# overrides per-sensor dead-bands, e.g. "temperature=0.2,air_quality=2"
+DEADBAND = parse_bool(os.environ.get("DEADBAND"))
+DEADBAND_THRESHOLDS = parse_thresholds(os.environ.get("DEADBAND_THRESHOLDS"))
+KEYFRAME_INTERVAL = try_parse(int, os.environ.get("KEYFRAME_INTERVAL")) or 10
+
+# Fleet simulation: number of virtual agents sharing one process, their
+# aggregate send rate in messages per second and the first user_id
+FLEET_SIZE = try_parse(int, os.environ.get("FLEET_SIZE")) or 1
+FLEET_RATE = try_parse(float, os.environ.get("FLEET_RATE")) or FLEET_SIZE / DELAY
+FLEET_USER_ID_START = try_parse(int, os.environ.get("FLEET_USER_ID_START")) or USER_ID
@@ -11,9 +11,8 @@ Approach: analyze real distributions -> generate synthetic data
 with the same statistical characteristics.
 """
 
+import argparse
 import csv
-import random
-import math
 import numpy as np
 from pathlib import Path
 
@@ -44,7 +43,103 @@ TRAFFIC_LIGHT_PARAMS = {
     "phase_distribution": {"green": 0.45, "yellow": 0.05, "red": 0.50},
 }
 
-def generate_traffic_light(n=200):
+TRAFFIC_LIGHT_STATES = ("green", "yellow", "red")
+
+
+def load_route_gps():
+    """GPS points of the existing route as (latitude, longitude) columns"""
+    gps_path = Path(__file__).parent / "gps.csv"
+    if not gps_path.exists():
+        return np.empty(0), np.empty(0)
+    with open(gps_path, "r") as f:
+        reader = csv.DictReader(f)
+        points = [(float(row["latitude"]), float(row["longitude"])) for row in reader]
+    points = np.array(points, dtype=np.float64).reshape(-1, 2)
+    return points[:, 0], points[:, 1]
+
+
+def traffic_light_phases(n, start_state="green", rng=None):
+    """
+    Phase sequence of the Markov chain as an array of indices into
+    TRAFFIC_LIGHT_STATES. Deterministic chains (the real green -> yellow ->
+    red cycle) are pure index arithmetic; otherwise every step is sampled
+    from precomputed uniforms.
+    """
+    rng = rng or np.random.default_rng()
+    codes = {state: i for i, state in enumerate(TRAFFIC_LIGHT_STATES)}
+    transitions = np.zeros((len(codes), len(codes)))
+    for state, targets in TRAFFIC_LIGHT_PARAMS["transitions"].items():
+        for target, weight in targets.items():
+            transitions[codes[state], codes[target]] = weight
+    transitions /= transitions.sum(axis=1, keepdims=True)
+
+    start = codes[start_state]
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    if np.all(transitions.max(axis=1) == 1.0):
+        successor = transitions.argmax(axis=1)
+        # Walk the cycle once, then tile it
+        cycle = [start]
+        while len(cycle) < len(codes) and successor[cycle[-1]] != start:
+            cycle.append(successor[cycle[-1]])
+        if successor[cycle[-1]] == start:
+            return np.resize(np.array(cycle, dtype=np.intp), n)
+
+    cumulative = transitions.cumsum(axis=1)
+    uniforms = rng.random(n)
+    phases = np.empty(n, dtype=np.intp)
+    phases[0] = state = start
+    for i in range(1, n):
+        state = int(np.searchsorted(cumulative[state], uniforms[i], side="right"))
+        phases[i] = min(state, len(codes) - 1)
+    return phases
+
+
+def traffic_light_columns(n, offset=0, start_state="green", rng=None, route=None):
+    """
+    Vectorized traffic light generation.
+
+    Returns a dict of column arrays for rows offset..offset + n. Rows inside
+    the route are bound to its GPS points, the rest are scattered around Kyiv.
+    """
+    rng = rng or np.random.default_rng()
+    route_lat, route_lon = route if route is not None else load_route_gps()
+
+    phases = traffic_light_phases(n, start_state, rng)
+    params = [TRAFFIC_LIGHT_PARAMS[state] for state in TRAFFIC_LIGHT_STATES]
+    mean = np.array([p["mean_duration"] for p in params])[phases]
+    std = np.array([p["std_duration"] for p in params])[phases]
+    low = np.array([p["min"] for p in params])[phases]
+    high = np.array([p["max"] for p in params])[phases]
+    duration = np.clip(rng.normal(mean, std), low, high).astype(np.int64)
+
+    index = np.arange(offset, offset + n)
+    on_route = index < len(route_lat)
+    lat = 50.45 + rng.normal(0, 0.005, n)
+    lon = 30.52 + rng.normal(0, 0.005, n)
+    lat[on_route] = route_lat[index[on_route]]
+    lon[on_route] = route_lon[index[on_route]]
+
+    return {
+        "state": np.array(TRAFFIC_LIGHT_STATES)[phases],
+        "duration": duration,
+        "latitude": np.round(lat, 6),
+        "longitude": np.round(lon, 6),
+    }
+
+
+def next_traffic_light_state(last_state, rng=None):
+    """State following last_state, used to continue the chain across chunks"""
+    phases = traffic_light_phases(2, last_state, rng)
+    return TRAFFIC_LIGHT_STATES[phases[1]]
+
+
+def columns_to_rows(columns):
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[name].tolist() for name in names))]
+
+
+def generate_traffic_light(n=200, rng=None):
     """
     Generate synthetic traffic light data.
 
@@ -53,48 +148,7 @@ def generate_traffic_light(n=200):
     - Normal distribution for each phase duration
     - GPS coordinates from existing gps.csv (route binding)
     """
-    # Load GPS from existing route
-    gps_data = []
-    gps_path = Path(__file__).parent / "gps.csv"
-    if gps_path.exists():
-        with open(gps_path, "r") as f:
-            reader = csv.DictReader(f)
-            gps_data = [(float(row["latitude"]), float(row["longitude"])) for row in reader]
-
-    states = []
-    current_state = "green"
-
-    for i in range(n):
-        # Duration from normal distribution (parameters from real dataset)
-        params = TRAFFIC_LIGHT_PARAMS[current_state]
-        duration = int(np.clip(
-            np.random.normal(params["mean_duration"], params["std_duration"]),
-            params["min"],
-            params["max"]
-        ))
-
-        # GPS — from route or generate around Kyiv
-        if gps_data and i < len(gps_data):
-            lat, lon = gps_data[i]
-        else:
-            lat = 50.45 + random.gauss(0, 0.005)
-            lon = 30.52 + random.gauss(0, 0.005)
-
-        states.append({
-            "state": current_state,
-            "duration": duration,
-            "latitude": round(lat, 6),
-            "longitude": round(lon, 6),
-        })
-
-        # Transition by Markov chain
-        transitions = TRAFFIC_LIGHT_PARAMS["transitions"][current_state]
-        current_state = random.choices(
-            list(transitions.keys()),
-            weights=list(transitions.values())
-        )[0]
-
-    return states
+    return columns_to_rows(traffic_light_columns(n, rng=rng))
 
 
 # ============================================================
@@ -124,21 +178,13 @@ AIR_QUALITY_PARAMS = {
     "correlation_pm25_co2": 0.45,
 }
 
-def generate_air_quality(n=200):
+def air_quality_columns(n, rng=None):
     """
-    Generate synthetic air quality data.
-
-    Based on: Beijing Multi-Site Air Quality Dataset (Kaggle)
-    Scaled to European values (EEA).
-
-    Preserves:
-    - Realistic distributions (log-normal for PM, normal for CO2)
-    - Correlation PM2.5 <-> PM10 (r=0.87)
-    - Correlation PM2.5 <-> CO2 (r=0.45)
-    - Temporal pattern: pollution higher in morning/evening hours
+    Vectorized air quality generation: one Cholesky matmul over an (n, 3)
+    matrix of independent N(0,1) samples. Returns a dict of column arrays.
     """
+    rng = rng or np.random.default_rng()
     params = AIR_QUALITY_PARAMS
-    data = []
 
     # Generate correlated data via Cholesky decomposition
     # [PM2.5, PM10, CO2] with correlation matrix
@@ -149,65 +195,144 @@ def generate_air_quality(n=200):
     ])
 
     L = np.linalg.cholesky(corr_matrix)
+    correlated = rng.standard_normal((n, 3)) @ L.T
+
+    # Scale to real parameters
+    names = ("pm25", "pm10", "co2")
+    mean = np.array([params[name]["mean"] for name in names])
+    std = np.array([params[name]["std"] for name in names])
+    low = np.array([params[name]["min"] for name in names])
+    high = np.array([params[name]["max"] for name in names])
+    values = np.clip(mean + correlated * std, low, high)
 
-    for i in range(n):
-        # Generate 3 independent N(0,1)
-        z = np.random.randn(3)
-        # Apply correlations
-        correlated = L @ z
-
-        # Scale to real parameters
-        pm25 = np.clip(
-            params["pm25"]["mean"] + correlated[0] * params["pm25"]["std"],
-            params["pm25"]["min"],
-            params["pm25"]["max"]
-        )
-        pm10 = np.clip(
-            params["pm10"]["mean"] + correlated[1] * params["pm10"]["std"],
-            params["pm10"]["min"],
-            params["pm10"]["max"]
-        )
-        co2 = np.clip(
-            params["co2"]["mean"] + correlated[2] * params["co2"]["std"],
-            params["co2"]["min"],
-            params["co2"]["max"]
-        )
-
-        # PM10 always >= PM2.5 (physical constraint)
-        pm10 = max(pm10, pm25 * 1.2)
-
-        data.append({
-            "pm25": round(pm25, 1),
-            "pm10": round(pm10, 1),
-            "co2": round(co2, 1),
-        })
-
-    return data
+    # PM10 always >= PM2.5 (physical constraint)
+    values[:, 1] = np.maximum(values[:, 1], values[:, 0] * 1.2)
+
+    values = np.round(values, 1)
+    return {name: values[:, i] for i, name in enumerate(names)}
+
+
+def generate_air_quality(n=200, rng=None):
+    """
+    Generate synthetic air quality data.
+
+    Based on: Beijing Multi-Site Air Quality Dataset (Kaggle)
+    Scaled to European values (EEA).
+
+    Preserves:
+    - Realistic distributions (log-normal for PM, normal for CO2)
+    - Correlation PM2.5 <-> PM10 (r=0.87)
+    - Correlation PM2.5 <-> CO2 (r=0.45)
+    - Temporal pattern: pollution higher in morning/evening hours
+    """
+    return columns_to_rows(air_quality_columns(n, rng))
 
 
 # ============================================================
-# WRITE TO CSV
+# WRITE TO CSV / PARQUET
 # ============================================================
+# Datasets are produced chunk by chunk, so files larger than RAM can be
+# written. Parquet needs pyarrow, which is only required for that format.
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+class CsvChunkWriter:
+    def __init__(self, filepath, fieldnames):
+        self.file = open(filepath, "w", newline="")
+        self.fieldnames = fieldnames
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(fieldnames)
+
+    def write(self, columns):
+        self.writer.writerows(zip(*(columns[name].tolist() for name in self.fieldnames)))
+
+    def close(self):
+        self.file.close()
 
-def write_traffic_light_csv(filename="traffic_light.csv", n=200):
-    data = generate_traffic_light(n)
+
+class ParquetChunkWriter:
+    def __init__(self, filepath, fieldnames):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Writing Parquet requires pyarrow (pip install pyarrow)")
+        self.pa = pyarrow
+        self.filepath = filepath
+        self.fieldnames = fieldnames
+        self.writer = None
+
+    def write(self, columns):
+        table = self.pa.table({name: columns[name] for name in self.fieldnames})
+        if self.writer is None:
+            self.writer = self.pa.parquet.ParquetWriter(self.filepath, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+CHUNK_WRITERS = {"csv": CsvChunkWriter, "parquet": ParquetChunkWriter}
+
+
+def write_chunks(filepath, fieldnames, chunks, file_format="csv"):
+    writer = CHUNK_WRITERS[file_format](filepath, fieldnames)
+    try:
+        for columns in chunks:
+            writer.write(columns)
+    finally:
+        writer.close()
+
+
+def chunk_sizes(n, chunk_size):
+    for offset in range(0, n, chunk_size):
+        yield offset, min(chunk_size, n - offset)
+
+
+def traffic_light_chunks(n, chunk_size=DEFAULT_CHUNK_SIZE, rng=None):
+    rng = rng or np.random.default_rng()
+    route = load_route_gps()
+    state = "green"
+    for offset, size in chunk_sizes(n, chunk_size):
+        columns = traffic_light_columns(size, offset, state, rng, route)
+        state = next_traffic_light_state(columns["state"][-1], rng)
+        yield columns
+
+
+def air_quality_chunks(n, chunk_size=DEFAULT_CHUNK_SIZE, rng=None):
+    rng = rng or np.random.default_rng()
+    for _, size in chunk_sizes(n, chunk_size):
+        yield air_quality_columns(size, rng)
+
+
+def write_traffic_light_csv(filename="traffic_light.csv", n=200, chunk_size=DEFAULT_CHUNK_SIZE,
+                            file_format="csv", rng=None):
     filepath = Path(__file__).parent / filename
-    with open(filepath, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["state", "duration", "latitude", "longitude"])
-        writer.writeheader()
-        writer.writerows(data)
+    write_chunks(filepath, ["state", "duration", "latitude", "longitude"],
+                 traffic_light_chunks(n, chunk_size, rng), file_format)
     print(f"Generated {n} traffic light records -> {filepath}")
 
-def write_air_quality_csv(filename="air_quality.csv", n=200):
-    data = generate_air_quality(n)
+
+def write_air_quality_csv(filename="air_quality.csv", n=200, chunk_size=DEFAULT_CHUNK_SIZE,
+                          file_format="csv", rng=None):
     filepath = Path(__file__).parent / filename
-    with open(filepath, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["pm25", "pm10", "co2"])
-        writer.writeheader()
-        writer.writerows(data)
+    write_chunks(filepath, ["pm25", "pm10", "co2"],
+                 air_quality_chunks(n, chunk_size, rng), file_format)
     print(f"Generated {n} air quality records -> {filepath}")
 
+
 if __name__ == "__main__":
-    write_traffic_light_csv()
-    write_air_quality_csv()
+    parser = argparse.ArgumentParser(description="Generate synthetic sensor datasets")
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--format", choices=sorted(CHUNK_WRITERS), default="csv")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    extension = "csv" if args.format == "csv" else "parquet"
+    write_traffic_light_csv(f"traffic_light.{extension}", args.rows, args.chunk_size, args.format, rng)
+    write_air_quality_csv(f"air_quality.{extension}", args.rows, args.chunk_size, args.format, rng)
     print("Done! Synthetic data generated based on open datasets.")
@@ -0,0 +1,89 @@
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from domain.aggregated_data import AggregatedData
+from file_datasource import unflatten
+from schema.aggregated_data_schema import AggregatedDataSchema
+from serializer import dumps_json_batch
+
+# Sensor groups of AggregatedData that can be left out of a delta message
+SENSOR_GROUPS = (
+    "accelerometer",
+    "gps",
+    "parking",
+    "rain",
+    "traffic_light",
+    "air_quality",
+    "temperature",
+)
+
+# Sensors with a small dead-band: slow drifting values are only resent
+# once they moved by more than this much
+DEFAULT_THRESHOLDS = {
+    "rain": 0.01,
+    "air_quality": 1.0,
+    "temperature": 0.1,
+}
+
+
+def changed(old, new, threshold: float) -> bool:
+    """True if any leaf value moved by more than threshold (strings: any change)"""
+    if isinstance(new, dict):
+        return any(changed(old.get(key), value, threshold) for key, value in new.items())
+    if isinstance(new, (int, float)) and isinstance(old, (int, float)):
+        return abs(new - old) > threshold
+    return new != old
+
+
+class DeadbandSerializer:
+    """
+    Per-sensor dead-band / delta compression stage.
+
+    Every keyframe_interval-th message of a user is a keyframe: the normal
+    full JSON payload. In between, a message is a delta marked with
+    "delta": true that carries user_id, timestamp and only the sensor groups
+    that moved beyond their dead-band since they were last sent. The edge
+    rebuilds full records from the last keyframe plus the deltas.
+    """
+
+    def __init__(self, thresholds: dict = None, keyframe_interval: int = 10, max_users: int = 10000):
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.keyframe_interval = keyframe_interval
+        self.max_users = max_users
+        self.schema = AggregatedDataSchema()
+        # user_id -> (last sent values, messages since keyframe)
+        self.users = OrderedDict()
+
+    def dumps(self, data: AggregatedData) -> str:
+        return json.dumps(self.filter(self.schema.dump(data)))
+
+    def dumps_row(self, row: tuple, timestamp: datetime, user_id: int) -> str:
+        return self.dumps(unflatten(row, timestamp, user_id))
+
+    def dumps_batch(self, messages: list) -> str:
+        return dumps_json_batch(messages)
+
+    def filter(self, message: dict) -> dict:
+        """Return the full message or its delta against what was last sent"""
+        user_id = message["user_id"]
+        state = self.users.get(user_id)
+        if state is None or state[1] >= self.keyframe_interval:
+            self._remember(user_id, dict(message), 1)
+            return message
+
+        last_sent, count = state
+        self.users.move_to_end(user_id)
+        delta = {"delta": True, "user_id": user_id, "timestamp": message["timestamp"]}
+        for group in SENSOR_GROUPS:
+            if changed(last_sent[group], message[group], self.thresholds.get(group, 0)):
+                delta[group] = message[group]
+                last_sent[group] = message[group]
+        self.users[user_id] = (last_sent, count + 1)
+        return delta
+
+    def _remember(self, user_id, last_sent: dict, count: int):
+        self.users[user_id] = (last_sent, count)
+        self.users.move_to_end(user_id)
+        if len(self.users) > self.max_users:
+            self.users.popitem(last=False)
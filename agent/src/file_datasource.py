@@ -1,5 +1,6 @@
 from csv import DictReader
 from datetime import datetime
+from itertools import chain, repeat
 from domain.accelerometer import Accelerometer
 from domain.gps import Gps
 from domain.aggregated_data import AggregatedData
@@ -7,9 +8,58 @@ from domain.parking import Parking
 from domain.rain import Rain
 from domain.traffic_light import TrafficLight
 from domain.air_quality import AirQuality
+from utils.infinite_repetitive_range import InfiniteRepetitiveRange
+from utils.monotonic_clock import MonotonicClock
 import config
 
 
+def parse_accelerometer(row) -> Accelerometer:
+    return Accelerometer(int(row["x"]), int(row["y"]), int(row["z"]))
+
+
+def parse_gps(row) -> Gps:
+    return Gps(float(row["latitude"]), float(row["longitude"]))
+
+
+def parse_parking(row) -> Parking:
+    return Parking(int(row["empty_count"]), Gps(float(row["latitude"]), float(row["longitude"])))
+
+
+def parse_rain(row) -> Rain:
+    return Rain(float(row["intensity"]))
+
+
+def parse_temperature(row) -> float:
+    return float(row["temperature"])
+
+
+def parse_traffic_light(row) -> TrafficLight:
+    return TrafficLight(
+        row["state"],
+        int(row["duration"]),
+        Gps(float(row["latitude"]), float(row["longitude"]))
+    )
+
+
+def parse_air_quality(row) -> AirQuality:
+    return AirQuality(float(row["pm25"]), float(row["pm10"]), float(row["co2"]))
+
+
+def aggregate(accel, gps, parking, rain, traffic_light, air_quality, temp) -> AggregatedData:
+    """Combine one row of every sensor, padding missing sensors with defaults"""
+    return AggregatedData(
+        accel,
+        gps if gps is not None else Gps(0.0, 0.0),
+        parking if parking is not None else Parking(0, Gps(0.0, 0.0)),
+        rain if rain is not None else Rain(0),
+        traffic_light if traffic_light is not None else TrafficLight("red", 0, Gps(0.0, 0.0)),
+        air_quality if air_quality is not None else AirQuality(0.0, 0.0, 0.0),
+        temp,
+        datetime.now(),
+        config.USER_ID,
+    )
+
+
 class FileDatasource:
     def __init__(
         self,
@@ -20,6 +70,7 @@ class FileDatasource:
         temp_filename: str,
         traffic_light_filename: str,
         air_quality_filename: str,
+        streaming: bool = False,
     ) -> None:
         self.accelerometer_filename = accelerometer_filename
         self.gps_filename = gps_filename
@@ -28,6 +79,9 @@ class FileDatasource:
         self.temp_filename = temp_filename
         self.traffic_light_filename = traffic_light_filename
         self.air_quality_filename = air_quality_filename
+        # Streaming mode pulls rows from the files on demand instead of
+        # materializing every sensor reading up front
+        self.streaming = streaming
         self.accel_file = None
         self.gps_file = None
         self.parking_file = None
@@ -38,14 +92,19 @@ class FileDatasource:
         self.agr_data = None
 
     def read(self) -> AggregatedData:
-        try:
-            data = self.agr_data.pop(0)
-            data.timestamp = datetime.now()
-            return data
-        except IndexError:
+        data = next(self.agr_data, None)
+        if data is None:
             return AggregatedData.default()
+        data.timestamp = datetime.now()
+        return data
 
     def startReading(self):
+        agr_data = self._open_rows()
+        self.agr_data = agr_data if self.streaming else iter(list(agr_data))
+        print("Successfully opened files")
+
+    def _open_rows(self):
+        """Open the sensor files and return a lazy iterator of AggregatedData"""
         self.accel_file = open(self.accelerometer_filename, "r")
         self.gps_file = open(self.gps_filename, "r")
         self.parking_file = open(self.parking_filename, "r")
@@ -62,69 +121,20 @@ class FileDatasource:
         traffic_light_reader = DictReader(self.traffic_light_file, delimiter=",")
         air_quality_reader = DictReader(self.air_quality_file, delimiter=",")
 
-
-        accel_data = [
-            Accelerometer(int(row["x"]), int(row["y"]), int(row["z"]))
-            for row in accel_reader
-        ]
-
-        gps_data = [
-            Gps(float(row["latitude"]), float(row["longitude"]))
-            for row in gps_reader
-        ]
-
-        parking_data = [
-            Parking(int(row["empty_count"]), Gps(float(row["latitude"]), float(row["longitude"])))
-            for row in parking_reader
-        ]
-
-        rain_data = [
-            Rain(float(row["intensity"]))
-            for row in rain_reader
-        ]
-
-        temp_data = [
-            float(row["temperature"])
-            for row in temp_header
-        ]
-
-        traffic_light_data = [
-            TrafficLight(
-                row["state"],
-                int(row["duration"]),
-                Gps(float(row["latitude"]), float(row["longitude"]))
-            )
-            for row in traffic_light_reader
-        ]
-
-        air_quality_data = [
-            AirQuality(float(row["pm25"]), float(row["pm10"]), float(row["co2"]))
-            for row in air_quality_reader
-        ]
-
-        self.agr_data = [
-            AggregatedData(
-                accel,
-                gps if gps is not None else Gps(0.0, 0.0),
-                parking if parking is not None else Parking(0, Gps(0.0, 0.0)),
-                rain if rain is not None else Rain(0),
-                traffic_light if traffic_light is not None else TrafficLight("red", 0, Gps(0.0, 0.0)),
-                air_quality if air_quality is not None else AirQuality(0.0, 0.0, 0.0),
-                temp,
-                datetime.now(),
-                config.USER_ID,
-            )
+        # The accelerometer drives the replay; shorter sensor files are
+        # padded with None and replaced by defaults in aggregate()
+        return (
+            aggregate(accel, gps, parking, rain, traffic_light, air_quality, temp)
             for accel, gps, parking, rain, traffic_light, air_quality, temp in zip(
-                accel_data,
-                gps_data + [None] * (len(accel_data) - len(gps_data)),
-                parking_data + [None] * (len(accel_data) - len(parking_data)),
-                rain_data + [None] * (len(accel_data) - len(rain_data)),
-                traffic_light_data + [None] * (len(accel_data) - len(traffic_light_data)),
-                air_quality_data + [None] * (len(accel_data) - len(air_quality_data)),
-                temp_data + [None] * (len(accel_data) - len(temp_data)),
+                map(parse_accelerometer, accel_reader),
+                chain(map(parse_gps, gps_reader), repeat(None)),
+                chain(map(parse_parking, parking_reader), repeat(None)),
+                chain(map(parse_rain, rain_reader), repeat(None)),
+                chain(map(parse_traffic_light, traffic_light_reader), repeat(None)),
+                chain(map(parse_air_quality, air_quality_reader), repeat(None)),
+                chain(map(parse_temperature, temp_header), repeat(None)),
             )
-        ]
-        print("Successfully opened files")
+        )
 
     def stopReading(self):
         if self.accel_file:
@@ -148,3 +158,84 @@ class FileDatasource:
         if self.air_quality_file:
             print("Closing file...", self.air_quality_file.name)
             self.air_quality_file.close()
+
+
+def flatten(data: AggregatedData) -> tuple:
+    """Pack one reading into a flat tuple of primitives"""
+    return (
+        data.accelerometer.x,
+        data.accelerometer.y,
+        data.accelerometer.z,
+        data.gps.longitude,
+        data.gps.latitude,
+        data.parking.empty_count,
+        data.parking.gps.longitude,
+        data.parking.gps.latitude,
+        data.rain.intensity,
+        data.traffic_light.state,
+        data.traffic_light.duration,
+        data.traffic_light.gps.longitude,
+        data.traffic_light.gps.latitude,
+        data.air_quality.pm25,
+        data.air_quality.pm10,
+        data.air_quality.co2,
+        data.temperature,
+    )
+
+
+def unflatten(row: tuple, timestamp: datetime, user_id: int) -> AggregatedData:
+    """Inverse of flatten()"""
+    (
+        x, y, z,
+        gps_longitude, gps_latitude,
+        empty_count, parking_longitude, parking_latitude,
+        intensity,
+        state, duration, traffic_light_longitude, traffic_light_latitude,
+        pm25, pm10, co2,
+        temperature,
+    ) = row
+    return AggregatedData(
+        Accelerometer(x, y, z),
+        Gps(gps_longitude, gps_latitude),
+        Parking(empty_count, Gps(parking_longitude, parking_latitude)),
+        Rain(intensity),
+        TrafficLight(state, duration, Gps(traffic_light_longitude, traffic_light_latitude)),
+        AirQuality(pm25, pm10, co2),
+        temperature,
+        timestamp,
+        user_id,
+    )
+
+
+class LoopingFileDatasource(FileDatasource):
+    """
+    Replays the sensor files forever.
+
+    The files are parsed once into a table of flat tuples and closed; read()
+    then cycles over precomputed indices, so the dataset never runs out and
+    is never reopened. Timestamps come from a MonotonicClock and keep
+    increasing across loops.
+    """
+
+    def __init__(self, *filenames: str, timestamp_step: float = None, start_index: int = 0) -> None:
+        super().__init__(*filenames)
+        self.timestamp_step = timestamp_step
+        self.start_index = start_index
+        self.rows = None
+        self.indices = None
+        self.clock = None
+
+    def read(self) -> AggregatedData:
+        index = next(self.indices, None)
+        if index is None:
+            return AggregatedData.default()
+        return unflatten(self.rows[index], self.clock.now(), config.USER_ID)
+
+    def startReading(self):
+        self.rows = [flatten(data) for data in self._open_rows()]
+        self.stopReading()
+        self.indices = InfiniteRepetitiveRange.infinite_repetitive_range(
+            len(self.rows), self.start_index
+        )
+        self.clock = MonotonicClock(self.timestamp_step)
+        print(f"Loaded {len(self.rows)} rows for looping replay")
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+from sensor_table import SensorTable
+from serializer import TemplateSerializer
+from batch_publisher import BatchPublisher
+from utils.infinite_repetitive_range import InfiniteRepetitiveRange
+from utils.monotonic_clock import MonotonicClock
+
+
+class VirtualAgent:
+    """One simulated vehicle replaying the shared table from its own offset"""
+
+    def __init__(self, user_id: int, table: SensorTable, offset: int, timestamp_step: float = None):
+        self.user_id = user_id
+        self.table = table
+        self.indices = InfiniteRepetitiveRange.infinite_repetitive_range(len(table), offset)
+        self.clock = MonotonicClock(timestamp_step)
+
+    def read(self):
+        return self.table.aggregated(next(self.indices), self.clock.now(), self.user_id)
+
+    def payload(self, serializer) -> str:
+        """Serialize the next row straight from the table"""
+        return serializer.dumps_row(self.table.row(next(self.indices)), self.clock.now(), self.user_id)
+
+
+class FleetSimulator:
+    """
+    Load generator that simulates many agents from a single process.
+
+    Every virtual agent is an asyncio task with its own user_id and offset
+    into one shared SensorTable. Agents send every size / rate seconds and
+    their start times are staggered, so the fleet as a whole publishes
+    `rate` readings per second evenly spread over time. With batch_size > 1
+    readings from all agents are grouped into shared batched messages.
+    """
+
+    def __init__(
+        self,
+        client,
+        topic: str,
+        table: SensorTable,
+        size: int,
+        rate: float,
+        user_id_start: int = 1,
+        timestamp_step: float = None,
+        report_interval: float = 10,
+        serializer=None,
+        batch_size: int = 1,
+        flush_interval: float = None,
+    ):
+        self.client = client
+        self.topic = topic
+        self.rate = rate
+        self.period = size / rate
+        self.report_interval = report_interval
+        self.serializer = serializer or TemplateSerializer()
+        # Counts every published batch, partial ones are flushed from the publisher's timer thread
+        self.publisher = BatchPublisher(
+            client, topic, self.serializer, batch_size, flush_interval, on_flush=self._count_flushed
+        )
+        self.count_lock = threading.Lock()
+        self.agents = [
+            VirtualAgent(
+                user_id_start + i,
+                table,
+                i * len(table) // size,
+                timestamp_step,
+            )
+            for i in range(size)
+        ]
+        self.sent = 0
+        self.failed = 0
+
+    async def run(self, duration: float = None):
+        """Run the fleet for duration seconds, or forever if None"""
+        start = asyncio.get_running_loop().time()
+        tasks = [
+            asyncio.create_task(self._run_agent(agent, start + i / self.rate))
+            for i, agent in enumerate(self.agents)
+        ]
+        reporter = asyncio.create_task(self._report())
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            for task in tasks + [reporter]:
+                task.cancel()
+            await asyncio.gather(*tasks, reporter, return_exceptions=True)
+            self.publisher.flush()
+
+    async def _run_agent(self, agent: VirtualAgent, first_deadline: float):
+        loop = asyncio.get_running_loop()
+        deadline = first_deadline
+        while True:
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.publish(agent)
+            deadline += self.period
+
+    def publish(self, agent: VirtualAgent):
+        self.publisher.add(agent.payload(self.serializer))
+
+    def _count_flushed(self, result, count: int):
+        with self.count_lock:
+            if result[0] == 0:
+                self.sent += count
+            else:
+                self.failed += count
+
+    async def _report(self):
+        last_sent, last_time = 0, time.monotonic()
+        while True:
+            await asyncio.sleep(self.report_interval)
+            now = time.monotonic()
+            rate = (self.sent - last_sent) / (now - last_time)
+            print(
+                f"Fleet of {len(self.agents)} agents: {rate:.1f} msg/s "
+                f"(target {self.rate:.1f}), sent {self.sent}, failed {self.failed}"
+            )
+            last_sent, last_time = self.sent, now
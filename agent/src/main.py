@@ -1,8 +1,13 @@
 from paho.mqtt import client as mqtt_client
+import asyncio
 import time
-from schema.aggregated_data_schema import AggregatedDataSchema
-from file_datasource import FileDatasource
-from utils.infinite_repetitive_range import InfiniteRepetitiveRange
+from serializer import create_serializer
+from batch_publisher import BatchPublisher
+from deadband_filter import DeadbandSerializer
+from utils.scheduler import DeadlineScheduler
+from file_datasource import FileDatasource, LoopingFileDatasource
+from sensor_table import ColumnarFileDatasource, SensorTable
+from fleet import FleetSimulator
 import config
 
 
@@ -24,33 +29,106 @@ def connect_mqtt(broker, port):
     return client
 
 
-def publish(client, topic, datasource, delay):
+def publish(
+    client,
+    topic,
+    datasource,
+    delay,
+    serializer,
+    batch_size=1,
+    flush_interval=None,
+    policy="catch_up",
+    quiet=False,
+    stats_interval=60,
+):
     datasource.startReading()
-    while True:
-        time.sleep(delay)
-        data = datasource.read()
-        msg = AggregatedDataSchema().dumps(data)
-        result = client.publish(topic, msg)
+
+    def report(result, count):
         status = result[0]
-        if status == 0:
-            pass
-            print(f"Send `{msg}` to topic `{topic}`")
-        else:
+        if status != 0:
             print(f"Failed to send message to topic {topic}")
+        elif not quiet:
+            print(f"Send `{publisher.last_payload}` to topic `{topic}`")
+
+    # Also called for partial batches the publisher's timer flushes after flush_interval
+    publisher = BatchPublisher(client, topic, serializer, batch_size, flush_interval, on_flush=report)
+    scheduler = DeadlineScheduler(delay, policy)
+    next_report = time.monotonic() + stats_interval
+    while True:
+        scheduler.wait()
+        data = datasource.read()
+        msg = serializer.dumps(data)
+        publisher.add(msg)
+        now = time.monotonic()
+        if now >= next_report:
+            print(f"Publish scheduler: {scheduler.stats.summary(now)}")
+            next_report = now + stats_interval
+
+
+DATA_FILES = (
+    "data/accelerometer.csv",
+    "data/gps.csv",
+    "data/parking.csv",
+    "data/rain.csv",
+    "data/temp.csv",
+    "data/traffic_light.csv",
+    "data/air_quality.csv",
+)
+
+
+def create_datasource(mode):
+    if mode in ("columnar", "columnar_loop"):
+        return ColumnarFileDatasource(
+            *DATA_FILES, loop=mode == "columnar_loop", timestamp_step=config.TIMESTAMP_STEP
+        )
+    if mode == "loop":
+        return LoopingFileDatasource(*DATA_FILES, timestamp_step=config.TIMESTAMP_STEP)
+    return FileDatasource(*DATA_FILES, streaming=mode == "streaming")
+
+
+def build_serializer():
+    if config.DEADBAND:
+        return DeadbandSerializer(config.DEADBAND_THRESHOLDS, config.KEYFRAME_INTERVAL)
+    return create_serializer(config.SERIALIZER)
+
+
+def run_fleet(client):
+    table = SensorTable.from_files(*DATA_FILES)
+    simulator = FleetSimulator(
+        client,
+        config.MQTT_TOPIC,
+        table,
+        serializer=build_serializer(),
+        size=config.FLEET_SIZE,
+        rate=config.FLEET_RATE,
+        user_id_start=config.FLEET_USER_ID_START,
+        timestamp_step=config.TIMESTAMP_STEP,
+        batch_size=config.BATCH_SIZE,
+        flush_interval=config.BATCH_FLUSH_INTERVAL,
+    )
+    print(f"Simulating {config.FLEET_SIZE} agents at {config.FLEET_RATE} msg/s")
+    asyncio.run(simulator.run())
 
 
 def run():
     client = connect_mqtt(config.MQTT_BROKER_HOST, config.MQTT_BROKER_PORT)
-    datasource = FileDatasource(
-        "data/accelerometer.csv",
-        "data/gps.csv",
-        "data/parking.csv",
-        "data/rain.csv",
-        "data/temp.csv",
-        "data/traffic_light.csv",
-        "data/air_quality.csv",
+    if config.FLEET_SIZE > 1:
+        run_fleet(client)
+        return
+    datasource = create_datasource(config.DATASOURCE_MODE)
+    serializer = build_serializer()
+    publish(
+        client,
+        config.MQTT_TOPIC,
+        datasource,
+        config.DELAY,
+        serializer,
+        config.BATCH_SIZE,
+        config.BATCH_FLUSH_INTERVAL,
+        config.SCHEDULER_POLICY,
+        config.QUIET,
+        config.STATS_INTERVAL,
     )
-    publish(client, config.MQTT_TOPIC, datasource, config.DELAY)
 
 
 if __name__ == "__main__":
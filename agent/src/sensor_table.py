@@ -0,0 +1,161 @@
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+from domain.aggregated_data import AggregatedData
+from file_datasource import LoopingFileDatasource, unflatten
+from utils.infinite_repetitive_range import InfiniteRepetitiveRange
+from utils.monotonic_clock import MonotonicClock
+import config
+
+# One record per accelerometer reading, fields in the order of flatten().
+# The traffic light state is stored as a code into SensorTable.states.
+ROW_DTYPE = np.dtype([
+    ("x", np.int32),
+    ("y", np.int32),
+    ("z", np.int32),
+    ("gps_longitude", np.float64),
+    ("gps_latitude", np.float64),
+    ("empty_count", np.int32),
+    ("parking_longitude", np.float64),
+    ("parking_latitude", np.float64),
+    ("intensity", np.float64),
+    ("traffic_light_state", np.uint8),
+    ("traffic_light_duration", np.int32),
+    ("traffic_light_longitude", np.float64),
+    ("traffic_light_latitude", np.float64),
+    ("pm25", np.float64),
+    ("pm10", np.float64),
+    ("co2", np.float64),
+    ("temperature", np.float64),
+])
+
+STATE_FIELD = ROW_DTYPE.names.index("traffic_light_state")
+TEMPERATURE_FIELD = ROW_DTYPE.names.index("temperature")
+
+
+def load_columns(filename: str, names, dtype) -> np.ndarray:
+    """Load the named CSV columns into a (rows, len(names)) array"""
+    with open(filename, "r") as f:
+        header = f.readline().strip().split(",")
+        usecols = [header.index(name) for name in names]
+        with warnings.catch_warnings():
+            # Header-only files are valid and simply produce zero rows
+            warnings.simplefilter("ignore", UserWarning)
+            return np.loadtxt(f, delimiter=",", usecols=usecols, dtype=dtype, ndmin=2)
+
+
+class SensorTable:
+    """
+    Columnar, NumPy-backed copy of the replay data.
+
+    All sensor files are loaded into a single structured array padded to the
+    accelerometer length, the same way FileDatasource pads shorter files.
+    Python objects are only built for the row being sent.
+    """
+
+    def __init__(self, rows: np.ndarray, states: tuple):
+        self.rows = rows
+        self.states = states
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def from_files(
+        cls,
+        accelerometer_filename: str,
+        gps_filename: str,
+        parking_filename: str,
+        rain_filename: str,
+        temp_filename: str,
+        traffic_light_filename: str,
+        air_quality_filename: str,
+    ) -> "SensorTable":
+        accel = load_columns(accelerometer_filename, ("x", "y", "z"), np.int64)
+        rows = np.zeros(len(accel), dtype=ROW_DTYPE)
+        rows["x"], rows["y"], rows["z"] = accel.T
+
+        def fill(fields, columns):
+            count = min(len(rows), len(columns))
+            for field, column in zip(fields, columns[:count].T):
+                rows[field][:count] = column
+
+        fill(("gps_longitude", "gps_latitude"),
+             load_columns(gps_filename, ("latitude", "longitude"), np.float64))
+        fill(("empty_count",),
+             load_columns(parking_filename, ("empty_count",), np.int64))
+        fill(("parking_longitude", "parking_latitude"),
+             load_columns(parking_filename, ("latitude", "longitude"), np.float64))
+        fill(("intensity",),
+             load_columns(rain_filename, ("intensity",), np.float64))
+        fill(("traffic_light_duration", "traffic_light_longitude", "traffic_light_latitude"),
+             load_columns(traffic_light_filename, ("duration", "latitude", "longitude"), np.float64))
+        fill(("pm25", "pm10", "co2"),
+             load_columns(air_quality_filename, ("pm25", "pm10", "co2"), np.float64))
+
+        # Missing temperatures are None in FileDatasource; NaN marks them here
+        rows["temperature"] = np.nan
+        fill(("temperature",),
+             load_columns(temp_filename, ("temperature",), np.float64))
+
+        # Padded rows default to "red", matching FileDatasource
+        state_column = load_columns(traffic_light_filename, ("state",), str)[:, 0]
+        states, codes = np.unique(np.append(state_column, "red"), return_inverse=True)
+        codes = codes.reshape(-1)
+        red = codes[-1]
+        rows["traffic_light_state"] = red
+        fill(("traffic_light_state",), codes[:-1, None])
+
+        return cls(rows, tuple(states.tolist()))
+
+    def row(self, index: int) -> tuple:
+        """Row as the flat tuple of Python values produced by flatten()"""
+        row = list(self.rows[index].item())
+        row[STATE_FIELD] = self.states[row[STATE_FIELD]]
+        if row[TEMPERATURE_FIELD] != row[TEMPERATURE_FIELD]:
+            row[TEMPERATURE_FIELD] = None
+        return tuple(row)
+
+    def aggregated(self, index: int, timestamp: datetime, user_id: int) -> AggregatedData:
+        return unflatten(self.row(index), timestamp, user_id)
+
+
+class ColumnarFileDatasource(LoopingFileDatasource):
+    """
+    Datasource backed by a SensorTable instead of per-row Python objects.
+
+    With loop=True the table is replayed forever like LoopingFileDatasource,
+    otherwise it is read once and then falls back to AggregatedData.default().
+    """
+
+    def __init__(self, *filenames: str, loop: bool = False, timestamp_step: float = None, start_index: int = 0) -> None:
+        super().__init__(*filenames, timestamp_step=timestamp_step, start_index=start_index)
+        self.loop = loop
+        self.table = None
+
+    def read(self) -> AggregatedData:
+        index = next(self.indices, None)
+        if index is None:
+            return AggregatedData.default()
+        return self.table.aggregated(index, self.clock.now(), config.USER_ID)
+
+    def startReading(self):
+        self.table = SensorTable.from_files(
+            self.accelerometer_filename,
+            self.gps_filename,
+            self.parking_filename,
+            self.rain_filename,
+            self.temp_filename,
+            self.traffic_light_filename,
+            self.air_quality_filename,
+        )
+        if self.loop:
+            self.indices = InfiniteRepetitiveRange.infinite_repetitive_range(
+                len(self.table), self.start_index
+            )
+        else:
+            self.indices = iter(range(self.start_index, len(self.table)))
+        self.clock = MonotonicClock(self.timestamp_step)
+        print(f"Loaded {len(self.table)} rows into columnar table")
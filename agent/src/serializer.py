@@ -0,0 +1,202 @@
+import struct
+from datetime import datetime, timedelta, timezone
+from json.encoder import encode_basestring_ascii
+
+from domain.aggregated_data import AggregatedData
+from file_datasource import flatten, unflatten
+from schema.aggregated_data_schema import AggregatedDataSchema
+
+
+class MarshmallowSerializer:
+    """Reference serializer going through AggregatedDataSchema"""
+
+    def __init__(self):
+        self.schema = AggregatedDataSchema()
+
+    def dumps(self, data: AggregatedData) -> str:
+        return self.schema.dumps(data)
+
+    def dumps_row(self, row: tuple, timestamp: datetime, user_id: int) -> str:
+        return self.dumps(unflatten(row, timestamp, user_id))
+
+    def dumps_batch(self, messages: list) -> str:
+        return dumps_json_batch(messages)
+
+
+# AggregatedDataSchema output with every value replaced by a placeholder.
+# Field order and the ", " / ": " separators match json.dumps defaults,
+# which is what marshmallow uses to render the dumped dict.
+TEMPLATE = (
+    '{"accelerometer": {"x": %s, "y": %s, "z": %s}, '
+    '"gps": {"longitude": %s, "latitude": %s}, '
+    '"parking": {"empty_count": %s, "gps": {"longitude": %s, "latitude": %s}}, '
+    '"rain": {"intensity": %s}, '
+    '"traffic_light": {"state": %s, "duration": %s, "gps": {"longitude": %s, "latitude": %s}}, '
+    '"air_quality": {"pm25": %s, "pm10": %s, "co2": %s}, '
+    '"temperature": %s, "timestamp": %s, "user_id": %s}'
+)
+
+INFINITY = float("inf")
+
+
+def format_int(value) -> str:
+    """fields.Int"""
+    if value is None:
+        return "null"
+    return int.__repr__(int(value))
+
+
+def format_float(value) -> str:
+    """fields.Float and fields.Number, rendered like json.dumps"""
+    if value is None:
+        return "null"
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value == INFINITY:
+        return "Infinity"
+    if value == -INFINITY:
+        return "-Infinity"
+    return float.__repr__(value)
+
+
+def format_str(value) -> str:
+    """fields.Str"""
+    if value is None:
+        return "null"
+    return encode_basestring_ascii(str(value))
+
+
+def format_datetime(value) -> str:
+    """fields.DateTime("iso")"""
+    if value is None:
+        return "null"
+    return encode_basestring_ascii(value.isoformat())
+
+
+def dumps_json_batch(messages: list) -> str:
+    """Wrap serialized readings into a JSON array, as json.dumps would"""
+    return "[" + ", ".join(messages) + "]"
+
+
+class TemplateSerializer:
+    """
+    Fast path for the fixed AggregatedData shape.
+
+    Values are coerced the same way the marshmallow fields do and spliced
+    into a prebuilt JSON template, producing byte-identical output without
+    building a schema or an intermediate dict per message.
+    """
+
+    def __init__(self):
+        # Traffic light states repeat constantly; cache their JSON form
+        self._states = {}
+
+    def dumps(self, data: AggregatedData) -> str:
+        return self.dumps_row(flatten(data), data.timestamp, data.user_id)
+
+    def dumps_row(self, row: tuple, timestamp: datetime, user_id: int) -> str:
+        (
+            x, y, z,
+            gps_longitude, gps_latitude,
+            empty_count, parking_longitude, parking_latitude,
+            intensity,
+            state, duration, traffic_light_longitude, traffic_light_latitude,
+            pm25, pm10, co2,
+            temperature,
+        ) = row
+        state_json = self._states.get(state)
+        if state_json is None:
+            state_json = self._states[state] = format_str(state)
+        return TEMPLATE % (
+            format_int(x), format_int(y), format_int(z),
+            format_float(gps_longitude), format_float(gps_latitude),
+            format_float(empty_count), format_float(parking_longitude), format_float(parking_latitude),
+            format_float(intensity),
+            state_json, format_int(duration),
+            format_float(traffic_light_longitude), format_float(traffic_light_latitude),
+            format_float(pm25), format_float(pm10), format_float(co2),
+            format_float(temperature), format_datetime(timestamp), format_int(user_id),
+        )
+
+    def dumps_batch(self, messages: list) -> str:
+        return dumps_json_batch(messages)
+
+
+# Compact binary wire format, version 1. JSON payloads always start with
+# "{" or "[", so the first byte tells the edge which format it received.
+#   header: version (uint8), number of records (uint16)
+#   record: user_id, timestamp (microseconds since the epoch, UTC),
+#           accelerometer x, y, z, gps, parking empty_count and gps,
+#           rain intensity, traffic light state code, duration and gps,
+#           air quality pm25, pm10, co2, temperature (NaN when missing)
+# All values are little-endian; the layout must match the edge decoder.
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<BH")
+BINARY_RECORD = struct.Struct("<iqiiiddiddd" "Bidd" "dddd")
+TRAFFIC_LIGHT_STATES = ("red", "yellow", "green")
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_microseconds(timestamp: datetime) -> int:
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - EPOCH) // MICROSECOND
+
+
+class BinarySerializer:
+    """
+    Fixed struct layout for the AggregatedData shape, about a quarter of
+    the size of the JSON payload. Batches share a single header.
+    """
+
+    state_codes = {state: code for code, state in enumerate(TRAFFIC_LIGHT_STATES)}
+    # The record count in BINARY_HEADER is a uint16
+    max_batch_size = 0xFFFF
+
+    def dumps(self, data: AggregatedData) -> bytes:
+        return self.dumps_row(flatten(data), data.timestamp, data.user_id)
+
+    def dumps_row(self, row: tuple, timestamp: datetime, user_id: int) -> bytes:
+        (
+            x, y, z,
+            gps_longitude, gps_latitude,
+            empty_count, parking_longitude, parking_latitude,
+            intensity,
+            state, duration, traffic_light_longitude, traffic_light_latitude,
+            pm25, pm10, co2,
+            temperature,
+        ) = row
+        try:
+            state_code = self.state_codes[state]
+        except KeyError:
+            raise ValueError(f"Traffic light state {state!r} has no binary encoding")
+        return BINARY_HEADER.pack(BINARY_VERSION, 1) + BINARY_RECORD.pack(
+            int(user_id), to_epoch_microseconds(timestamp),
+            int(x), int(y), int(z),
+            gps_longitude, gps_latitude,
+            int(empty_count), parking_longitude, parking_latitude,
+            intensity,
+            state_code, int(duration), traffic_light_longitude, traffic_light_latitude,
+            pm25, pm10, co2,
+            float("nan") if temperature is None else temperature,
+        )
+
+    def dumps_batch(self, messages: list) -> bytes:
+        records = [message[BINARY_HEADER.size:] for message in messages]
+        return BINARY_HEADER.pack(BINARY_VERSION, len(records)) + b"".join(records)
+
+
+SERIALIZERS = {
+    "marshmallow": MarshmallowSerializer,
+    "template": TemplateSerializer,
+    "binary": BinarySerializer,
+}
+
+
+def create_serializer(name: str):
+    try:
+        return SERIALIZERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown serializer {name!r}, expected one of {sorted(SERIALIZERS)}")
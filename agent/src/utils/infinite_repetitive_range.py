@@ -1,6 +1,11 @@
 class InfiniteRepetitiveRange:
     @staticmethod
-    def infinite_repetitive_range(n):
+    def infinite_repetitive_range(n, start=0):
+        """Yield 0..n-1 forever, beginning at index start"""
+        if n <= 0:
+            return
+        for i in range(start % n, n):
+            yield i
         while True:
             for i in range(n):
                 yield i
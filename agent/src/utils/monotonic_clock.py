@@ -0,0 +1,27 @@
+import time
+from datetime import datetime, timedelta
+
+
+class MonotonicClock:
+    """
+    Timestamp source for replayed data that never goes backwards.
+
+    With step=None timestamps follow real elapsed time, anchored at the wall
+    clock when the clock was created but advanced by time.monotonic(), so
+    NTP adjustments cannot reorder readings. With a step in seconds every
+    call advances the clock by exactly that amount, which gives
+    reproducible timestamps independent of the publish rate.
+    """
+
+    def __init__(self, step: float = None, start: datetime = None):
+        self.step = step
+        self.start = start or datetime.now()
+        self._start_monotonic = time.monotonic()
+        self._ticks = 0
+
+    def now(self) -> datetime:
+        if self.step is None:
+            return self.start + timedelta(seconds=time.monotonic() - self._start_monotonic)
+        timestamp = self.start + timedelta(seconds=self._ticks * self.step)
+        self._ticks += 1
+        return timestamp
@@ -0,0 +1,80 @@
+import math
+import time
+
+
+class SchedulerStats:
+    """Send rate and jitter (lateness of each tick behind its deadline)"""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.ticks = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def record(self, lateness: float):
+        # Welford's online mean/variance
+        self.ticks += 1
+        delta = lateness - self._mean
+        self._mean += delta / self.ticks
+        self._m2 += delta * (lateness - self._mean)
+        self.max_lateness = max(self.max_lateness, lateness)
+
+    @property
+    def mean_lateness(self) -> float:
+        return self._mean
+
+    @property
+    def jitter(self) -> float:
+        """Standard deviation of the lateness"""
+        return math.sqrt(self._m2 / self.ticks) if self.ticks else 0.0
+
+    def rate(self, now: float) -> float:
+        elapsed = now - self.start
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+    def summary(self, now: float) -> str:
+        return (
+            f"{self.ticks} ticks at {self.rate(now):.2f}/s, "
+            f"lateness mean {self.mean_lateness * 1000:.2f} ms, "
+            f"max {self.max_lateness * 1000:.2f} ms, "
+            f"jitter {self.jitter * 1000:.2f} ms, skipped {self.skipped}"
+        )
+
+
+class DeadlineScheduler:
+    """
+    Fires at an exact rate using absolute deadlines.
+
+    Each deadline is start + n * period, so the time spent between wait()
+    calls does not accumulate as drift. When the caller falls more than a
+    period behind, the policy decides what happens to the missed ticks:
+      "catch_up" - fire them back to back until on schedule again
+      "skip"     - drop them and continue with the next future deadline
+    """
+
+    POLICIES = ("catch_up", "skip")
+
+    def __init__(self, period: float, policy: str = "catch_up", clock=time.monotonic, sleep=time.sleep):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown scheduler policy {policy!r}, expected one of {self.POLICIES}")
+        self.period = period
+        self.policy = policy
+        self.clock = clock
+        self.sleep = sleep
+        self.next_deadline = clock() + period
+        self.stats = SchedulerStats(clock())
+
+    def wait(self):
+        """Block until the next deadline"""
+        now = self.clock()
+        if self.policy == "skip" and now - self.next_deadline >= self.period:
+            missed = int((now - self.next_deadline) // self.period)
+            self.stats.skipped += missed
+            self.next_deadline += missed * self.period
+        if now < self.next_deadline:
+            self.sleep(self.next_deadline - now)
+            now = self.clock()
+        self.stats.record(max(0.0, now - self.next_deadline))
+        self.next_deadline += self.period
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+from functools import partial
+
+from app.usecases.async_hub_forwarder import AsyncHubForwarder
+from app.usecases.processing_pipeline import AgentPayloadHandler
+
+
+class FlowControlQueue(asyncio.Queue):
+    """
+    Message queue for aiomqtt that never discards messages.
+
+    aiomqtt drops incoming messages once a bounded queue is full, so this
+    queue is unbounded for aiomqtt and calls pause() instead once
+    high_water messages are waiting, and resume() when it drained to half
+    of that.
+    """
+
+    def __init__(self, high_water: int, pause, resume, maxsize: int = 0):
+        super().__init__(maxsize)
+        self.high_water = high_water
+        self.low_water = high_water // 2
+        self.pause = pause
+        self.resume = resume
+        self.paused = False
+
+    def _put(self, item):
+        super()._put(item)
+        if not self.paused and self.qsize() >= self.high_water:
+            self.paused = True
+            self.pause()
+
+    def _get(self):
+        item = super()._get()
+        if self.paused and self.qsize() <= self.low_water:
+            self.paused = False
+            self.resume()
+        return item
+
+
+class AgentAsyncMQTTAdapter:
+    """
+    Asyncio counterpart of AgentMQTTAdapter built on aiomqtt.
+
+    Messages are handled one at a time on the event loop, so per-user state
+    sees them in arrival order; only the hub requests run concurrently
+    through the AsyncHubForwarder. Once queue_size received messages wait
+    in memory, the client stops reading the broker socket until half of
+    them were processed, so TCP flow control holds back the broker instead
+    of messages being dropped. A pause longer than the MQTT keepalive ends
+    the connection, as the ping responses are not read either.
+
+    When the broker connection fails or drops, run() connects and
+    subscribes again after reconnect_interval seconds, doubling the wait
+    up to max_reconnect_interval while the broker stays unreachable.
+    """
+
+    def __init__(
+        self,
+        broker_host,
+        broker_port,
+        topic,
+        forwarder: AsyncHubForwarder,
+        handler: AgentPayloadHandler = None,
+        queue_size: int = 1000,
+        reconnect_interval: float = 1,
+        max_reconnect_interval: float = 60,
+    ):
+        try:
+            import aiomqtt
+        except ImportError:
+            raise ImportError("The asyncio edge runtime requires aiomqtt (pip install aiomqtt)")
+        self.aiomqtt = aiomqtt
+        self.broker_host = broker_host
+        self.broker_port = broker_port
+        self.topic = topic
+        self.forwarder = forwarder
+        self.handler = handler or AgentPayloadHandler()
+        self.queue_size = queue_size
+        self.reconnect_interval = reconnect_interval
+        self.max_reconnect_interval = max_reconnect_interval
+        # Metrics
+        self.pauses = 0
+        self.reconnects = 0
+        self.connected = False
+
+    async def run(self, stop: asyncio.Event):
+        """Receive and process agent messages until stop is set"""
+        delay = self.reconnect_interval
+        try:
+            while not stop.is_set():
+                try:
+                    await self.receive(stop)
+                    return
+                except self.aiomqtt.MqttError as e:
+                    if self.connected:
+                        # The connection worked, start over with a short wait
+                        delay = self.reconnect_interval
+                        self.connected = False
+                    logging.warning("MQTT connection failed or lost: %s, reconnecting in %s s", e, delay)
+                self.reconnects += 1
+                try:
+                    await asyncio.wait_for(stop.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, self.max_reconnect_interval)
+        finally:
+            await self.forwarder.submit(self.handler.flush())
+            await self.forwarder.drain()
+
+    async def receive(self, stop: asyncio.Event):
+        """
+        One broker connection: returns once stop is set, raises MqttError
+        if the connection fails or drops before that.
+        """
+        self.connected = False
+        async with self.aiomqtt.Client(self.broker_host, self.broker_port) as client:
+            queue_class = partial(
+                FlowControlQueue,
+                self.queue_size,
+                partial(self.pause_reading, client),
+                partial(self.resume_reading, client),
+            )
+            async with client.messages(queue_class=queue_class) as messages:
+                await client.subscribe(self.topic)
+                logging.info("Connected to MQTT broker")
+                self.connected = True
+                receiver = asyncio.create_task(self.consume(messages))
+                stopping = asyncio.create_task(stop.wait())
+                await asyncio.wait({receiver, stopping}, return_when=asyncio.FIRST_COMPLETED)
+                receiver.cancel()
+                stopping.cancel()
+                await asyncio.gather(receiver, stopping, return_exceptions=True)
+                if not stop.is_set():
+                    # The receiver ended on its own, the connection is gone
+                    raise receiver.exception() or self.aiomqtt.MqttError("Agent message stream ended")
+
+    def pause_reading(self, client):
+        # aiomqtt 1.2 reads the paho socket from an event loop reader
+        sock = client._client.socket()
+        if sock is None:
+            return
+        asyncio.get_running_loop().remove_reader(sock.fileno())
+        self.pauses += 1
+        logging.info("Agent message intake paused, %s messages waiting", self.queue_size)
+
+    def resume_reading(self, client):
+        sock = client._client.socket()
+        if sock is None:
+            return
+
+        def read():
+            # Same as the reader aiomqtt registers when the socket opens
+            try:
+                client._client.loop_read()
+            except Exception as exc:
+                if not client._disconnected.done():
+                    client._disconnected.set_exception(exc)
+
+        asyncio.get_running_loop().add_reader(sock.fileno(), read)
+        logging.info("Agent message intake resumed")
+
+    async def consume(self, messages):
+        async for message in messages:
+            await self.on_message(message.payload)
+
+    async def on_message(self, payload: bytes):
+        """Processing agent data and sent it to the hub forwarder"""
+        try:
+            processed_batch = self.handler.process(self.handler.decode(payload))
+        except Exception as e:
+            logging.info("Error processing MQTT message: %s", e)
+            return
+        await self.forwarder.submit(processed_batch)
@@ -1,9 +1,7 @@
 import logging
-import config
 import paho.mqtt.client as mqtt
 from app.interfaces.agent_gateway import AgentGateway
-from app.entities.agent_data import AgentData, GpsData
-from app.usecases.data_processing import process_agent_data
+from app.usecases.processing_pipeline import AgentPayloadHandler, ProcessingPipeline
 from app.interfaces.hub_gateway import HubGateway
 
 
@@ -15,6 +13,7 @@ class AgentMQTTAdapter(AgentGateway):
         topic,
         hub_gateway: HubGateway,
         batch_size=10,
+        pipeline: ProcessingPipeline = None,
     ):
         self.batch_size = batch_size
         # MQTT
@@ -24,28 +23,34 @@ class AgentMQTTAdapter(AgentGateway):
         self.client = mqtt.Client()
         # Hub
         self.hub_gateway = hub_gateway
+        # Decodes payloads and rebuilds full records from dead-band compressed messages
+        self.handler = pipeline.handler if pipeline is not None else AgentPayloadHandler()
+        # Optional worker pipeline; without it messages are handled on the MQTT thread
+        self.pipeline = pipeline
 
     def on_connect(self, client, userdata, flags, rc):
         if rc == 0:
             logging.info("Connected to MQTT broker")
             self.client.subscribe(self.topic)
         else:
-            logging.info(f"Failed to connect to MQTT broker with code: {rc}")
+            logging.info("Failed to connect to MQTT broker with code: %s", rc)
 
     def on_message(self, client, userdata, msg):
         """Processing agent data and sent it to hub gateway"""
+        if self.pipeline is not None:
+            # Hand the raw payload to the worker pipeline and return to the network loop
+            if not self.pipeline.submit(msg.payload):
+                logging.warning("Edge queue is full, agent message dropped")
+            return
         try:
-            payload: str = msg.payload.decode("utf-8")
-            # Create AgentData instance with the received data
-            agent_data = AgentData.model_validate_json(payload, strict=True)
-            logging.info(f"Received agent data: {agent_data} from topic: {config.MQTT_TOPIC}" )
-            # Process the received data (you can call a use case here if needed)
-            processed_data = process_agent_data(agent_data)
+            # Create AgentData instances with the received data and process them
+            processed_batch = self.handler.process(self.handler.decode(msg.payload))
             # Store the agent_data in the database (you can send it to the data processing module)
-            if not self.hub_gateway.save_data(processed_data):
-                logging.error("Hub is not available")
+            for processed_data in processed_batch:
+                if not self.hub_gateway.save_data(processed_data):
+                    logging.error("Hub is not available")
         except Exception as e:
-            logging.info(f"Error processing MQTT message: {e}")
+            logging.info("Error processing MQTT message: %s", e)
 
     def connect(self):
         self.client.on_connect = self.on_connect
@@ -53,10 +58,19 @@ class AgentMQTTAdapter(AgentGateway):
         self.client.connect(self.broker_host, self.broker_port, 60)
 
     def start(self):
+        if self.pipeline is not None:
+            self.pipeline.start()
         self.client.loop_start()
 
     def stop(self):
         self.client.loop_stop()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            return
+        # Readings the road state detectors still hold back
+        for processed_data in self.handler.flush():
+            if not self.hub_gateway.save_data(processed_data):
+                logging.error("Hub is not available")
 
 
 # Usage example:
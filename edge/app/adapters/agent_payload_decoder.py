@@ -0,0 +1,80 @@
+import struct
+from datetime import datetime, timedelta
+from typing import Annotated, List, Union
+
+from pydantic import Field, TypeAdapter
+
+from app.entities.agent_data import AgentData, AgentDataDelta
+
+# Full records are tried first, so they cost a single validation
+AgentMessage = Annotated[Union[AgentData, AgentDataDelta], Field(union_mode="left_to_right")]
+agent_message_adapter = TypeAdapter(AgentMessage)
+agent_message_batch_adapter = TypeAdapter(List[AgentMessage])
+
+# Compact binary wire format published by the agent's BinarySerializer.
+# The layout must match agent/src/serializer.py.
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<BH")
+BINARY_RECORD = struct.Struct("<iqiiiddiddd" "Bidd" "dddd")
+TRAFFIC_LIGHT_STATES = ("red", "yellow", "green")
+EPOCH = datetime(1970, 1, 1)
+
+
+def decode_agent_payload(payload: bytes) -> List[Union[AgentData, AgentDataDelta]]:
+    """
+    Decode an agent MQTT payload into a list of AgentData (or AgentDataDelta
+    for dead-band compressed JSON messages).
+    Agents publish either a single JSON object, a JSON array of objects in
+    batch mode, or records in the compact binary format. The first byte
+    tells them apart; anything that is not binary is parsed as JSON.
+    """
+    if payload[:1] == bytes([BINARY_VERSION]):
+        return decode_binary_payload(payload)
+    if payload.lstrip()[:1] == b"[":
+        return agent_message_batch_adapter.validate_json(payload, strict=True)
+    return [agent_message_adapter.validate_json(payload, strict=True)]
+
+
+def decode_binary_payload(payload: bytes) -> List[AgentData]:
+    version, count = BINARY_HEADER.unpack_from(payload)
+    if len(payload) != BINARY_HEADER.size + count * BINARY_RECORD.size:
+        raise ValueError(
+            f"Binary payload of {len(payload)} bytes does not hold {count} records"
+        )
+    return [
+        _binary_record_to_agent_data(record)
+        for record in BINARY_RECORD.iter_unpack(payload[BINARY_HEADER.size:])
+    ]
+
+
+def _binary_record_to_agent_data(record) -> AgentData:
+    (
+        user_id, timestamp,
+        x, y, z,
+        gps_longitude, gps_latitude,
+        _empty_count, _parking_longitude, _parking_latitude,
+        intensity,
+        state_code, duration, traffic_light_longitude, traffic_light_latitude,
+        pm25, pm10, co2,
+        temperature,
+    ) = record
+    return AgentData.model_validate(
+        {
+            "user_id": user_id,
+            "accelerometer": {"x": x, "y": y, "z": z},
+            "gps": {"latitude": gps_latitude, "longitude": gps_longitude},
+            "rain": {"intensity": intensity},
+            "traffic_light": {
+                "state": TRAFFIC_LIGHT_STATES[state_code],
+                "duration": duration,
+                "gps": {
+                    "latitude": traffic_light_latitude,
+                    "longitude": traffic_light_longitude,
+                },
+            },
+            "air_quality": {"pm25": pm25, "pm10": pm10, "co2": co2},
+            "temperature": temperature,
+            "timestamp": EPOCH + timedelta(microseconds=timestamp),
+        },
+        strict=True,
+    )
@@ -0,0 +1,58 @@
+import threading
+from typing import List
+
+from app.entities.agent_data_summary import AgentDataSummary
+from app.entities.processed_agent_data import ProcessedAgentData
+from app.interfaces.hub_gateway import HubGateway
+from app.usecases.windowed_aggregator import WindowedAggregator
+
+
+class AggregatingHubGateway(HubGateway):
+    """
+    Decorator around another HubGateway that folds records into per-user
+    window summaries with a WindowedAggregator. Depending on its mode the
+    raw records are forwarded alongside the summaries or only the road
+    anomalies are. Errors of the wrapped gateway reach the caller. Call
+    flush() at shutdown to send the open windows.
+    """
+
+    def __init__(self, hub_gateway: HubGateway, aggregator: WindowedAggregator):
+        self.hub_gateway = hub_gateway
+        self.aggregator = aggregator
+        self.lock = threading.Lock()
+        # Metrics
+        self.received = 0
+        self.forwarded = 0
+        self.summarized = 0
+
+    def save_data(self, processed_data: ProcessedAgentData) -> bool:
+        return self.save_batch([processed_data])
+
+    def save_batch(self, processed_batch: List[ProcessedAgentData]) -> bool:
+        with self.lock:
+            raw, summaries = self.aggregator.add(processed_batch)
+            self.received += len(processed_batch)
+            self.forwarded += len(raw)
+        saved = self.save_summaries(summaries)
+        if raw:
+            saved = self.hub_gateway.save_batch(raw) and saved
+        return saved
+
+    def save_summaries(self, summaries: List[AgentDataSummary]) -> bool:
+        if not summaries:
+            return True
+        self.summarized += len(summaries)
+        return self.hub_gateway.save_summaries(summaries)
+
+    def flush(self) -> bool:
+        with self.lock:
+            summaries = self.aggregator.flush()
+        return self.save_summaries(summaries)
+
+    def metrics(self) -> dict:
+        return {
+            "received": self.received,
+            "forwarded": self.forwarded,
+            "summaries": self.summarized,
+            "open_windows": len(self.aggregator.windows),
+        }
@@ -0,0 +1,62 @@
+import logging
+from typing import List
+
+from app.adapters.hub_http_adapter import JSON_HEADERS, processed_agent_data_batch_adapter
+from app.entities.processed_agent_data import ProcessedAgentData
+from app.interfaces.async_hub_gateway import AsyncHubGateway
+
+
+class AsyncHubHttpAdapter(AsyncHubGateway):
+    """
+    Sends processed data to the hub with an httpx.AsyncClient. The client
+    keeps up to max_connections keep-alive connections, so that many
+    requests can be in flight at once.
+    """
+
+    def __init__(
+        self,
+        api_base_url,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10,
+        max_connections: int = 10,
+    ):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("The asyncio edge runtime requires httpx (pip install httpx)")
+        self.httpx = httpx
+        self.api_base_url = api_base_url
+        self.client = httpx.AsyncClient(
+            base_url=api_base_url,
+            headers=JSON_HEADERS,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def save_data(self, processed_data: ProcessedAgentData) -> bool:
+        logging.debug("Sending processed data to hub: %s", processed_data)
+        return await self._post("/processed_agent_data", processed_data.model_dump_json())
+
+    async def save_batch(self, processed_batch: List[ProcessedAgentData]) -> bool:
+        if not processed_batch:
+            return True
+        logging.debug("Sending batch of %s processed data to hub", len(processed_batch))
+        return await self._post(
+            "/processed_agent_data/batch",
+            processed_agent_data_batch_adapter.dump_json(processed_batch),
+        )
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def _post(self, path: str, data) -> bool:
+        try:
+            response = await self.client.post(path, content=data)
+        except self.httpx.HTTPError as e:
+            logging.info("Hub request failed: %s", e)
+            return False
+        if response.status_code != 200:
+            logging.info("Invalid Hub response for %s bytes to %s: %s", len(data), path, response)
+            logging.debug("Rejected data: %s", data)
+            return False
+        return True
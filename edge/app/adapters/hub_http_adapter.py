@@ -1,16 +1,41 @@
 import logging
+from typing import List
 
 import requests
-import pydantic_core
-import json
+from pydantic import TypeAdapter
+from requests.adapters import HTTPAdapter
 
+from app.entities.agent_data_summary import AgentDataSummary
 from app.entities.processed_agent_data import ProcessedAgentData
 from app.interfaces.hub_gateway import HubGateway
 
+processed_agent_data_batch_adapter = TypeAdapter(List[ProcessedAgentData])
+agent_data_summary_batch_adapter = TypeAdapter(List[AgentDataSummary])
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
 
 class HubHttpAdapter(HubGateway):
-    def __init__(self, api_base_url):
+    """
+    Sends processed data to the hub over one pooled keep-alive session.
+
+    Every call sends its data right away and reports whether the hub
+    accepted it; batching is left to the caller (the ProcessingPipeline
+    forwarder), so save_batch() posts the whole list in a single request.
+    """
+
+    def __init__(
+        self,
+        api_base_url,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10,
+        pool_size: int = 10,
+    ):
         self.api_base_url = api_base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
 
     def save_data(self, processed_data: ProcessedAgentData):
         """
@@ -20,12 +45,37 @@ class HubHttpAdapter(HubGateway):
         Returns:
             bool: True if the data is successfully saved, False otherwise.
         """
-        response = requests.post(f"{self.api_base_url}/processed_agent_data", data=json.dumps(
-            processed_data, default=pydantic_core.to_jsonable_python))
-        logging.info(f"Sending processed data to hub: {processed_data}")
-        if response.status_code != 200:
-            logging.info(
-                f"Invalid Hub response\nData: {processed_data.model_dump_json()}\nResponse: {response}"
+        logging.debug("Sending processed data to hub: %s", processed_data)
+        return self._post("/processed_agent_data", processed_data.model_dump_json())
+
+    def save_batch(self, processed_batch: List[ProcessedAgentData]) -> bool:
+        if not processed_batch:
+            return True
+        logging.debug("Sending batch of %s processed data to hub", len(processed_batch))
+        return self._post(
+            "/processed_agent_data/batch",
+            processed_agent_data_batch_adapter.dump_json(processed_batch),
+        )
+
+    def save_summaries(self, summaries: List[AgentDataSummary]) -> bool:
+        if not summaries:
+            return True
+        logging.debug("Sending %s summaries to hub", len(summaries))
+        return self._post("/agent_data_summary/batch", agent_data_summary_batch_adapter.dump_json(summaries))
+
+    def close(self):
+        self.session.close()
+
+    def _post(self, path: str, data) -> bool:
+        try:
+            response = self.session.post(
+                f"{self.api_base_url}{path}", data=data, headers=JSON_HEADERS, timeout=self.timeout
             )
+        except requests.RequestException as e:
+            logging.info("Hub request failed: %s", e)
+            return False
+        if response.status_code != 200:
+            logging.info("Invalid Hub response for %s bytes to %s: %s", len(data), path, response)
+            logging.debug("Rejected data: %s", data)
             return False
         return True
@@ -1,17 +1,23 @@
 import logging
+from typing import List
 
 import requests as requests
 from paho.mqtt import client as mqtt_client
+from pydantic import TypeAdapter
 
+from app.entities.agent_data_summary import AgentDataSummary
 from app.entities.processed_agent_data import ProcessedAgentData
 from app.interfaces.hub_gateway import HubGateway
 
+agent_data_summary_batch_adapter = TypeAdapter(List[AgentDataSummary])
+
 
 class HubMqttAdapter(HubGateway):
-    def __init__(self, broker, port, topic):
+    def __init__(self, broker, port, topic, summary_topic="agent_data_summary_topic"):
         self.broker = broker
         self.port = port
         self.topic = topic
+        self.summary_topic = summary_topic
         self.mqtt_client = self._connect_mqtt(broker, port)
 
     def save_data(self, processed_data: ProcessedAgentData):
@@ -31,6 +37,21 @@ class HubMqttAdapter(HubGateway):
             print(f"Failed to send message to topic {self.topic}")
             return False
 
+    def save_summaries(self, summaries: List[AgentDataSummary]) -> bool:
+        """
+        Publish window summaries to the Hub, all of them in one message.
+        Returns:
+            bool: True if the summaries are successfully published, False otherwise.
+        """
+        if not summaries:
+            return True
+        msg = agent_data_summary_batch_adapter.dump_json(summaries)
+        result = self.mqtt_client.publish(self.summary_topic, msg)
+        if result[0] == 0:
+            return True
+        print(f"Failed to send summaries to topic {self.summary_topic}")
+        return False
+
     @staticmethod
     def _connect_mqtt(broker, port):
         """Create MQTT client"""
@@ -0,0 +1,242 @@
+import logging
+import sqlite3
+import threading
+import time
+from itertools import takewhile
+from typing import List
+
+from app.entities.agent_data_summary import AgentDataSummary
+from app.entities.processed_agent_data import ProcessedAgentData
+from app.interfaces.hub_gateway import HubGateway
+
+# Kinds of spooled rows
+PROCESSED_AGENT_DATA = "processed_agent_data"
+AGENT_DATA_SUMMARY = "agent_data_summary"
+
+
+class SqliteSpool:
+    """
+    Durable FIFO of serialized records in a SQLite database in WAL mode.
+    Every row has a kind, so processed data and summaries share one queue.
+    Records survive restarts of the edge; once more than max_records are
+    stored, the oldest ones are evicted. Records that can no longer be
+    read are moved to a separate quarantine table.
+    """
+
+    def __init__(self, path: str, max_records: int = 100000):
+        self.max_records = max_records
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, "
+            f"kind TEXT NOT NULL DEFAULT '{PROCESSED_AGENT_DATA}')"
+        )
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(spool)")]
+        if "kind" not in columns:
+            # Spools written before summaries were spooled only hold processed data
+            self.connection.execute(
+                f"ALTER TABLE spool ADD COLUMN kind TEXT NOT NULL DEFAULT '{PROCESSED_AGENT_DATA}'"
+            )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS quarantine (id INTEGER PRIMARY KEY, payload TEXT NOT NULL, error TEXT)"
+        )
+        self.count = self.connection.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+        self.evicted = 0
+        self.quarantined = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, payloads: List[str], kind: str = PROCESSED_AGENT_DATA):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO spool (payload, kind) VALUES (?, ?)", [(p, kind) for p in payloads]
+            )
+            self.count += len(payloads)
+            excess = self.count - self.max_records
+            if excess > 0:
+                self.connection.execute(
+                    "DELETE FROM spool WHERE id IN (SELECT id FROM spool ORDER BY id LIMIT ?)", (excess,)
+                )
+                self.count -= excess
+                self.evicted += excess
+                logging.warning("Spool is full, evicted %s oldest records", excess)
+
+    def peek(self, limit: int) -> list:
+        """Oldest (id, kind, payload) rows"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT id, kind, payload FROM spool ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+
+    def remove_through(self, last_id: int):
+        """Delete every record up to and including last_id"""
+        with self.lock, self.connection:
+            removed = self.connection.execute("DELETE FROM spool WHERE id <= ?", (last_id,)).rowcount
+            self.count -= removed
+
+    def quarantine(self, rows: list):
+        """Move (id, payload, error) rows out of the spool"""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO quarantine (id, payload, error) VALUES (?, ?, ?)", rows
+            )
+            removed = self.connection.executemany(
+                "DELETE FROM spool WHERE id = ?", [(row_id,) for row_id, _, _ in rows]
+            ).rowcount
+            self.count -= removed
+            self.quarantined += len(rows)
+
+    def close(self):
+        self.connection.close()
+
+
+class SpoolingHubGateway(HubGateway):
+    """
+    Store-and-forward decorator around another HubGateway.
+
+    Records and summaries the hub does not accept are written to a
+    SqliteSpool instead of being dropped. Until the hub accepts a replayed
+    batch again, new ones are appended behind the spooled ones. A
+    background thread replays the spool in batches of replay_batch_size
+    (summaries and records separately), at most replay_rate
+    records per second, and backs off for retry_interval seconds whenever
+    the hub is still unavailable. Once a replay succeeded, new records go
+    straight to the hub again while the backlog drains behind them, so a
+    rate limited replay never has to keep up with live traffic; after an
+    outage the hub receives the older records late, not in order.
+    Spooled rows that no longer parse are quarantined.
+    """
+
+    def __init__(
+        self,
+        hub_gateway: HubGateway,
+        spool: SqliteSpool,
+        replay_batch_size: int = 500,
+        replay_rate: float = 1000,
+        retry_interval: float = 5,
+    ):
+        self.hub_gateway = hub_gateway
+        self.spool = spool
+        self.replay_batch_size = replay_batch_size
+        self.replay_rate = replay_rate
+        self.retry_interval = retry_interval
+        self.stopped = threading.Event()
+        self.thread = None
+        # Cleared when a send fails, set again once a replayed batch is accepted
+        self.hub_available = not len(spool)
+        # Metrics
+        self.spooled = 0
+        self.replayed = 0
+
+    def save_data(self, processed_data: ProcessedAgentData) -> bool:
+        return self.save_batch([processed_data])
+
+    def save_batch(self, processed_batch: List[ProcessedAgentData]) -> bool:
+        """True once the records were either sent or safely spooled"""
+        return self._save(processed_batch, PROCESSED_AGENT_DATA)
+
+    def save_summaries(self, summaries: List[AgentDataSummary]) -> bool:
+        """True once the summaries were either sent or safely spooled"""
+        return self._save(summaries, AGENT_DATA_SUMMARY)
+
+    def replay(self) -> bool:
+        """
+        Send one batch from the spool. Returns False if the spool is empty
+        or the hub did not accept the batch.
+        """
+        rows = self.spool.peek(self.replay_batch_size)
+        if not rows:
+            return False
+        # A batch holds one kind, the oldest rows of the same kind as the first one
+        kind = rows[0][1]
+        rows = list(takewhile(lambda row: row[1] == kind, rows))
+        batch, corrupt = [], []
+        for row_id, _, payload in rows:
+            try:
+                batch.append(self._parse(kind, payload))
+            except ValueError as e:
+                corrupt.append((row_id, payload, str(e)))
+        if corrupt:
+            # Would fail every replay and hold up the records behind it
+            self.spool.quarantine(corrupt)
+            logging.warning("Quarantined %s spooled records that could not be parsed", len(corrupt))
+        if batch:
+            try:
+                saved = self._send(kind, batch)
+            except Exception as e:
+                logging.info("Error replaying spool to hub: %s", e)
+                saved = False
+            if not saved:
+                self.hub_available = False
+                return False
+            self.hub_available = True
+        self.spool.remove_through(rows[-1][0])
+        self.replayed += len(batch)
+        logging.info("Replayed %s spooled records, %s left", len(batch), len(self.spool))
+        return True
+
+    def _save(self, items: list, kind: str) -> bool:
+        if not items:
+            return True
+        if self.hub_available or not len(self.spool):
+            try:
+                if self._send(kind, items):
+                    return True
+            except Exception as e:
+                logging.info("Error sending %s to hub: %s", kind, e)
+            self.hub_available = False
+        self.spool.append([item.model_dump_json() for item in items], kind)
+        self.spooled += len(items)
+        return True
+
+    def _send(self, kind: str, items: list) -> bool:
+        if kind == AGENT_DATA_SUMMARY:
+            return self.hub_gateway.save_summaries(items)
+        return self.hub_gateway.save_batch(items)
+
+    @staticmethod
+    def _parse(kind: str, payload: str):
+        if kind == AGENT_DATA_SUMMARY:
+            return AgentDataSummary.model_validate_json(payload)
+        if kind == PROCESSED_AGENT_DATA:
+            return ProcessedAgentData.model_validate_json(payload)
+        raise ValueError(f"Unknown spool record kind {kind!r}")
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="spool-replay", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.spool.close()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            started = time.monotonic()
+            try:
+                replayed = self.replay()
+            except Exception as e:
+                logging.error("Error replaying spool: %s", e)
+                replayed = False
+            if replayed:
+                # Spread the backlog out so a recovering hub is not flooded
+                pause = self.replay_batch_size / self.replay_rate - (time.monotonic() - started)
+            else:
+                pause = self.retry_interval
+            self.stopped.wait(max(0.0, pause))
+
+    def metrics(self) -> dict:
+        return {
+            "depth": len(self.spool),
+            "capacity": self.spool.max_records,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "evicted": self.spool.evicted,
+            "quarantined": self.spool.quarantined,
+        }
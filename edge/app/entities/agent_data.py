@@ -1,7 +1,14 @@
 from datetime import datetime
+from typing import Literal, Optional
 from pydantic import BaseModel, field_validator
 
 
+def parse_iso_timestamp(value: str) -> datetime:
+    """datetime.fromisoformat that also takes the "Z" suffix on Python < 3.11"""
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
 
 class RainData(BaseModel):
     intensity: float
@@ -39,15 +46,32 @@ class AgentData(BaseModel):
     temperature: float
     timestamp: datetime
 
-    @classmethod
     @field_validator("timestamp", mode="before")
+    @classmethod
     def parse_timestamp(cls, value):
         # Convert the timestamp to a datetime object
         if isinstance(value, datetime):
             return value
         try:
-            return datetime.fromisoformat(value)
-        except (TypeError, ValueError):
+            return parse_iso_timestamp(value)
+        except (AttributeError, TypeError, ValueError):
             raise ValueError(
                 "Invalid timestamp format. Expected ISO 8601 format (YYYY-MM-DDTHH:MM:SSZ)."
             )
+
+
+class AgentDataDelta(BaseModel):
+    """
+    Dead-band compressed agent message. Only the sensors that changed since
+    they were last sent are present; the rest come from the previous record
+    of the same user.
+    """
+    delta: Literal[True]
+    user_id: int
+    timestamp: datetime
+    accelerometer: Optional[AccelerometerData] = None
+    gps: Optional[GpsData] = None
+    rain: Optional[RainData] = None
+    traffic_light: Optional[TrafficLightData] = None
+    air_quality: Optional[AirQualityData] = None
+    temperature: Optional[float] = None
@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class FieldSummary(BaseModel):
+    min: float
+    max: float
+    mean: float
+
+
+class AgentDataSummary(BaseModel):
+    user_id: int
+    window_start: datetime
+    window_end: datetime
+    count: int
+    z: FieldSummary
+    pm25: FieldSummary
+    temperature: FieldSummary
+    # Number of records per road state in the window
+    road_states: Dict[str, int]
@@ -0,0 +1,39 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from app.entities.processed_agent_data import ProcessedAgentData
+
+
+class AsyncHubGateway(ABC):
+    """
+    Asyncio counterpart of HubGateway, used by the asyncio edge runtime.
+    All async hub gateway adapters must implement these methods.
+    """
+
+    @abstractmethod
+    async def save_data(self, processed_data: ProcessedAgentData) -> bool:
+        """
+        Method to save the processed agent data in the database.
+        Parameters:
+            processed_data (ProcessedAgentData): The processed agent data to be saved.
+        Returns:
+            bool: True if the data is successfully saved, False otherwise.
+        """
+        pass
+
+    async def save_batch(self, processed_batch: List[ProcessedAgentData]) -> bool:
+        """
+        Method to save several processed agent data records at once.
+        By default every record is saved on its own.
+        Parameters:
+            processed_batch (List[ProcessedAgentData]): The records to be saved.
+        Returns:
+            bool: True if all records are successfully saved, False otherwise.
+        """
+        return all([await self.save_data(processed_data) for processed_data in processed_batch])
+
+    async def close(self):
+        """
+        Method to release connections held by the gateway.
+        """
+        pass
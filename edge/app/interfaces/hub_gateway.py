@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import List
+
+from app.entities.agent_data_summary import AgentDataSummary
 from app.entities.processed_agent_data import ProcessedAgentData
 
 
@@ -18,3 +21,26 @@ class HubGateway(ABC):
             bool: True if the data is successfully saved, False otherwise.
         """
         pass
+
+    def save_batch(self, processed_batch: List[ProcessedAgentData]) -> bool:
+        """
+        Method to save several processed agent data records at once.
+        Adapters with a bulk transport should override it; by default every
+        record is saved on its own.
+        Parameters:
+            processed_batch (List[ProcessedAgentData]): The records to be saved.
+        Returns:
+            bool: True if all records are successfully saved, False otherwise.
+        """
+        return all([self.save_data(processed_data) for processed_data in processed_batch])
+
+    @abstractmethod
+    def save_summaries(self, summaries: List[AgentDataSummary]) -> bool:
+        """
+        Method to save windowed summaries of the processed agent data.
+        Parameters:
+            summaries (List[AgentDataSummary]): The summaries to be saved.
+        Returns:
+            bool: True if all summaries are successfully saved, False otherwise.
+        """
+        pass
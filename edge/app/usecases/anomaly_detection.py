@@ -0,0 +1,382 @@
+import math
+from collections import deque
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from app.usecases.road_state_detector import RoadStateDetector
+
+ZSCORE_WINDOW = 50
+ZSCORE_THRESHOLD = 3.0
+EWMA_ALPHA = 0.05
+EWMA_WARMUP = 20
+# Lower bound for the standard deviation, so a flat signal does not turn
+# every small change into an anomaly
+MIN_STD = 1.0
+
+# Same parameters as the offline detection in MapView/fileDatasource.py.
+# Potholes are peaks of -z. wlen bounds the prominence search window, so a
+# peak is decided at most wlen // 2 samples after it occurred. The offline
+# detection has no bound; on MapView/data.csv any window from 1130 samples
+# finds the same bumps and potholes (the bump's base is 576 samples away).
+PEAK_WLEN = 1200
+BUMP_PEAK_PARAMS = {"height": 20000, "distance": 20, "prominence": 500, "width": 10, "wlen": PEAK_WLEN}
+POTHOLE_PEAK_PARAMS = {"height": -10000, "distance": 20, "prominence": 500, "width": 3, "wlen": PEAK_WLEN}
+
+
+def classify_score(score: float, threshold: float) -> str:
+    if score > threshold:
+        return "Speeding bump"
+    if score < -threshold:
+        return "Pit"
+    return "Even"
+
+
+class RollingZScoreDetector:
+    """
+    Flags a reading as a bump / pit when it lies more than threshold
+    standard deviations above / below the mean of the previous window
+    readings. The sums are updated incrementally and recomputed once per
+    window to keep rounding errors from accumulating.
+    """
+
+    def __init__(self, window: int = ZSCORE_WINDOW, threshold: float = ZSCORE_THRESHOLD, min_std: float = MIN_STD):
+        self.window = window
+        self.threshold = threshold
+        self.min_std = min_std
+        self.values = deque()
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.evicted = 0
+
+    def update(self, z: float) -> str:
+        if len(self.values) < self.window:
+            road_state = "Not enough data"
+        else:
+            mean = self.total / self.window
+            variance = max(self.total_squares / self.window - mean * mean, 0.0)
+            road_state = classify_score((z - mean) / max(math.sqrt(variance), self.min_std), self.threshold)
+        self._push(z)
+        return road_state
+
+    def _push(self, z: float):
+        self.values.append(z)
+        self.total += z
+        self.total_squares += z * z
+        if len(self.values) <= self.window:
+            return
+        oldest = self.values.popleft()
+        self.evicted += 1
+        if self.evicted % self.window == 0:
+            self.total = math.fsum(self.values)
+            self.total_squares = math.fsum(value * value for value in self.values)
+        else:
+            self.total -= oldest
+            self.total_squares -= oldest * oldest
+
+
+class EwmaDetector:
+    """
+    Exponentially weighted mean and variance of the readings; a reading
+    more than threshold standard deviations away from the mean is an
+    anomaly. Needs warmup readings before it reports anything.
+    """
+
+    def __init__(
+        self,
+        alpha: float = EWMA_ALPHA,
+        threshold: float = ZSCORE_THRESHOLD,
+        warmup: int = EWMA_WARMUP,
+        min_std: float = MIN_STD,
+    ):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_std = min_std
+        self.mean = None
+        self.variance = 0.0
+        self.count = 0
+
+    def update(self, z: float) -> str:
+        self.count += 1
+        if self.mean is None:
+            self.mean = z
+            return "Not enough data"
+        difference = z - self.mean
+        if self.count <= self.warmup:
+            road_state = "Not enough data"
+        else:
+            road_state = classify_score(difference / max(math.sqrt(self.variance), self.min_std), self.threshold)
+        increment = self.alpha * difference
+        self.mean += increment
+        self.variance = (1 - self.alpha) * (self.variance + difference * increment)
+        return road_state
+
+
+class Peak(NamedTuple):
+    index: int
+    value: float
+    prominence: Optional[float]
+    width: Optional[float]
+
+
+class StreamingPeakFinder:
+    """
+    Online version of scipy.signal.find_peaks for minimum height, distance,
+    prominence and width (at rel_height), reporting the same peaks as
+
+        find_peaks(x, height=..., distance=..., prominence=..., width=..., wlen=...)
+
+    push() takes one sample and returns the peaks that were decided by it;
+    flush() decides the remaining ones at the end of the stream. Local
+    maxima (plateaus at their middle) above height are grouped while they
+    are closer than distance to each other and thinned out highest first
+    once the group cannot grow anymore. The survivors wait until either a
+    higher sample or wlen // 2 samples after the peak have arrived, which
+    bounds the prominence search, and are then measured the way scipy does.
+
+    Each sample costs O(1) amortized; measuring a peak walks at most wlen
+    samples and peaks that get measured are at least distance apart. A
+    group is thinned once it spans max_group_span samples (by default the
+    larger of wlen // 2 and 64 * distance) even if it could still grow, so
+    a dense train of maxima above height cannot hold on to every sample;
+    peaks on both sides of such a cut may be closer than distance.
+    Ties in height inside one group may be thinned in a different order
+    than scipy does.
+    """
+
+    def __init__(
+        self, height=None, distance=None, prominence=None, width=None, wlen=None, rel_height=0.5, max_group_span=None
+    ):
+        measure = prominence is not None or width is not None
+        if measure and (wlen is None or wlen < 2):
+            raise ValueError("Prominence and width need a window length wlen of at least 2")
+        if distance is not None and distance < 1:
+            raise ValueError("distance must be greater or equal to 1")
+        self.height = height
+        self.distance = math.ceil(distance) if distance is not None else None
+        self.prominence = prominence
+        self.width = width
+        self.rel_height = rel_height
+        self.half_window = math.ceil(wlen) // 2 if measure else None
+        if max_group_span is None and self.distance is not None:
+            max_group_span = max(math.ceil(wlen) // 2 if wlen is not None else 0, 64 * self.distance)
+        self.max_group_span = max_group_span
+        # Samples from stream index offset on; older ones are not needed anymore
+        self.samples = []
+        self.offset = 0
+        self.count = 0
+        # Start of the current plateau if it was reached by a rise
+        self.plateau_start = None
+        # Local maxima (index, value) closer than distance to each other
+        self.group = []
+        # Peaks left after distance: [index, value, higher sample seen after it]
+        self.waiting = []
+
+    def push(self, value: float) -> List[Peak]:
+        index = self.count
+        self.count += 1
+        self.samples.append(value)
+        if index > 0:
+            previous = self._at(index - 1)
+            if value > previous:
+                self.plateau_start = index
+            elif value < previous and self.plateau_start is not None:
+                self._candidate((self.plateau_start + index - 1) // 2, previous)
+                self.plateau_start = None
+        for peak in self.waiting:
+            if value > peak[1]:
+                peak[2] = True
+        if self.group and (
+            self._next_candidate() - self.group[-1][0] >= self.distance
+            or (self.max_group_span is not None and index - self.group[0][0] >= self.max_group_span)
+        ):
+            self._thin_group()
+        peaks = self._measure_ready(final=False)
+        self._trim()
+        return peaks
+
+    @property
+    def settled(self) -> int:
+        """Stream index before which every peak has been returned already"""
+        pending = [self.count]
+        if self.plateau_start is not None and (self.height is None or self._at(self.plateau_start) >= self.height):
+            pending.append(self.plateau_start)
+        pending.extend(index for index, _ in self.group)
+        pending.extend(peak[0] for peak in self.waiting)
+        return min(pending)
+
+    def flush(self) -> List[Peak]:
+        """Decide the pending peaks as if the stream ended here"""
+        self.plateau_start = None
+        if self.group:
+            self._thin_group()
+        return self._measure_ready(final=True)
+
+    def _at(self, index: int) -> float:
+        return self.samples[index - self.offset]
+
+    def _candidate(self, index: int, value: float):
+        if self.height is not None and value < self.height:
+            return
+        if self.distance is None:
+            self._wait(index, value)
+            return
+        if self.group and index - self.group[-1][0] >= self.distance:
+            self._thin_group()
+        self.group.append((index, value))
+
+    def _next_candidate(self) -> int:
+        """Lowest index the next local maximum can have"""
+        if self.plateau_start is not None:
+            return self.plateau_start
+        return self.count
+
+    def _thin_group(self):
+        group = self.group
+        keep = [True] * len(group)
+        for j in reversed(sorted(range(len(group)), key=lambda k: group[k][1])):
+            if not keep[j]:
+                continue
+            k = j - 1
+            while k >= 0 and group[j][0] - group[k][0] < self.distance:
+                keep[k] = False
+                k -= 1
+            k = j + 1
+            while k < len(group) and group[k][0] - group[j][0] < self.distance:
+                keep[k] = False
+                k += 1
+        for (index, value), kept in zip(group, keep):
+            if kept:
+                self._wait(index, value)
+        self.group = []
+
+    def _wait(self, index: int, value: float):
+        higher = any(self._at(i) > value for i in range(index + 1, self.count))
+        self.waiting.append([index, value, higher])
+
+    def _measure_ready(self, final: bool) -> List[Peak]:
+        peaks, waiting = [], []
+        last = self.count - 1
+        for peak in self.waiting:
+            index, value, higher = peak
+            if self.half_window is None:
+                peaks.append(Peak(index, value, None, None))
+            elif final or higher or last >= index + self.half_window:
+                peak = self._measure(index, value)
+                if self._selected(peak):
+                    peaks.append(peak)
+            else:
+                waiting.append(peak)
+        self.waiting = waiting
+        return peaks
+
+    def _measure(self, peak: int, value: float) -> Peak:
+        i_min = max(peak - self.half_window, 0)
+        i_max = min(peak + self.half_window, self.count - 1)
+
+        left_base = i = peak
+        left_min = value
+        while i_min <= i and self._at(i) <= value:
+            if self._at(i) < left_min:
+                left_min = self._at(i)
+                left_base = i
+            i -= 1
+        right_base = i = peak
+        right_min = value
+        while i <= i_max and self._at(i) <= value:
+            if self._at(i) < right_min:
+                right_min = self._at(i)
+                right_base = i
+            i += 1
+        prominence = value - max(left_min, right_min)
+
+        height = value - prominence * self.rel_height
+        i = peak
+        while left_base < i and height < self._at(i):
+            i -= 1
+        left_ip = float(i)
+        if self._at(i) < height:
+            left_ip += (height - self._at(i)) / (self._at(i + 1) - self._at(i))
+        i = peak
+        while i < right_base and height < self._at(i):
+            i += 1
+        right_ip = float(i)
+        if self._at(i) < height:
+            right_ip -= (height - self._at(i)) / (self._at(i - 1) - self._at(i))
+        return Peak(peak, value, prominence, right_ip - left_ip)
+
+    def _selected(self, peak: Peak) -> bool:
+        if self.prominence is not None and peak.prominence < self.prominence:
+            return False
+        return self.width is None or peak.width >= self.width
+
+    def _trim(self):
+        oldest = min(
+            [self.count - 1, self._next_candidate()]
+            + [index for index, _ in self.group]
+            + [peak[0] for peak in self.waiting]
+        ) - (self.half_window or 0)
+        # Drop in chunks so that trimming stays O(1) amortized
+        if oldest - self.offset > max(self.half_window or 0, 64):
+            del self.samples[:oldest - self.offset]
+            self.offset = oldest
+
+
+class PeakRoadStateDetector:
+    """
+    Road state from streaming peak detection with the offline MapView
+    parameters: peaks of z are bumps, peaks of -z are potholes.
+
+    A peak is only known some samples after it occurred (up to wlen // 2),
+    so label() holds the readings back until no undecided peak can fall on
+    them and then returns them, in order, with their state. Every peak
+    labels its own reading, as find_peaks does offline. flush() returns
+    the readings still held back.
+    """
+
+    def __init__(self, bump_params: dict = None, pothole_params: dict = None):
+        self.bumps = StreamingPeakFinder(**(bump_params or BUMP_PEAK_PARAMS))
+        self.potholes = StreamingPeakFinder(**(pothole_params or POTHOLE_PEAK_PARAMS))
+        self.count = 0
+        # (stream index, reading) not returned yet
+        self.held = deque()
+        # Stream index -> state of the peaks among the held readings
+        self.states = {}
+
+    def label(self, reading, z: float) -> List[Tuple[object, str]]:
+        self.held.append((self.count, reading))
+        self.count += 1
+        self._record(self.bumps.push(z), self.potholes.push(-z))
+        return self._release(min(self.bumps.settled, self.potholes.settled))
+
+    def flush(self) -> List[Tuple[object, str]]:
+        self._record(self.bumps.flush(), self.potholes.flush())
+        return self._release(self.count)
+
+    def _record(self, bumps: List[Peak], potholes: List[Peak]):
+        for peak in potholes:
+            self.states[peak.index] = "Pit"
+        for peak in bumps:
+            self.states[peak.index] = "Speeding bump"
+
+    def _release(self, settled: int) -> List[Tuple[object, str]]:
+        released = []
+        while self.held and self.held[0][0] < settled:
+            index, reading = self.held.popleft()
+            released.append((reading, self.states.pop(index, "Even")))
+        return released
+
+
+ROAD_STATE_ENGINES = {
+    "threshold": RoadStateDetector,
+    "zscore": RollingZScoreDetector,
+    "ewma": EwmaDetector,
+    "peaks": PeakRoadStateDetector,
+}
+
+
+def road_state_detector_factory(engine: str) -> Callable[[], object]:
+    """Detector class for a ROAD_STATE_ENGINE name, used as the registry factory"""
+    try:
+        return ROAD_STATE_ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown road state engine {engine!r}, expected one of {', '.join(ROAD_STATE_ENGINES)}")
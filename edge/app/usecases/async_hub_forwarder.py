@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from typing import List
+
+from app.entities.processed_agent_data import ProcessedAgentData
+from app.interfaces.async_hub_gateway import AsyncHubGateway
+
+
+class AsyncHubForwarder:
+    """
+    Asyncio counterpart of HubForwarder. Records are grouped into batches of
+    batch_size, or whatever arrived within flush_interval seconds, and every
+    batch is sent as its own task. At most max_in_flight requests run at
+    once; submit() waits for a free slot, which slows down the MQTT intake
+    instead of piling up requests.
+    """
+
+    def __init__(
+        self,
+        hub_gateway: AsyncHubGateway,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        max_in_flight: int = 10,
+    ):
+        self.hub_gateway = hub_gateway
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.batch = []
+        self.in_flight = set()
+        self.timer = None
+        # Metrics
+        self.forwarded = 0
+        self.failed = 0
+        self.batches = 0
+
+    async def submit(self, processed_batch: List[ProcessedAgentData]):
+        self.batch.extend(processed_batch)
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+        elif self.batch and self.timer is None:
+            self.timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        """Start sending the current batch, waiting for a free slot"""
+        if self.timer is not None and self.timer is not asyncio.current_task():
+            self.timer.cancel()
+        self.timer = None
+        while self.batch:
+            # Take the records only once a slot is free, so a cancelled wait loses nothing
+            await self.slots.acquire()
+            batch, self.batch = self.batch[:self.batch_size], self.batch[self.batch_size:]
+            if not batch:
+                self.slots.release()
+                return
+            task = asyncio.create_task(self._send(batch))
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+
+    async def drain(self):
+        """Send everything that is buffered and wait for all requests"""
+        await self.flush()
+        await asyncio.gather(*self.in_flight)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def _send(self, batch: List[ProcessedAgentData]):
+        try:
+            saved = await self.hub_gateway.save_batch(batch)
+        except Exception as e:
+            logging.error("Error sending batch to hub: %s", e)
+            saved = False
+        finally:
+            self.slots.release()
+        self.batches += 1
+        if saved:
+            self.forwarded += len(batch)
+        else:
+            self.failed += len(batch)
+            logging.error("Hub is not available")
+
+    def metrics(self) -> dict:
+        return {
+            "buffered": len(self.batch),
+            "in_flight": len(self.in_flight),
+            "batches": self.batches,
+            "forwarded": self.forwarded,
+            "failed": self.failed,
+        }
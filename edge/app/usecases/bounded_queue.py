@@ -0,0 +1,160 @@
+import os
+import struct
+import threading
+from collections import deque
+from typing import Optional, Tuple
+
+# What put() does when the queue is full:
+#   block       - wait for room, which stops the MQTT loop reading the socket
+#                 so the backlog stays in the broker
+#   drop_oldest - discard the oldest queued payload to make room
+#   spill       - append the payload to a file on disk and read it back once
+#                 the workers have drained the in-memory part
+POLICIES = ("block", "drop_oldest", "spill")
+
+
+class SpillFile:
+    """
+    Append-only FIFO of length-prefixed payloads on disk. The file is
+    truncated whenever it has been read to the end. It only extends the
+    buffer and is not meant to survive a restart.
+    """
+
+    RECORD_HEADER = struct.Struct("<I")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+        self.read_offset = 0
+        self.write_offset = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, payload: bytes):
+        if self.file is None:
+            self.file = open(self.path, "w+b")
+        self.file.seek(self.write_offset)
+        self.file.write(self.RECORD_HEADER.pack(len(payload)))
+        self.file.write(payload)
+        self.write_offset = self.file.tell()
+        self.count += 1
+
+    def pop(self) -> bytes:
+        self.file.seek(self.read_offset)
+        (size,) = self.RECORD_HEADER.unpack(self.file.read(self.RECORD_HEADER.size))
+        payload = self.file.read(size)
+        self.read_offset = self.file.tell()
+        self.count -= 1
+        if self.count == 0:
+            self.file.truncate(0)
+            self.read_offset = self.write_offset = 0
+        return payload
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            os.remove(self.path)
+
+
+class BoundedQueue:
+    """
+    FIFO of raw agent payloads between the MQTT network thread and the
+    processing workers, with a configurable policy for when it is full.
+
+    get() hands out consecutive sequence numbers in arrival order, so
+    workers can restore that order for the stateful processing steps.
+    """
+
+    def __init__(self, maxsize: int, policy: str = "block", spill_path: Optional[str] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy {policy!r}, expected one of {POLICIES}")
+        if policy == "spill" and not spill_path:
+            raise ValueError("The spill policy needs a spill_path")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = deque()
+        self.spill = SpillFile(spill_path) if policy == "spill" else None
+        self.condition = threading.Condition()
+        self.closed = False
+        self.sequence = 0
+        # Metrics
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.high_watermark = 0
+
+    def __len__(self):
+        return len(self.items) + (len(self.spill) if self.spill else 0)
+
+    def put(self, item: bytes, timeout: Optional[float] = None) -> bool:
+        """Queue an item, False if it was rejected (closed, or block timed out)"""
+        with self.condition:
+            if self.closed:
+                return False
+            if self.spill is not None and (self.spill.count or len(self.items) >= self.maxsize):
+                # Once anything is on disk newer items go there too, to keep FIFO order
+                self.spill.append(item)
+                self.spilled += 1
+            else:
+                if len(self.items) >= self.maxsize:
+                    if self.policy == "drop_oldest":
+                        self.items.popleft()
+                        self.dropped += 1
+                    elif not self.condition.wait_for(
+                            lambda: len(self.items) < self.maxsize or self.closed, timeout
+                    ) or self.closed:
+                        self.dropped += 1
+                        return False
+                self.items.append(item)
+            self.enqueued += 1
+            self.high_watermark = max(self.high_watermark, len(self))
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[int, bytes]]:
+        """
+        Next (sequence number, item). Returns None on timeout, or once the
+        queue is closed and fully drained.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: len(self) or self.closed, timeout)
+            if self.items:
+                item = self.items.popleft()
+            elif self.spill is not None and self.spill.count:
+                item = self.spill.pop()
+            else:
+                return None
+            sequence = self.sequence
+            self.sequence += 1
+            self.dequeued += 1
+            self.condition.notify_all()
+            return sequence, item
+
+    def close(self):
+        """Reject new items; get() keeps returning what is left"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def release(self):
+        """Delete the spill file, call once the workers have stopped"""
+        if self.spill is not None:
+            self.spill.close()
+
+    def metrics(self) -> dict:
+        with self.condition:
+            return {
+                "policy": self.policy,
+                "depth": len(self),
+                "capacity": self.maxsize,
+                "spill_depth": len(self.spill) if self.spill else 0,
+                "high_watermark": self.high_watermark,
+                "enqueued": self.enqueued,
+                "dequeued": self.dequeued,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+            }
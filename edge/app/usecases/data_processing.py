@@ -1,11 +1,33 @@
 import logging
+from typing import List, Tuple
 
+import numpy as np
+
+import config
+from logging_config import LogSampler
 from app.entities.agent_data import AgentData
 from app.entities.processed_agent_data import ProcessedAgentData
+from app.usecases.anomaly_detection import road_state_detector_factory
+from app.usecases.road_state_detector import RoadStateDetectorRegistry
+
+processed_log_sampler = LogSampler(config.LOG_SAMPLE_EVERY)
+
+# Readings the detectors of dropped users still held back, sent with the next batch
+released_road_states: List[Tuple[AgentData, str]] = []
+
 
-data_points = []
-MAX_DATA_POINTS = 5
-ANOMALY_THRESHOLD = 0.01
+def release_road_states(detector):
+    flush = getattr(detector, "flush", None)
+    if flush is not None:
+        released_road_states.extend(flush())
+
+
+road_state_detectors = RoadStateDetectorRegistry(
+    factory=road_state_detector_factory(config.ROAD_STATE_ENGINE),
+    max_users=config.ROAD_STATE_MAX_USERS,
+    ttl=config.ROAD_STATE_TTL,
+    on_evict=release_road_states,
+)
 
 
 def process_agent_data(
@@ -22,35 +44,111 @@ def process_agent_data(
         air_quality_state=air_quality_state,
         agent_data=agent_data,
     )
-    logging.info(prep)
+    if processed_log_sampler():
+        logging.info("Processed agent data: %s", prep)
     return prep
 
 
-def process_road_state(agent_data: AgentData):
-    data_points.append(agent_data.accelerometer)
+# Upper bounds of the classes in process_rain_state / process_air_quality_state,
+# used with np.digitize(right=True) so the bounds belong to the lower class
+RAIN_BINS = np.array([0, 0.2, 0.4, 0.6, 0.8, 1])
+RAIN_LABELS = np.array(["Clear", "Drizzle", "Sprinkle", "Shower", "Rain", "Downpour", "Invalid intensity"])
+PM25_BINS = np.array([12, 35.4, 55.4, 150.4, 250.4])
+PM25_LABELS = np.array(["Good", "Moderate", "Unhealthy for Sensitive", "Unhealthy", "Very Unhealthy", "Hazardous"])
+
+
+def process_agent_data_batch(
+        agent_data_batch: List[AgentData],
+) -> List[ProcessedAgentData]:
+    """
+    Same classification as process_agent_data for a whole batch at once.
+    Rain, traffic light and air quality states are computed column-wise with
+    NumPy; road state stays sequential since it depends on each user's history.
+    Detectors that hold readings back (the peaks engine) return them with a
+    later batch, so the result may be shorter or longer than the input.
+    """
+    labelled = [pair for agent_data in agent_data_batch for pair in label_road_state(agent_data)]
+    labelled.extend(released_road_states)
+    released_road_states.clear()
+    return process_labelled_agent_data(labelled)
+
+
+def flush_road_states() -> List[ProcessedAgentData]:
+    """Process the readings every detector still holds back, e.g. at shutdown"""
+    for detector, _ in road_state_detectors.detectors.values():
+        release_road_states(detector)
+    road_state_detectors.clear()
+    labelled = list(released_road_states)
+    released_road_states.clear()
+    return process_labelled_agent_data(labelled)
+
+
+def process_labelled_agent_data(labelled: List[Tuple[AgentData, str]]) -> List[ProcessedAgentData]:
+    if not labelled:
+        return []
+    agent_data_batch = [agent_data for agent_data, _ in labelled]
+    road_states = [road_state for _, road_state in labelled]
+    rain_states = classify_rain(np.array([data.rain.intensity for data in agent_data_batch], dtype=float))
+    traffic_light_states = classify_traffic_light(
+        np.array([data.traffic_light.state for data in agent_data_batch]),
+        np.array([data.traffic_light.duration for data in agent_data_batch]),
+    )
+    air_quality_states = classify_air_quality(
+        np.array([data.air_quality.pm25 for data in agent_data_batch], dtype=float)
+    )
+    processed = [
+        ProcessedAgentData.model_construct(
+            road_state=road_state,
+            rain_state=rain_state,
+            traffic_light_state=traffic_light_state,
+            air_quality_state=air_quality_state,
+            agent_data=agent_data,
+        )
+        for road_state, rain_state, traffic_light_state, air_quality_state, agent_data in zip(
+            road_states,
+            rain_states.tolist(),
+            traffic_light_states.tolist(),
+            air_quality_states.tolist(),
+            agent_data_batch,
+        )
+    ]
+    logging.debug("Processed batch of %s agent data", len(processed))
+    return processed
+
+
+def classify_rain(intensity: np.ndarray) -> np.ndarray:
+    classes = np.digitize(intensity, RAIN_BINS, right=True)
+    # Negative intensities would land in "Clear"; NaN already lands past the last bin
+    classes[intensity < 0] = len(RAIN_BINS)
+    return RAIN_LABELS[classes]
+
+
+def classify_traffic_light(state: np.ndarray, duration: np.ndarray) -> np.ndarray:
+    green = state == "green"
+    return np.select(
+        [green & (duration > 10), green | (state == "yellow")],
+        ["Safe to go", "Caution"],
+        default="Stop",
+    )
 
-    if len(data_points) > MAX_DATA_POINTS:
-        data_points.pop(0)
 
-    if len(data_points) < 2:
-        return "Not enough data"
+def classify_air_quality(pm25: np.ndarray) -> np.ndarray:
+    return PM25_LABELS[np.digitize(pm25, PM25_BINS, right=True)]
 
-    last_point = data_points[-1]
-    prev_points = data_points[:-1]
 
-    is_upper_anomaly = all(
-        last_point.z > prev_point.z * (1 + ANOMALY_THRESHOLD) for prev_point in prev_points)
-    is_lower_anomaly = all(
-        last_point.z < prev_point.z * (1 - ANOMALY_THRESHOLD) for prev_point in prev_points)
+def process_road_state(agent_data: AgentData):
+    detector = road_state_detectors.get(agent_data.user_id)
+    return detector.update(agent_data.accelerometer.z)
 
-    if is_upper_anomaly:
-        road_state = "Speeding bump"
-    elif is_lower_anomaly:
-        road_state = "Pit"
-    else:
-        road_state = "Even"
 
-    return road_state
+def label_road_state(agent_data: AgentData) -> List[Tuple[AgentData, str]]:
+    """(agent data, road state) of the readings whose road state is known now"""
+    detector = road_state_detectors.get(agent_data.user_id)
+    label = getattr(detector, "label", None)
+    if label is None:
+        return [(agent_data, detector.update(agent_data.accelerometer.z))]
+    return label(agent_data, agent_data.accelerometer.z)
+
 
 def process_rain_state(agent_data: AgentData):
     intensity = agent_data.rain.intensity
@@ -0,0 +1,43 @@
+import logging
+from collections import OrderedDict
+from typing import Optional, Union
+
+from app.entities.agent_data import AgentData, AgentDataDelta
+
+SENSOR_FIELDS = ("accelerometer", "gps", "rain", "traffic_light", "air_quality", "temperature")
+
+
+class AgentDataReconstructor:
+    """
+    Rebuilds full AgentData records from dead-band compressed messages.
+    Keeps the last full record of every user (bounded, least recently seen
+    users are evicted) and applies each delta on top of it.
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self.last_records = OrderedDict()
+
+    def reconstruct(self, message: Union[AgentData, AgentDataDelta]) -> Optional[AgentData]:
+        """
+        Returns the full record, or None for a delta whose keyframe is unknown
+        (e.g. the edge restarted); such deltas are dropped until the next keyframe.
+        """
+        if isinstance(message, AgentDataDelta):
+            previous = self.last_records.get(message.user_id)
+            if previous is None:
+                logging.debug("Dropping delta for user %s without keyframe", message.user_id)
+                return None
+            update = {"timestamp": message.timestamp}
+            for field in SENSOR_FIELDS:
+                value = getattr(message, field)
+                if value is not None:
+                    update[field] = value
+            record = previous.model_copy(update=update)
+        else:
+            record = message
+        self.last_records[record.user_id] = record
+        self.last_records.move_to_end(record.user_id)
+        if len(self.last_records) > self.max_users:
+            self.last_records.popitem(last=False)
+        return record
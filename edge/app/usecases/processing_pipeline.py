@@ -0,0 +1,243 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+import config
+from logging_config import LogSampler
+from app.adapters.agent_payload_decoder import decode_agent_payload
+from app.entities.processed_agent_data import ProcessedAgentData
+from app.interfaces.hub_gateway import HubGateway
+from app.usecases.bounded_queue import BoundedQueue
+from app.usecases.data_processing import flush_road_states, process_agent_data_batch
+from app.usecases.delta_reconstruction import AgentDataReconstructor
+
+
+# Per-message logs are sampled, logging every message costs more than processing it
+received_log_sampler = LogSampler(config.LOG_SAMPLE_EVERY)
+
+
+class AgentPayloadHandler:
+    """
+    Turns a raw agent MQTT payload into ProcessedAgentData.
+
+    decode() is stateless and may run on any worker; process() updates
+    per-user state (delta reconstruction, road state) and must see the
+    messages in arrival order. Road state detectors may hold readings back
+    and return them from a later process() call; flush() returns what they
+    still hold once no more messages arrive.
+    """
+
+    def __init__(self, reconstructor: AgentDataReconstructor = None):
+        self.reconstructor = reconstructor or AgentDataReconstructor()
+
+    def decode(self, payload: bytes) -> list:
+        # Single or batched, JSON or binary
+        return decode_agent_payload(payload)
+
+    def process(self, messages: list) -> List[ProcessedAgentData]:
+        agent_data_batch = []
+        for message in messages:
+            agent_data = self.reconstructor.reconstruct(message)
+            if agent_data is None:
+                continue
+            if received_log_sampler():
+                logging.info("Received agent data: %s from topic: %s", agent_data, config.MQTT_TOPIC)
+            agent_data_batch.append(agent_data)
+        # Batched payloads are classified in one go
+        return process_agent_data_batch(agent_data_batch)
+
+    def flush(self) -> List[ProcessedAgentData]:
+        return flush_road_states()
+
+
+class Sequencer:
+    """Lets workers enter a critical section strictly in sequence number order"""
+
+    def __init__(self):
+        self.next = 0
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def turn(self, sequence: int):
+        with self.condition:
+            self.condition.wait_for(lambda: self.next == sequence)
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.next += 1
+                self.condition.notify_all()
+
+
+class HubForwarder:
+    """
+    Sends processed data to the hub from a background thread, grouped into
+    batches of up to batch_size records or whatever arrived within
+    flush_interval seconds. submit() blocks while maxsize records are
+    waiting, which slows the workers down instead of growing memory.
+    """
+
+    _STOP = object()
+
+    def __init__(self, hub_gateway: HubGateway, batch_size: int = 50, flush_interval: float = 1.0, maxsize: int = 1000):
+        self.hub_gateway = hub_gateway
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize)
+        self.thread = None
+        # Metrics
+        self.forwarded = 0
+        self.failed = 0
+        self.batches = 0
+
+    def submit(self, processed_batch: List[ProcessedAgentData]):
+        for processed_data in processed_batch:
+            self.queue.put(processed_data)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="hub-forwarder", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Send whatever is queued and stop the thread"""
+        if self.thread is not None:
+            self.queue.put(self._STOP)
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is self._STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+
+    def _flush(self, batch: List[ProcessedAgentData]):
+        if not batch:
+            return
+        try:
+            saved = self.hub_gateway.save_batch(batch)
+        except Exception as e:
+            logging.error("Error sending batch to hub: %s", e)
+            saved = False
+        self.batches += 1
+        if saved:
+            self.forwarded += len(batch)
+        else:
+            self.failed += len(batch)
+            logging.error("Hub is not available")
+
+    def metrics(self) -> dict:
+        return {
+            "depth": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "batches": self.batches,
+            "forwarded": self.forwarded,
+            "failed": self.failed,
+        }
+
+
+class ProcessingPipeline:
+    """
+    Moves agent message handling off the MQTT network thread.
+
+    submit() only puts the raw payload into a BoundedQueue. A pool of
+    worker threads decodes and validates payloads in parallel, then runs
+    the stateful processing and hands the results to a HubForwarder, which
+    talks to the hub in batches, both in arrival order.
+    """
+
+    def __init__(
+        self,
+        hub_gateway: HubGateway,
+        handler: AgentPayloadHandler = None,
+        workers: int = 4,
+        queue_size: int = 1000,
+        policy: str = "block",
+        spill_path: Optional[str] = None,
+        hub_batch_size: int = 50,
+        hub_flush_interval: float = 1.0,
+        metrics_interval: Optional[float] = None,
+    ):
+        self.handler = handler or AgentPayloadHandler()
+        self.queue = BoundedQueue(queue_size, policy, spill_path)
+        self.forwarder = HubForwarder(hub_gateway, hub_batch_size, hub_flush_interval, queue_size)
+        self.sequencer = Sequencer()
+        self.workers = workers
+        self.metrics_interval = metrics_interval
+        self.threads = []
+        self.stopped = threading.Event()
+
+    def submit(self, payload: bytes) -> bool:
+        """Called from the MQTT thread; False if the payload was rejected"""
+        return self.queue.put(payload)
+
+    def start(self):
+        self.forwarder.start()
+        self.threads = [
+            threading.Thread(target=self._work, name=f"edge-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        if self.metrics_interval:
+            self.threads.append(threading.Thread(target=self._report, name="edge-metrics", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """Finish the queued payloads, flush the handler and the hub forwarder and stop"""
+        self.queue.close()
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        flushed = self.handler.flush()
+        if flushed:
+            self.forwarder.submit(flushed)
+        self.forwarder.stop()
+        self.queue.release()
+
+    def metrics(self) -> dict:
+        return {"queue": self.queue.metrics(), "hub": self.forwarder.metrics()}
+
+    def _work(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                return
+            sequence, payload = entry
+            messages = []
+            try:
+                messages = self.handler.decode(payload)
+            except Exception as e:
+                logging.info("Error processing MQTT message: %s", e)
+            # Always take the turn, even for invalid payloads, so later ones are not held up
+            with self.sequencer.turn(sequence):
+                try:
+                    processed = self.handler.process(messages)
+                except Exception as e:
+                    logging.info("Error processing MQTT message: %s", e)
+                    processed = []
+                # Submitted within the turn, so results reach the hub in arrival order. While
+                # the forwarder is full this holds up the other workers too.
+                if processed:
+                    self.forwarder.submit(processed)
+
+    def _report(self):
+        while not self.stopped.wait(self.metrics_interval):
+            logging.info("Edge pipeline metrics: %s", self.metrics())
@@ -0,0 +1,110 @@
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+MAX_DATA_POINTS = 5
+ANOMALY_THRESHOLD = 0.01
+
+
+class RoadStateDetector:
+    """
+    Road state of a single vehicle from its accelerometer z values.
+
+    The last reading is compared against the previous MAX_DATA_POINTS - 1
+    readings: it is a bump if it exceeds every one of them by more than the
+    threshold and a pit if it is below every one of them. Since
+    z * (1 + threshold) grows with z, "greater than all" only has to be
+    checked against the window maximum (and "less than all" against the
+    minimum), which are kept in monotonic deques so every update is O(1).
+    """
+
+    def __init__(self, window: int = MAX_DATA_POINTS, threshold: float = ANOMALY_THRESHOLD):
+        self.window = window - 1
+        self.threshold = threshold
+        self.count = 0
+        # (index, z) pairs of the previous readings, z decreasing / increasing
+        self.maxima = deque()
+        self.minima = deque()
+
+    def update(self, z: float) -> str:
+        if not self.maxima:
+            road_state = "Not enough data"
+        elif z > self.maxima[0][1] * (1 + self.threshold):
+            road_state = "Speeding bump"
+        elif z < self.minima[0][1] * (1 - self.threshold):
+            road_state = "Pit"
+        else:
+            road_state = "Even"
+        self._push(z)
+        return road_state
+
+    def _push(self, z: float):
+        index = self.count
+        self.count += 1
+        while self.maxima and self.maxima[-1][1] <= z:
+            self.maxima.pop()
+        self.maxima.append((index, z))
+        while self.minima and self.minima[-1][1] >= z:
+            self.minima.pop()
+        self.minima.append((index, z))
+        oldest = index - self.window
+        if self.maxima[0][0] <= oldest:
+            self.maxima.popleft()
+        if self.minima[0][0] <= oldest:
+            self.minima.popleft()
+
+
+class RoadStateDetectorRegistry:
+    """
+    One detector per user_id so the accelerometer streams of different
+    vehicles never mix. Bounded: the least recently seen user is evicted
+    once there are more than max_users, and users idle for longer than
+    ttl seconds are dropped. on_evict(detector) is called for every
+    dropped detector.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], RoadStateDetector] = RoadStateDetector,
+        max_users: int = 10000,
+        ttl: Optional[float] = 3600,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[object], None]] = None,
+    ):
+        self.factory = factory
+        self.max_users = max_users
+        self.ttl = ttl
+        self.clock = clock
+        self.on_evict = on_evict
+        # user_id -> (detector, last seen), least recently seen first
+        self.detectors = OrderedDict()
+
+    def __len__(self):
+        return len(self.detectors)
+
+    def get(self, user_id: int) -> RoadStateDetector:
+        now = self.clock()
+        entry = self.detectors.pop(user_id, None)
+        detector = entry[0] if entry is not None else self.factory()
+        self.detectors[user_id] = (detector, now)
+        self._evict(now)
+        return detector
+
+    def _evict(self, now: float):
+        while len(self.detectors) > self.max_users:
+            self._drop_oldest()
+        if self.ttl is None:
+            return
+        while self.detectors:
+            _, last_seen = next(iter(self.detectors.values()))
+            if now - last_seen <= self.ttl:
+                break
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        _, (detector, _) = self.detectors.popitem(last=False)
+        if self.on_evict is not None:
+            self.on_evict(detector)
+
+    def clear(self):
+        self.detectors.clear()
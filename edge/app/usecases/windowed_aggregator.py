@@ -0,0 +1,142 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from app.entities.agent_data_summary import AgentDataSummary, FieldSummary
+from app.entities.processed_agent_data import ProcessedAgentData
+
+# Records with these road states are always forwarded as they are
+ANOMALY_ROAD_STATES = ("Pit", "Speeding bump")
+# alongside: raw records and summaries, instead: summaries and anomalies only
+AGGREGATION_MODES = ("alongside", "instead")
+
+
+def utc(timestamp: datetime) -> datetime:
+    """Naive UTC, as the agent sends it, so naive and aware timestamps compare"""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class FieldAccumulator:
+    def __init__(self):
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.total = 0.0
+
+    def add(self, value: float):
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.total += value
+
+    def summary(self, count: int) -> FieldSummary:
+        return FieldSummary(min=self.min, max=self.max, mean=self.total / count)
+
+
+class Window:
+    """Running statistics of one user in one window"""
+
+    def __init__(self, user_id: int, start: datetime, end: datetime):
+        self.user_id = user_id
+        self.start = start
+        self.end = end
+        # Bounds to compare record timestamps against
+        self.utc_start = utc(start)
+        self.utc_end = utc(end)
+        self.count = 0
+        self.z = FieldAccumulator()
+        self.pm25 = FieldAccumulator()
+        self.temperature = FieldAccumulator()
+        self.road_states = Counter()
+
+    def add(self, processed_data: ProcessedAgentData):
+        agent_data = processed_data.agent_data
+        self.count += 1
+        self.z.add(agent_data.accelerometer.z)
+        self.pm25.add(agent_data.air_quality.pm25)
+        self.temperature.add(agent_data.temperature)
+        self.road_states[processed_data.road_state] += 1
+
+    def summary(self) -> AgentDataSummary:
+        return AgentDataSummary(
+            user_id=self.user_id,
+            window_start=self.start,
+            window_end=self.end,
+            count=self.count,
+            z=self.z.summary(self.count),
+            pm25=self.pm25.summary(self.count),
+            temperature=self.temperature.summary(self.count),
+            road_states=dict(self.road_states),
+        )
+
+
+class WindowedAggregator:
+    """
+    Per-user tumbling windows of window seconds over the record timestamps.
+
+    add() returns the records to forward as they are and the summaries of
+    the windows that were closed. A user's window is closed by the first
+    record of that user in a later window, or once the newest timestamp
+    seen from any user is a full window past its end, so vehicles that
+    went silent do not keep theirs open. Records older than the user's open
+    window are forwarded as they are. flush() closes every open window.
+    Naive timestamps are taken as UTC; a window keeps the time zone of the
+    record that opened it.
+    """
+
+    def __init__(self, window: float = 10, mode: str = "alongside"):
+        if mode not in AGGREGATION_MODES:
+            raise ValueError(f"Unknown aggregation mode {mode!r}, expected one of {', '.join(AGGREGATION_MODES)}")
+        self.window = timedelta(seconds=window)
+        self.mode = mode
+        self.windows: Dict[int, Window] = {}
+        self.watermark = None
+        self.next_expiry = None
+
+    def add(
+        self, processed_batch: List[ProcessedAgentData]
+    ) -> Tuple[List[ProcessedAgentData], List[AgentDataSummary]]:
+        raw, summaries = [], []
+        for processed_data in processed_batch:
+            agent_data = processed_data.agent_data
+            timestamp = agent_data.timestamp
+            utc_timestamp = utc(timestamp)
+            window = self.windows.get(agent_data.user_id)
+            if window is not None and utc_timestamp >= window.utc_end:
+                summaries.append(window.summary())
+                window = None
+            if window is None:
+                start = self._window_start(timestamp)
+                window = self.windows[agent_data.user_id] = Window(agent_data.user_id, start, start + self.window)
+            if utc_timestamp < window.utc_start:
+                raw.append(processed_data)
+                continue
+            window.add(processed_data)
+            if self.mode == "alongside" or processed_data.road_state in ANOMALY_ROAD_STATES:
+                raw.append(processed_data)
+            if self.watermark is None or utc_timestamp > self.watermark:
+                self.watermark = utc_timestamp
+        summaries.extend(self._expire())
+        return raw, summaries
+
+    def flush(self) -> List[AgentDataSummary]:
+        summaries = [window.summary() for window in self.windows.values()]
+        self.windows.clear()
+        return summaries
+
+    def _window_start(self, timestamp: datetime) -> datetime:
+        # Works for naive and aware timestamps alike
+        since_epoch = timestamp - datetime(1970, 1, 1, tzinfo=timestamp.tzinfo)
+        return timestamp - since_epoch % self.window
+
+    def _expire(self) -> List[AgentDataSummary]:
+        """Close windows that ended at least a window before the watermark"""
+        if self.watermark is None:
+            return []
+        if self.next_expiry is not None and self.watermark < self.next_expiry:
+            return []
+        limit = self.watermark - self.window
+        expired = [user_id for user_id, window in self.windows.items() if window.utc_end <= limit]
+        # Scan again once the watermark has moved on by another window
+        self.next_expiry = self._window_start(self.watermark) + self.window
+        return [self.windows.pop(user_id).summary() for user_id in expired]
@@ -0,0 +1,117 @@
+"""
+Microbenchmark of AgentData validation cost per message on the edge.
+
+Run from edge/:
+    python bench_validation.py [number_of_messages]
+"""
+import json
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from pydantic_core import from_json
+
+from app.adapters.agent_payload_decoder import (
+    BINARY_HEADER,
+    BINARY_RECORD,
+    BINARY_VERSION,
+    EPOCH,
+    decode_agent_payload,
+)
+from app.entities.agent_data import (
+    AccelerometerData,
+    AgentData,
+    AirQualityData,
+    GpsData,
+    RainData,
+    TrafficLightData,
+)
+
+
+def bench(label, func, payloads):
+    seconds = timeit.timeit(lambda: [func(payload) for payload in payloads], number=1)
+    per_message = seconds / len(payloads) * 1e6
+    print(f"{label:<46} {per_message:8.2f} us/msg  {len(payloads) / seconds:10.0f} msg/s")
+    return per_message
+
+
+def agent_message(rng: random.Random, user_id: int, timestamp: datetime) -> dict:
+    """Random reading in the JSON shape published by the agent"""
+    return {
+        "accelerometer": {"x": rng.randint(-500, 500), "y": rng.randint(-500, 500), "z": rng.randint(15000, 18000)},
+        "gps": {"longitude": rng.uniform(30, 31), "latitude": rng.uniform(50, 51)},
+        "parking": {"empty_count": rng.randint(0, 50), "gps": {"longitude": 30.5, "latitude": 50.4}},
+        "rain": {"intensity": rng.random()},
+        "traffic_light": {
+            "state": rng.choice(["red", "yellow", "green"]),
+            "duration": rng.randint(0, 60),
+            "gps": {"longitude": 30.5, "latitude": 50.4},
+        },
+        "air_quality": {"pm25": rng.uniform(0, 100), "pm10": rng.uniform(0, 150), "co2": rng.uniform(400, 600)},
+        "temperature": rng.uniform(-10, 35),
+        "timestamp": timestamp.isoformat(),
+        "user_id": user_id,
+    }
+
+
+def binary_payload(message: dict) -> bytes:
+    timestamp = datetime.fromisoformat(message["timestamp"])
+    return bytes(BINARY_HEADER.pack(BINARY_VERSION, 1)) + BINARY_RECORD.pack(
+        message["user_id"], (timestamp - EPOCH) // timedelta(microseconds=1),
+        *message["accelerometer"].values(),
+        message["gps"]["longitude"], message["gps"]["latitude"],
+        message["parking"]["empty_count"], 30.5, 50.4,
+        message["rain"]["intensity"],
+        ["red", "yellow", "green"].index(message["traffic_light"]["state"]),
+        message["traffic_light"]["duration"], 30.5, 50.4,
+        *message["air_quality"].values(),
+        message["temperature"],
+    )
+
+
+def construct_unvalidated(payload: bytes) -> AgentData:
+    """What a "trusted source" mode skipping validation would have to do"""
+    data = from_json(payload)
+    traffic_light = data["traffic_light"]
+    return AgentData.model_construct(
+        user_id=data["user_id"],
+        accelerometer=AccelerometerData.model_construct(**data["accelerometer"]),
+        gps=GpsData.model_construct(**data["gps"]),
+        rain=RainData.model_construct(**data["rain"]),
+        traffic_light=TrafficLightData.model_construct(
+            state=traffic_light["state"],
+            duration=traffic_light["duration"],
+            gps=GpsData.model_construct(**traffic_light["gps"]),
+        ),
+        air_quality=AirQualityData.model_construct(**data["air_quality"]),
+        temperature=data["temperature"],
+        timestamp=datetime.fromisoformat(data["timestamp"]),
+    )
+
+
+def main(number=20000):
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    messages = [agent_message(rng, i % 100, start + timedelta(seconds=i)) for i in range(number)]
+    payloads = [json.dumps(message).encode() for message in messages]
+    binary_payloads = [binary_payload(message) for message in messages]
+    assert decode_agent_payload(payloads[0]) == [construct_unvalidated(payloads[0])]
+    assert decode_agent_payload(payloads[0]) == decode_agent_payload(binary_payloads[0])
+
+    print(f"Validating {number} agent messages")
+    baseline = bench(
+        "model_validate_json on decoded str",
+        lambda p: AgentData.model_validate_json(p.decode("utf-8"), strict=True),
+        payloads,
+    )
+    bench("model_validate_json on bytes", lambda p: AgentData.model_validate_json(p, strict=True), payloads)
+    validated = bench("decode_agent_payload (cached TypeAdapter)", decode_agent_payload, payloads)
+    bench("decode_agent_payload, binary", decode_agent_payload, binary_payloads)
+    unvalidated = bench("from_json + model_construct, no validation", construct_unvalidated, payloads)
+    print(f"Cached TypeAdapter vs decoded str: {baseline / validated:.2f}x, "
+          f"vs skipping validation: {unvalidated / validated:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -8,6 +8,13 @@ def try_parse_int(value: str):
         return None
 
 
+def try_parse_float(value: str):
+    try:
+        return float(value)
+    except Exception:
+        return None
+
+
 # Configuration for agent MQTT
 MQTT_BROKER_HOST = os.environ.get("MQTT_BROKER_HOST") or "localhost"
 MQTT_BROKER_PORT = try_parse_int(os.environ.get("MQTT_BROKER_PORT")) or 1883
@@ -22,3 +29,60 @@ HUB_MQTT_TOPIC = os.environ.get("HUB_MQTT_TOPIC") or "processed_agent_data_topic
 HUB_HOST = os.environ.get("HUB_HOST") or "localhost"
 HUB_PORT = try_parse_int(os.environ.get("HUB_PORT")) or 12000
 HUB_URL = f"http://{HUB_HOST}:{HUB_PORT}"
+
+# Per-user road state detectors: idle users are dropped after ROAD_STATE_TTL
+# seconds, and at most ROAD_STATE_MAX_USERS are kept
+ROAD_STATE_MAX_USERS = try_parse_int(os.environ.get("ROAD_STATE_MAX_USERS")) or 10000
+ROAD_STATE_TTL = try_parse_int(os.environ.get("ROAD_STATE_TTL")) or 3600
+# threshold, zscore, ewma or peaks (the find_peaks detection used offline by MapView).
+# peaks holds a user's readings back until the peaks around them are decided, up
+# to PEAK_WLEN // 2 readings. A silent user's readings go out when its detector
+# expires (ROAD_STATE_TTL, checked on the next message) or at shutdown
+ROAD_STATE_ENGINE = os.environ.get("ROAD_STATE_ENGINE") or "threshold"
+
+# Worker pipeline between the MQTT thread and the hub
+EDGE_WORKERS = try_parse_int(os.environ.get("EDGE_WORKERS")) or 4
+EDGE_QUEUE_SIZE = try_parse_int(os.environ.get("EDGE_QUEUE_SIZE")) or 1000
+# block, drop_oldest or spill
+EDGE_QUEUE_POLICY = os.environ.get("EDGE_QUEUE_POLICY") or "block"
+EDGE_SPILL_PATH = os.environ.get("EDGE_SPILL_PATH") or "edge_spill.bin"
+EDGE_METRICS_INTERVAL = try_parse_float(os.environ.get("EDGE_METRICS_INTERVAL")) or 60
+HUB_BATCH_SIZE = try_parse_int(os.environ.get("HUB_BATCH_SIZE")) or 50
+HUB_FLUSH_INTERVAL = try_parse_float(os.environ.get("HUB_FLUSH_INTERVAL")) or 1.0
+
+# HTTP connection to the Hub
+HUB_CONNECT_TIMEOUT = try_parse_float(os.environ.get("HUB_CONNECT_TIMEOUT")) or 3.05
+HUB_READ_TIMEOUT = try_parse_float(os.environ.get("HUB_READ_TIMEOUT")) or 10
+HUB_POOL_SIZE = try_parse_int(os.environ.get("HUB_POOL_SIZE")) or 10
+
+# threads: paho-mqtt with the worker pipeline, asyncio: aiomqtt and httpx on one event loop
+EDGE_RUNTIME = os.environ.get("EDGE_RUNTIME") or "threads"
+# Concurrent hub requests in the asyncio runtime
+EDGE_MAX_IN_FLIGHT = try_parse_int(os.environ.get("EDGE_MAX_IN_FLIGHT")) or 10
+# Seconds before reconnecting to the broker in the asyncio runtime, doubled up to the max
+MQTT_RECONNECT_INTERVAL = try_parse_float(os.environ.get("MQTT_RECONNECT_INTERVAL")) or 1
+MQTT_RECONNECT_MAX_INTERVAL = try_parse_float(os.environ.get("MQTT_RECONNECT_MAX_INTERVAL")) or 60
+
+# Durable store-and-forward spool for records the hub did not accept
+EDGE_SPOOL = (os.environ.get("EDGE_SPOOL") or "true").lower() in ("1", "true", "yes")
+EDGE_SPOOL_PATH = os.environ.get("EDGE_SPOOL_PATH") or "edge_spool.db"
+EDGE_SPOOL_MAX_RECORDS = try_parse_int(os.environ.get("EDGE_SPOOL_MAX_RECORDS")) or 100000
+EDGE_SPOOL_REPLAY_BATCH = try_parse_int(os.environ.get("EDGE_SPOOL_REPLAY_BATCH")) or 500
+# Records per second sent to the hub while replaying
+EDGE_SPOOL_REPLAY_RATE = try_parse_float(os.environ.get("EDGE_SPOOL_REPLAY_RATE")) or 1000
+EDGE_SPOOL_RETRY_INTERVAL = try_parse_float(os.environ.get("EDGE_SPOOL_RETRY_INTERVAL")) or 5
+
+# Per-user windowed summaries of EDGE_AGGREGATION_WINDOW seconds (threads runtime):
+# off, alongside (raw records and summaries) or instead (summaries and road anomalies only)
+EDGE_AGGREGATION = os.environ.get("EDGE_AGGREGATION") or "off"
+EDGE_AGGREGATION_WINDOW = try_parse_float(os.environ.get("EDGE_AGGREGATION_WINDOW")) or 10
+
+# Logging: written by a background thread to a rotating LOG_FILE.
+# Per-message logs are only written for every LOG_SAMPLE_EVERY-th message (0 disables them)
+LOG_LEVEL = (os.environ.get("LOG_LEVEL") or "INFO").upper()
+LOG_FILE = os.environ.get("LOG_FILE") or "app.log"
+LOG_MAX_BYTES = try_parse_int(os.environ.get("LOG_MAX_BYTES")) or 10 * 1024 * 1024
+LOG_BACKUP_COUNT = try_parse_int(os.environ.get("LOG_BACKUP_COUNT")) or 5
+LOG_SAMPLE_EVERY = try_parse_int(os.environ.get("LOG_SAMPLE_EVERY"))
+if LOG_SAMPLE_EVERY is None:
+    LOG_SAMPLE_EVERY = 100
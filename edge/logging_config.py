@@ -0,0 +1,67 @@
+import itertools
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = "[%(asctime)s] [%(levelname)s] [%(module)s] %(message)s"
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues the record as it is. The stock prepare()
+    formats the message (msg % args, including reprs of the arguments) on
+    the logging thread to make the record picklable, which an in-process
+    queue does not need.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(
+    level: str = "INFO",
+    log_file: str = "app.log",
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+) -> QueueListener:
+    """
+    Route all log records through a queue to a background writer thread.
+
+    Handlers on the root logger only enqueue the record; formatting, the
+    msg % args merge included, and the console / rotating file output
+    happen on the QueueListener thread, so the processing threads never
+    wait on disk I/O. Arguments are therefore rendered a little later, do
+    not log objects that are mutated right after the call. Call stop() on
+    the returned listener at shutdown to flush what is left.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
+    file_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class LogSampler:
+    """
+    Lets every n-th call through, to keep per-message logs on the hot path
+    to a fraction of the traffic. Zero disables the log entirely.
+
+        if received_log_sampler():
+            logging.info("Received agent data: %s", agent_data)
+    """
+
+    def __init__(self, every: int):
+        self.every = every
+        self.counter = itertools.count()
+
+    def __call__(self) -> bool:
+        return self.every > 0 and next(self.counter) % self.every == 0
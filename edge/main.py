@@ -1,7 +1,18 @@
+import asyncio
 import logging
+import signal
+import threading
+
+from app.adapters.agent_async_mqtt_adapter import AgentAsyncMQTTAdapter
+from app.adapters.aggregating_hub_gateway import AggregatingHubGateway
 from app.adapters.agent_mqtt_adapter import AgentMQTTAdapter
+from app.adapters.hub_async_http_adapter import AsyncHubHttpAdapter
 from app.adapters.hub_http_adapter import HubHttpAdapter
 from app.adapters.hub_mqtt_adapter import HubMqttAdapter
+from app.adapters.spooling_hub_gateway import SpoolingHubGateway, SqliteSpool
+from app.usecases.async_hub_forwarder import AsyncHubForwarder
+from app.usecases.processing_pipeline import ProcessingPipeline
+from app.usecases.windowed_aggregator import WindowedAggregator
 from config import (
     MQTT_BROKER_HOST,
     MQTT_BROKER_PORT,
@@ -10,21 +21,82 @@ from config import (
     HUB_MQTT_BROKER_HOST,
     HUB_MQTT_BROKER_PORT,
     HUB_MQTT_TOPIC,
+    EDGE_WORKERS,
+    EDGE_QUEUE_SIZE,
+    EDGE_QUEUE_POLICY,
+    EDGE_SPILL_PATH,
+    EDGE_METRICS_INTERVAL,
+    HUB_BATCH_SIZE,
+    HUB_FLUSH_INTERVAL,
+    HUB_CONNECT_TIMEOUT,
+    HUB_READ_TIMEOUT,
+    HUB_POOL_SIZE,
+    EDGE_RUNTIME,
+    EDGE_MAX_IN_FLIGHT,
+    MQTT_RECONNECT_INTERVAL,
+    MQTT_RECONNECT_MAX_INTERVAL,
+    EDGE_SPOOL,
+    EDGE_SPOOL_PATH,
+    EDGE_SPOOL_MAX_RECORDS,
+    EDGE_SPOOL_REPLAY_BATCH,
+    EDGE_SPOOL_REPLAY_RATE,
+    EDGE_SPOOL_RETRY_INTERVAL,
+    EDGE_AGGREGATION,
+    EDGE_AGGREGATION_WINDOW,
+    LOG_LEVEL,
+    LOG_FILE,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
 )
+from logging_config import configure_logging
 
-if __name__ == "__main__":
-    # Configure logging settings
-    logging.basicConfig(
-        level=logging.INFO,  # Set the log level to INFO (you can use logging.DEBUG for more detailed logs)
-        format="[%(asctime)s] [%(levelname)s] [%(module)s] %(message)s",
-        handlers=[
-            logging.StreamHandler(),  # Output log messages to the console
-            logging.FileHandler("app.log"),  # Save log messages to a file
-        ],
-    )
+
+def install_stop_handlers(stop):
+    """Call stop() on SIGINT / SIGTERM"""
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop())
+
+
+def run_threads():
     # Create an instance of the StoreApiAdapter using the configuration
+    # Batches are formed by the pipeline's hub forwarder, the adapter sends each one right away
     hub_adapter = HubHttpAdapter(
         api_base_url=HUB_URL,
+        connect_timeout=HUB_CONNECT_TIMEOUT,
+        read_timeout=HUB_READ_TIMEOUT,
+        pool_size=HUB_POOL_SIZE,
+    )
+    spooling_gateway = None
+    if EDGE_SPOOL:
+        # Keep records on disk while the hub is unavailable and replay them later
+        spooling_gateway = SpoolingHubGateway(
+            hub_gateway=hub_adapter,
+            spool=SqliteSpool(EDGE_SPOOL_PATH, EDGE_SPOOL_MAX_RECORDS),
+            replay_batch_size=EDGE_SPOOL_REPLAY_BATCH,
+            replay_rate=EDGE_SPOOL_REPLAY_RATE,
+            retry_interval=EDGE_SPOOL_RETRY_INTERVAL,
+        )
+        spooling_gateway.start()
+    hub_gateway = hub_adapter if spooling_gateway is None else spooling_gateway
+    aggregating_gateway = None
+    if EDGE_AGGREGATION != "off":
+        # Forward per-user window summaries, with or without the raw records
+        aggregating_gateway = AggregatingHubGateway(
+            hub_gateway=hub_gateway,
+            aggregator=WindowedAggregator(EDGE_AGGREGATION_WINDOW, EDGE_AGGREGATION),
+        )
+        hub_gateway = aggregating_gateway
+
+    # Validation, processing and hub forwarding run on worker threads
+    pipeline = ProcessingPipeline(
+        hub_gateway=hub_gateway,
+        workers=EDGE_WORKERS,
+        queue_size=EDGE_QUEUE_SIZE,
+        policy=EDGE_QUEUE_POLICY,
+        spill_path=EDGE_SPILL_PATH,
+        hub_batch_size=HUB_BATCH_SIZE,
+        hub_flush_interval=HUB_FLUSH_INTERVAL,
+        metrics_interval=EDGE_METRICS_INTERVAL,
     )
 
     # Create an instance of the AgentMQTTAdapter using the configuration
@@ -32,16 +104,69 @@ if __name__ == "__main__":
         broker_host=MQTT_BROKER_HOST,
         broker_port=MQTT_BROKER_PORT,
         topic=MQTT_TOPIC,
+        hub_gateway=hub_gateway,
+        pipeline=pipeline,
+    )
+    stopped = threading.Event()
+    install_stop_handlers(stopped.set)
+    # Connect to the MQTT broker and start listening for messages
+    agent_adapter.connect()
+    agent_adapter.start()
+    # Sleep until a signal arrives instead of spinning
+    stopped.wait()
+    # Stop the MQTT adapter and exit gracefully
+    agent_adapter.stop()
+    if aggregating_gateway is not None:
+        aggregating_gateway.flush()
+    if spooling_gateway is not None:
+        spooling_gateway.stop()
+    hub_adapter.close()
+    logging.info("System stopped.")
+
+
+async def run_async():
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+
+    hub_adapter = AsyncHubHttpAdapter(
+        api_base_url=HUB_URL,
+        connect_timeout=HUB_CONNECT_TIMEOUT,
+        read_timeout=HUB_READ_TIMEOUT,
+        max_connections=EDGE_MAX_IN_FLIGHT,
+    )
+    forwarder = AsyncHubForwarder(
         hub_gateway=hub_adapter,
+        batch_size=HUB_BATCH_SIZE,
+        flush_interval=HUB_FLUSH_INTERVAL,
+        max_in_flight=EDGE_MAX_IN_FLIGHT,
+    )
+    agent_adapter = AgentAsyncMQTTAdapter(
+        broker_host=MQTT_BROKER_HOST,
+        broker_port=MQTT_BROKER_PORT,
+        topic=MQTT_TOPIC,
+        forwarder=forwarder,
+        queue_size=EDGE_QUEUE_SIZE,
+        reconnect_interval=MQTT_RECONNECT_INTERVAL,
+        max_reconnect_interval=MQTT_RECONNECT_MAX_INTERVAL,
     )
     try:
-        # Connect to the MQTT broker and start listening for messages
-        agent_adapter.connect()
-        agent_adapter.start()
-        # Keep the system running indefinitely (you can add other logic as needed)
-        while True:
-            pass
-    except KeyboardInterrupt:
-        # Stop the MQTT adapter and exit gracefully if interrupted by the user
-        agent_adapter.stop()
-        logging.info("System stopped.")
+        # Returns once a signal arrived and every pending hub request finished
+        await agent_adapter.run(stopped)
+    finally:
+        await hub_adapter.close()
+    logging.info("System stopped.")
+
+
+if __name__ == "__main__":
+    # Log records are written by a background thread to a rotating file
+    log_listener = configure_logging(LOG_LEVEL, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT)
+    try:
+        if EDGE_RUNTIME == "asyncio":
+            asyncio.run(run_async())
+        else:
+            run_threads()
+    finally:
+        log_listener.stop()
+
@@ -0,0 +1,210 @@
+import logging
+from typing import List, Tuple
+
+from redis.exceptions import ResponseError
+
+# One stream entry: (entry id, serialized record)
+Entry = Tuple[bytes, bytes]
+
+PAYLOAD_FIELD = b"data"
+# Failed store writes of the record before it was put back into the stream
+ATTEMPTS_FIELD = b"attempts"
+REASON_FIELD = b"reason"
+
+
+class RedisStreamBuffer:
+    """
+    Buffer of serialized records in a Redis stream, read through a consumer
+    group so that several hub replicas share the entries.
+
+    Every entry read by a consumer stays pending until ack() is called
+    after the store accepted it; ack() also deletes it, so the stream only
+    holds unprocessed records. Entries a consumer read but never
+    acknowledged (e.g. after a crash) are taken over with claim_stale()
+    once they have been idle for min_idle seconds, which gives
+    at-least-once delivery; a consumer that needs longer than that calls
+    touch() on the entries it still holds. Entries that keep failing are
+    moved to a separate dead letter stream, capped at about
+    dead_letter_maxlen entries, from which they can be inspected and
+    replayed. Works with the redis.asyncio client.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        stream: str = "processed_agent_data",
+        group: str = "hub",
+        consumer: str = "hub",
+        min_idle: float = 30,
+        dead_letter_stream: str = None,
+        dead_letter_maxlen: int = 100000,
+    ):
+        self.redis_client = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.min_idle = min_idle
+        self.dead_letter_stream = dead_letter_stream or f"{stream}:dead"
+        self.dead_letter_maxlen = dead_letter_maxlen
+        self.claim_cursor = "0-0"
+        # Failed attempts of the entries this consumer holds, by entry id
+        self.attempts = {}
+
+    async def ensure_group(self):
+        """Create the stream and the consumer group unless they exist"""
+        try:
+            await self.redis_client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def append(self, payloads: List[str]):
+        """Add payloads to the stream in one round trip"""
+        if not payloads:
+            return
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for payload in payloads:
+            pipeline.xadd(self.stream, {PAYLOAD_FIELD: payload})
+        await pipeline.execute()
+
+    async def read(self, count: int, block: float = None) -> List[Entry]:
+        """
+        Up to count entries no consumer of the group has read yet, waiting
+        at most block seconds for the first one.
+        """
+        response = await self.redis_client.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: ">"},
+            count=count,
+            block=None if block is None else max(int(block * 1000), 1),
+        )
+        if not response:
+            return []
+        return self._entries(response[0][1])
+
+    async def ack(self, entry_ids: List[bytes]):
+        """Mark entries as processed and remove them from the stream"""
+        if not entry_ids:
+            return
+        pipeline = self.redis_client.pipeline(transaction=True)
+        self._remove(pipeline, entry_ids)
+        await pipeline.execute()
+
+    async def requeue(self, entries: List[Entry]):
+        """
+        Put entries back at the end of the stream as new unread entries and
+        acknowledge the originals in one transaction, so any consumer can
+        read them again right away instead of after min_idle.
+        """
+        if not entries:
+            return
+        pipeline = self.redis_client.pipeline(transaction=True)
+        for entry_id, payload in entries:
+            pipeline.xadd(self.stream, {PAYLOAD_FIELD: payload, ATTEMPTS_FIELD: self.failed_attempts(entry_id) + 1})
+        self._remove(pipeline, [entry_id for entry_id, _ in entries])
+        await pipeline.execute()
+
+    def failed_attempts(self, entry_id: bytes) -> int:
+        """How often storing an entry read by this consumer failed before this delivery"""
+        return self.attempts.get(entry_id, 0)
+
+    async def dead_letter(self, entries: List[Entry], reason: str):
+        """Move entries to the dead letter stream in one transaction"""
+        if not entries:
+            return
+        pipeline = self.redis_client.pipeline(transaction=True)
+        for entry_id, payload in entries:
+            pipeline.xadd(
+                self.dead_letter_stream,
+                {PAYLOAD_FIELD: payload, REASON_FIELD: reason, ATTEMPTS_FIELD: self.failed_attempts(entry_id) + 1},
+                maxlen=self.dead_letter_maxlen,
+                approximate=True,
+            )
+        self._remove(pipeline, [entry_id for entry_id, _ in entries])
+        await pipeline.execute()
+        logging.info("Moved %s entries to %s: %s", len(entries), self.dead_letter_stream, reason)
+
+    async def dead_letters(self, count: int, start: str = "-") -> List[dict]:
+        """Up to count dead letters, oldest first, from the entry id start on"""
+        response = await self.redis_client.xrange(self.dead_letter_stream, min=start, count=count)
+        return [
+            {
+                "id": entry_id.decode(),
+                "reason": fields.get(REASON_FIELD, b"").decode(),
+                "attempts": int(fields.get(ATTEMPTS_FIELD, 0)),
+                "data": fields[PAYLOAD_FIELD].decode(),
+            }
+            for entry_id, fields in response
+        ]
+
+    async def replay_dead_letters(self, count: int) -> int:
+        """
+        Move up to count of the oldest dead letters back to the stream with
+        their attempts reset. Returns how many were moved, fewer than count
+        once the dead letter stream is empty.
+        """
+        response = await self.redis_client.xrange(self.dead_letter_stream, count=count)
+        if not response:
+            return 0
+        pipeline = self.redis_client.pipeline(transaction=True)
+        for _, fields in response:
+            pipeline.xadd(self.stream, {PAYLOAD_FIELD: fields[PAYLOAD_FIELD]})
+        pipeline.xdel(self.dead_letter_stream, *[entry_id for entry_id, _ in response])
+        await pipeline.execute()
+        return len(response)
+
+    async def dead_letter_size(self) -> int:
+        """Entries in the dead letter stream"""
+        return await self.redis_client.xlen(self.dead_letter_stream)
+
+    async def claim_stale(self, count: int) -> List[Entry]:
+        """Take over up to count entries that stayed pending for min_idle seconds"""
+        response = await self.redis_client.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=int(self.min_idle * 1000),
+            start_id=self.claim_cursor,
+            count=count,
+        )
+        self.claim_cursor, claimed = response[0], response[1]
+        entries = self._entries([(entry_id, fields) for entry_id, fields in claimed if fields])
+        # Redis 6.2 still returns pending entries that were deleted, without their fields
+        await self.ack([entry_id for entry_id, fields in claimed if not fields])
+        if entries:
+            logging.info("Claimed %s stale entries from %s", len(entries), self.stream)
+        return entries
+
+    async def touch(self, entry_ids: List[bytes]):
+        """
+        Reset the idle time of entries this consumer is still working on,
+        so other consumers do not take them over with claim_stale().
+        """
+        if not entry_ids:
+            return
+        await self.redis_client.xclaim(self.stream, self.group, self.consumer, 0, list(entry_ids), justid=True)
+
+    def claimed_all(self) -> bool:
+        """True once claim_stale() went through the whole pending list"""
+        return self.claim_cursor in (b"0-0", "0-0")
+
+    async def size(self) -> int:
+        """Entries in the stream, read or not, that were not acknowledged yet"""
+        return await self.redis_client.xlen(self.stream)
+
+    async def pending(self) -> int:
+        """Entries read by some consumer but not acknowledged yet"""
+        return (await self.redis_client.xpending(self.stream, self.group))["pending"]
+
+    def _entries(self, messages) -> List[Entry]:
+        for entry_id, fields in messages:
+            if ATTEMPTS_FIELD in fields:
+                self.attempts[entry_id] = int(fields[ATTEMPTS_FIELD])
+        return [(entry_id, fields[PAYLOAD_FIELD]) for entry_id, fields in messages]
+
+    def _remove(self, pipeline, entry_ids: List[bytes]):
+        pipeline.xack(self.stream, self.group, *entry_ids)
+        pipeline.xdel(self.stream, *entry_ids)
+        for entry_id in entry_ids:
+            self.attempts.pop(entry_id, None)
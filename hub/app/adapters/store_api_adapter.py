@@ -1,42 +1,97 @@
-import json
 import logging
+import random
+import time
 from typing import List
 
-import pydantic_core
 import requests
+from pydantic import TypeAdapter
+from requests.adapters import HTTPAdapter
 
+from app.entities.agent_data_summary import AgentDataSummary
 from app.entities.processed_agent_data import ProcessedAgentData
 from app.interfaces.store_gateway import StoreGateway
 
+processed_agent_data_batch_adapter = TypeAdapter(List[ProcessedAgentData])
+agent_data_summary_batch_adapter = TypeAdapter(List[AgentDataSummary])
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
 
 class StoreApiAdapter(StoreGateway):
-    def __init__(self, api_base_url):
+    """
+    Sends batches to the Store API over one pooled keep-alive session.
+
+    Up to pool_size requests can run at once from different threads.
+    Connection errors, timeouts and 429 / 5xx responses are retried up to
+    max_retries times with exponential backoff (backoff, 2 * backoff, ...
+    capped at max_backoff, each randomly shortened by up to half so that
+    hub replicas do not retry in lockstep). Other responses are not
+    retried.
+    """
+
+    def __init__(
+        self,
+        api_base_url,
+        pool_size: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10,
+        sleep=time.sleep,
+    ):
         self.api_base_url = api_base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
 
     def save_data(self, processed_agent_data_batch: List[ProcessedAgentData]):
         """
         Save the processed road data to the Store API.
         Parameters:
-            processed_agent_data_batch (dict): Processed road data to be saved.
+            processed_agent_data_batch (List[ProcessedAgentData]): Processed road data to be saved.
         Returns:
             bool: True if the data is successfully saved, False otherwise.
         """
-        # Implement it
-        try:
-            # Convert the processed agent data to JSON
-            data = [data.dict() for data in processed_agent_data_batch]
-
-            # Make a POST request to the Store API endpoint with the processed data
-            # response = requests.post(f"{self.api_base_url}/processed_agent_data", json=data)
-            response = requests.post(f"{self.api_base_url}/processed_agent_data", data=json.dumps(
-                processed_agent_data_batch, default=pydantic_core.to_jsonable_python))
-
-            # Check if the request was successful (status code 200)
-            if response.status_code == 200:
-                return True
+        if not processed_agent_data_batch:
+            return True
+        return self._post(
+            "/processed_agent_data", processed_agent_data_batch_adapter.dump_json(processed_agent_data_batch)
+        )
+
+    def save_summaries(self, summaries: List[AgentDataSummary]):
+        """
+        Save windowed summaries of the processed data to the Store API.
+        Returns:
+            bool: True if the summaries are successfully saved, False otherwise.
+        """
+        if not summaries:
+            return True
+        return self._post("/agent_data_summary", agent_data_summary_batch_adapter.dump_json(summaries))
+
+    def close(self):
+        self.session.close()
+
+    def _post(self, path: str, data: bytes) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(
+                    f"{self.api_base_url}{path}", data=data, headers=JSON_HEADERS, timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                logging.info("Store request failed (attempt %s): %s", attempt + 1, e)
             else:
-                return False
-        except Exception as e:
-            # Handle exceptions if any
-            print(f"Error saving data to Store API: {e}")
-            return False
+                if response.status_code == 200:
+                    return True
+                logging.info("Invalid Store response (attempt %s): %s", attempt + 1, response)
+                if response.status_code != 429 and response.status_code < 500:
+                    return False
+            if attempt < self.max_retries:
+                delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+                self.sleep(delay * random.uniform(0.5, 1))
+        return False
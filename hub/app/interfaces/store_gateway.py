@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import List
+from app.entities.agent_data_summary import AgentDataSummary
 from app.entities.processed_agent_data import ProcessedAgentData
 
 
@@ -19,3 +20,13 @@ class StoreGateway(ABC):
             bool: True if the data is successfully saved, False otherwise.
         """
         pass
+
+    def save_summaries(self, summaries: List[AgentDataSummary]) -> bool:
+        """
+        Method to save windowed summaries sent by the edge in the database.
+        Parameters:
+            summaries (List[AgentDataSummary]): The summaries to be saved.
+        Returns:
+            bool: True if the summaries are successfully saved, False otherwise.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot save summaries")
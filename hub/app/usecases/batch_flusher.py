@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+from typing import List
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.adapters.redis_stream_buffer import Entry, RedisStreamBuffer
+from app.entities.processed_agent_data import ProcessedAgentData
+from app.interfaces.store_gateway import StoreGateway
+
+
+class BatchFlusher:
+    """
+    Background task moving records from the RedisStreamBuffer to the store.
+
+    Entries are read through the consumer group into a local batch, which
+    is sent once batch_size entries were collected or max_age seconds after
+    its first entry arrived, so records never wait longer than that at low
+    traffic. Up to max_in_flight batches are sent concurrently; collecting
+    the next batch waits while that many are in flight. Entries are
+    acknowledged only after the store accepted them; a batch the store
+    adapter gave up on is requeued at the end of the stream, except for the
+    records that failed max_attempts times, which go to the dead letter
+    stream together with records that are not valid. Entries left
+    pending by a crashed replica are picked up by claim_stale(), which runs
+    every claim_interval seconds. While entries are collected, wait for a
+    free slot or are being saved, their idle time is reset every
+    heartbeat_interval seconds (a third of the buffer's min_idle by
+    default), so a slow store with its retries does not let other replicas
+    claim and save them a second time. Ingest endpoints only append to the
+    stream, the store latency is paid here instead of on the request path.
+    """
+
+    def __init__(
+        self,
+        buffer: RedisStreamBuffer,
+        store_gateway: StoreGateway,
+        batch_size: int = 20,
+        max_age: float = 1.0,
+        claim_interval: float = 30,
+        max_in_flight: int = 4,
+        max_attempts: int = 5,
+        heartbeat_interval: float = None,
+        clock=time.monotonic,
+    ):
+        if heartbeat_interval is None:
+            heartbeat_interval = buffer.min_idle / 3
+        if heartbeat_interval >= buffer.min_idle:
+            raise ValueError(
+                f"heartbeat_interval ({heartbeat_interval} s) must be shorter than "
+                f"the buffer's min_idle ({buffer.min_idle} s)"
+            )
+        self.buffer = buffer
+        self.store_gateway = store_gateway
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.claim_interval = claim_interval
+        self.max_attempts = max_attempts
+        self.heartbeat_interval = heartbeat_interval
+        self.clock = clock
+        self.stopping = False
+        self.task = None
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.saves = set()
+        # Entries waiting for a free slot or being saved
+        self.in_flight_ids = set()
+        self.batch: List[Entry] = []
+        self.batch_started = None
+        # Claim stale entries on the first pass, e.g. those left by a crashed replica
+        self.next_claim = float("-inf")
+        # Metrics
+        self.flushed_batches = 0
+        self.flushed_records = 0
+        self.failed_batches = 0
+        self.requeued_records = 0
+        self.dead_lettered_records = 0
+        self.claimed_records = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Send the batch collected so far and wait for the task and the in-flight batches to finish"""
+        self.stopping = True
+        if self.task is not None:
+            await self.task
+            self.task = None
+
+    async def run(self):
+        await self.buffer.ensure_group()
+        heartbeat = asyncio.create_task(self.keep_alive())
+        try:
+            while not self.stopping:
+                try:
+                    await self.flush_once()
+                except Exception as e:
+                    logging.info("Error flushing batch to store: %s", e)
+                    await asyncio.sleep(self.max_age)
+            if self.batch:
+                await self.flush()
+            await self.drain()
+        finally:
+            heartbeat.cancel()
+
+    async def keep_alive(self):
+        """Reset the idle time of the entries this consumer holds every heartbeat_interval seconds"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            entry_ids = self.in_flight_ids.union(entry_id for entry_id, _ in self.batch)
+            try:
+                await self.buffer.touch(entry_ids)
+            except Exception as e:
+                logging.info("Error refreshing entries in flight: %s", e)
+
+    async def flush_once(self):
+        """Collect entries for at most the remaining linger time and send the batch if it is due"""
+        now = self.clock()
+        if now >= self.next_claim:
+            await self.claim()
+            self.next_claim = now + self.claim_interval
+        wait = self.max_age if not self.batch else max(self.batch_started + self.max_age - now, 0)
+        entries = await self.buffer.read(self.batch_size - len(self.batch), block=wait)
+        if entries and not self.batch:
+            self.batch_started = self.clock()
+        self.batch.extend(entries)
+        if len(self.batch) >= self.batch_size or (self.batch and self.clock() - self.batch_started >= self.max_age):
+            await self.flush()
+
+    async def claim(self):
+        """Send entries other consumers left pending for too long"""
+        while True:
+            # Batches of this consumer still being sent may have been idle for min_idle too
+            claimed = await self.buffer.claim_stale(self.batch_size)
+            entries = [entry for entry in claimed if entry[0] not in self.in_flight_ids]
+            if entries:
+                self.claimed_records += len(entries)
+                await self.send(entries)
+            if self.buffer.claimed_all():
+                return
+
+    async def flush(self):
+        batch, self.batch = self.batch, []
+        await self.send(batch)
+
+    async def send(self, batch: List[Entry]):
+        """Start saving the batch in a task once fewer than max_in_flight batches are being saved"""
+        if not batch:
+            return
+        entry_ids = [entry_id for entry_id, _ in batch]
+        self.in_flight_ids.update(entry_ids)
+        try:
+            await self.in_flight.acquire()
+        except BaseException:
+            self.in_flight_ids.difference_update(entry_ids)
+            raise
+        task = asyncio.create_task(self.save(batch))
+        self.saves.add(task)
+
+        def done(task):
+            self.saves.discard(task)
+            self.in_flight_ids.difference_update(entry_ids)
+            self.in_flight.release()
+
+        task.add_done_callback(done)
+
+    async def drain(self):
+        """Wait for the batches in flight"""
+        while self.saves:
+            await asyncio.gather(*self.saves, return_exceptions=True)
+
+    async def save(self, batch: List[Entry]):
+        try:
+            valid, processed_agent_data_batch, invalid = [], [], []
+            for entry in batch:
+                try:
+                    processed_agent_data_batch.append(ProcessedAgentData.model_validate_json(entry[1]))
+                    valid.append(entry)
+                except ValueError:
+                    invalid.append(entry)
+            # Would fail on every retry
+            await self.buffer.dead_letter(invalid, "invalid record")
+            self.dead_lettered_records += len(invalid)
+            if not valid:
+                return
+            # The store adapter is blocking, keep it off the event loop
+            saved = await run_in_threadpool(self.store_gateway.save_data, processed_agent_data_batch)
+            if saved:
+                await self.buffer.ack([entry_id for entry_id, _ in valid])
+                self.flushed_batches += 1
+                self.flushed_records += len(valid)
+            else:
+                # The adapter already retried, put the records back for the next batches
+                self.failed_batches += 1
+                logging.info("Store did not accept a batch of %s records", len(valid))
+                exhausted = [e for e in valid if self.buffer.failed_attempts(e[0]) + 1 >= self.max_attempts]
+                retry = [e for e in valid if self.buffer.failed_attempts(e[0]) + 1 < self.max_attempts]
+                await self.buffer.dead_letter(exhausted, f"store write failed {self.max_attempts} times")
+                await self.buffer.requeue(retry)
+                self.dead_lettered_records += len(exhausted)
+                self.requeued_records += len(retry)
+        except Exception as e:
+            # Left pending, claim() picks it up after the buffer's min_idle
+            logging.info("Error saving batch to store: %s", e)
+
+    def metrics(self) -> dict:
+        return {
+            "flushed_batches": self.flushed_batches,
+            "flushed_records": self.flushed_records,
+            "failed_batches": self.failed_batches,
+            "requeued_records": self.requeued_records,
+            "dead_lettered_records": self.dead_lettered_records,
+            "claimed_records": self.claimed_records,
+            "batches_in_flight": len(self.saves),
+        }
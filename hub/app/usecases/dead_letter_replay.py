@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+from app.adapters.redis_stream_buffer import RedisStreamBuffer
+
+
+class DeadLetterReplay:
+    """
+    Background task moving dead letters back to the stream at a limited
+    rate, e.g. to drain the backlog of a store outage once the store is
+    back without flooding it.
+
+    At most rate records per second are replayed, in chunks of up to
+    chunk_size records (and never more than one second's worth at once).
+    Replayed records get a fresh set of attempts; if they keep failing the
+    batch flusher dead-letters them again.
+    """
+
+    def __init__(self, buffer: RedisStreamBuffer, chunk_size: int = 100, sleep=asyncio.sleep):
+        self.buffer = buffer
+        self.chunk_size = chunk_size
+        self.sleep = sleep
+        self.task = None
+        self.limit = None
+        self.rate = None
+        self.replayed = 0
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self, limit: int = None, rate: float = 100):
+        """Replay up to limit records (all of them if None) at rate records per second"""
+        if self.running:
+            raise RuntimeError("A replay is already running")
+        self.limit = limit
+        self.rate = rate
+        self.replayed = 0
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.running:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def run(self):
+        chunk_size = max(1, min(self.chunk_size, int(self.rate)))
+        while self.limit is None or self.replayed < self.limit:
+            count = chunk_size if self.limit is None else min(chunk_size, self.limit - self.replayed)
+            try:
+                moved = await self.buffer.replay_dead_letters(count)
+            except Exception as e:
+                logging.info("Error replaying dead letters: %s", e)
+                return
+            self.replayed += moved
+            if moved < count or self.replayed == self.limit:
+                break
+            await self.sleep(moved / self.rate)
+        logging.info("Replayed %s dead letters", self.replayed)
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "replayed": self.replayed,
+            "limit": self.limit,
+            "rate": self.rate,
+        }
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import List
+
+from app.adapters.redis_stream_buffer import RedisStreamBuffer
+from app.entities.processed_agent_data import ProcessedAgentData
+
+
+class IngestWorkerPool:
+    """
+    Validates raw MQTT payloads and appends them to the RedisStreamBuffer
+    on worker tasks of the event loop.
+
+    The paho callback only hands the payload over with submit_threadsafe(),
+    which blocks the MQTT thread just while queue_size payloads are already
+    waiting. Each worker takes up to append_batch queued payloads at a
+    time and appends them in one round trip.
+    """
+
+    def __init__(self, buffer: RedisStreamBuffer, workers: int = 4, queue_size: int = 1000, append_batch: int = 100):
+        self.buffer = buffer
+        self.workers = workers
+        self.queue_size = queue_size
+        self.append_batch = append_batch
+        self.loop = None
+        self.queue = None
+        self.tasks = []
+        # Metrics
+        self.appended = 0
+        self.invalid = 0
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(self.queue_size)
+        self.tasks = [asyncio.create_task(self.run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Append what is queued and stop the workers"""
+        await self.queue.join()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def submit_threadsafe(self, payload: bytes):
+        """Queue a payload from another thread, e.g. the paho network loop"""
+        asyncio.run_coroutine_threadsafe(self.queue.put(payload), self.loop).result()
+
+    async def run(self):
+        while True:
+            payloads = [await self.queue.get()]
+            while len(payloads) < self.append_batch and not self.queue.empty():
+                payloads.append(self.queue.get_nowait())
+            try:
+                await self.append(payloads)
+            except Exception as e:
+                logging.info("Error appending MQTT messages to the stream: %s", e)
+            finally:
+                for _ in payloads:
+                    self.queue.task_done()
+
+    async def append(self, payloads: List[bytes]):
+        records = []
+        for payload in payloads:
+            try:
+                # Validated straight from bytes
+                records.append(ProcessedAgentData.model_validate_json(payload, strict=True).model_dump_json())
+            except ValueError as e:
+                self.invalid += 1
+                logging.info("Invalid MQTT message: %s", e)
+        await self.buffer.append(records)
+        self.appended += len(records)
+
+    def metrics(self) -> dict:
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "appended": self.appended,
+            "invalid": self.invalid,
+        }
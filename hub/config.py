@@ -1,4 +1,5 @@
 import os
+import socket
 
 
 def try_parse_int(value: str):
@@ -8,10 +9,24 @@ def try_parse_int(value: str):
         return None
 
 
+def try_parse_float(value: str):
+    try:
+        return float(value)
+    except Exception:
+        return None
+
+
 # Configuration for the Store API
 STORE_API_HOST = os.environ.get("STORE_API_HOST") or "localhost"
 STORE_API_PORT = try_parse_int(os.environ.get("STORE_API_PORT")) or 8000
 STORE_API_BASE_URL = f"http://{STORE_API_HOST}:{STORE_API_PORT}"
+# Batches sent to the Store API at once, also the size of the connection pool
+STORE_MAX_IN_FLIGHT = try_parse_int(os.environ.get("STORE_MAX_IN_FLIGHT")) or 4
+STORE_CONNECT_TIMEOUT = try_parse_float(os.environ.get("STORE_CONNECT_TIMEOUT")) or 3.05
+STORE_READ_TIMEOUT = try_parse_float(os.environ.get("STORE_READ_TIMEOUT")) or 30
+# Retries of a failed request, waiting STORE_RETRY_BACKOFF seconds, then twice as long, and so on
+STORE_MAX_RETRIES = try_parse_int(os.environ.get("STORE_MAX_RETRIES")) or 3
+STORE_RETRY_BACKOFF = try_parse_float(os.environ.get("STORE_RETRY_BACKOFF")) or 0.5
 
 # Configure for Redis
 REDIS_HOST = os.environ.get("REDIS_HOST") or "localhost"
@@ -19,8 +34,32 @@ REDIS_PORT = try_parse_int(os.environ.get("REDIS_PORT")) or 6379
 
 # Configure for hub logic
 BATCH_SIZE = try_parse_int(os.environ.get("BATCH_SIZE")) or 20
+# Seconds a partial batch may wait before it is sent to the store anyway
+BATCH_MAX_AGE = try_parse_float(os.environ.get("BATCH_MAX_AGE")) or 1.0
+
+# Redis stream shared by the hub replicas through a consumer group. Every
+# replica needs its own HUB_CONSUMER_NAME; entries a consumer left pending for
+# STREAM_CLAIM_MIN_IDLE seconds are taken over by the others. Entries still
+# being saved are refreshed every third of that, however long the store takes.
+STREAM_NAME = os.environ.get("STREAM_NAME") or "processed_agent_data_stream"
+STREAM_GROUP = os.environ.get("STREAM_GROUP") or "hub"
+HUB_CONSUMER_NAME = os.environ.get("HUB_CONSUMER_NAME") or f"{socket.gethostname()}-{os.getpid()}"
+STREAM_CLAIM_MIN_IDLE = try_parse_float(os.environ.get("STREAM_CLAIM_MIN_IDLE")) or 30
+
+# Records the store failed to save DEAD_LETTER_MAX_ATTEMPTS times, and invalid
+# ones, are moved to a dead letter stream keeping about DEAD_LETTER_MAXLEN entries
+DEAD_LETTER_STREAM = os.environ.get("DEAD_LETTER_STREAM") or f"{STREAM_NAME}:dead"
+DEAD_LETTER_MAX_ATTEMPTS = try_parse_int(os.environ.get("DEAD_LETTER_MAX_ATTEMPTS")) or 5
+DEAD_LETTER_MAXLEN = try_parse_int(os.environ.get("DEAD_LETTER_MAXLEN")) or 100000
+# Records per second moved back to the stream by a replay, unless the request sets a rate
+DEAD_LETTER_REPLAY_RATE = try_parse_float(os.environ.get("DEAD_LETTER_REPLAY_RATE")) or 100
+
+# Worker tasks validating MQTT messages and appending them to the stream
+MQTT_WORKERS = try_parse_int(os.environ.get("MQTT_WORKERS")) or 4
+MQTT_QUEUE_SIZE = try_parse_int(os.environ.get("MQTT_QUEUE_SIZE")) or 1000
 
 # MQTT
 MQTT_BROKER_HOST = os.environ.get("MQTT_BROKER_HOST") or "localhost"
 MQTT_BROKER_PORT = try_parse_int(os.environ.get("MQTT_BROKER_PORT")) or 1883
 MQTT_TOPIC = os.environ.get("MQTT_TOPIC") or "processed_agent_data_topic"
+MQTT_SUMMARY_TOPIC = os.environ.get("MQTT_SUMMARY_TOPIC") or "agent_data_summary_topic"
@@ -1,20 +1,46 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from typing import List
 
-from fastapi import FastAPI
-from redis import Redis
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from redis.asyncio import Redis
 import paho.mqtt.client as mqtt
 
+from app.adapters.redis_stream_buffer import RedisStreamBuffer
 from app.adapters.store_api_adapter import StoreApiAdapter
+from app.entities.agent_data_summary import AgentDataSummary
 from app.entities.processed_agent_data import ProcessedAgentData
+from app.usecases.batch_flusher import BatchFlusher
+from app.usecases.dead_letter_replay import DeadLetterReplay
+from app.usecases.ingest_workers import IngestWorkerPool
 from config import (
     STORE_API_BASE_URL,
+    STORE_MAX_IN_FLIGHT,
+    STORE_CONNECT_TIMEOUT,
+    STORE_READ_TIMEOUT,
+    STORE_MAX_RETRIES,
+    STORE_RETRY_BACKOFF,
     REDIS_HOST,
     REDIS_PORT,
     BATCH_SIZE,
+    BATCH_MAX_AGE,
     MQTT_TOPIC,
+    MQTT_SUMMARY_TOPIC,
     MQTT_BROKER_HOST,
     MQTT_BROKER_PORT,
+    MQTT_WORKERS,
+    MQTT_QUEUE_SIZE,
+    STREAM_NAME,
+    STREAM_GROUP,
+    HUB_CONSUMER_NAME,
+    STREAM_CLAIM_MIN_IDLE,
+    DEAD_LETTER_STREAM,
+    DEAD_LETTER_MAX_ATTEMPTS,
+    DEAD_LETTER_MAXLEN,
+    DEAD_LETTER_REPLAY_RATE,
 )
 
 # Configure logging settings
@@ -28,28 +54,120 @@ logging.basicConfig(
 )
 # Create an instance of the Redis using the configuration
 redis_client = Redis(host=REDIS_HOST, port=REDIS_PORT)
+# Processed data waits in a Redis stream, shared with the other hub replicas, until it is stored
+stream_buffer = RedisStreamBuffer(
+    redis_client,
+    stream=STREAM_NAME,
+    group=STREAM_GROUP,
+    consumer=HUB_CONSUMER_NAME,
+    min_idle=STREAM_CLAIM_MIN_IDLE,
+    dead_letter_stream=DEAD_LETTER_STREAM,
+    dead_letter_maxlen=DEAD_LETTER_MAXLEN,
+)
 # Create an instance of the StoreApiAdapter using the configuration
-store_adapter = StoreApiAdapter(api_base_url=STORE_API_BASE_URL)
-# Create an instance of the AgentMQTTAdapter using the configuration
+store_adapter = StoreApiAdapter(
+    api_base_url=STORE_API_BASE_URL,
+    pool_size=STORE_MAX_IN_FLIGHT,
+    connect_timeout=STORE_CONNECT_TIMEOUT,
+    read_timeout=STORE_READ_TIMEOUT,
+    max_retries=STORE_MAX_RETRIES,
+    backoff=STORE_RETRY_BACKOFF,
+)
+# Sends full batches, or partial ones after BATCH_MAX_AGE seconds, to the store in the background
+batch_flusher = BatchFlusher(
+    stream_buffer,
+    store_adapter,
+    batch_size=BATCH_SIZE,
+    max_age=BATCH_MAX_AGE,
+    claim_interval=STREAM_CLAIM_MIN_IDLE,
+    max_in_flight=STORE_MAX_IN_FLIGHT,
+    max_attempts=DEAD_LETTER_MAX_ATTEMPTS,
+)
+# Moves dead letters back to the stream on request, see the /admin endpoints
+dead_letter_replay = DeadLetterReplay(stream_buffer)
+# MQTT messages are validated and appended to the stream on worker tasks
+ingest_workers = IngestWorkerPool(stream_buffer, workers=MQTT_WORKERS, queue_size=MQTT_QUEUE_SIZE)
+agent_data_summary_batch_adapter = TypeAdapter(List[AgentDataSummary])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    batch_flusher.start()
+    ingest_workers.start()
+    # The MQTT client runs on its own thread and hands messages to the ingest workers
+    client.connect(MQTT_BROKER_HOST, MQTT_BROKER_PORT)
+    client.loop_start()
+    yield
+    client.loop_stop()
+    client.disconnect()
+    await ingest_workers.stop()
+    await dead_letter_replay.stop()
+    await batch_flusher.stop()
+    store_adapter.close()
+    await redis_client.close()
+
 
 # FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 @app.post("/processed_agent_data/")
 async def save_processed_agent_data(processed_agent_data: ProcessedAgentData):
-    redis_client.lpush("processed_agent_data", processed_agent_data.model_dump_json())
-    if redis_client.llen("processed_agent_data") >= BATCH_SIZE:
-        processed_agent_data_batch: List[ProcessedAgentData] = []
-        for _ in range(BATCH_SIZE):
-            processed_agent_data = ProcessedAgentData.model_validate_json(
-                redis_client.lpop("processed_agent_data")
-            )
-            processed_agent_data_batch.append(processed_agent_data)
-        store_adapter.save_data(processed_agent_data_batch=processed_agent_data_batch)
+    # Only enqueue, the batch flusher sends the records to the store
+    await stream_buffer.append([processed_agent_data.model_dump_json()])
+    return {"status": "ok"}
+
+
+@app.post("/processed_agent_data/batch")
+async def save_processed_agent_data_batch(processed_agent_data_batch: List[ProcessedAgentData]):
+    payloads = [processed_agent_data.model_dump_json() for processed_agent_data in processed_agent_data_batch]
+    await stream_buffer.append(payloads)
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "waiting": await stream_buffer.size(),
+        "pending": await stream_buffer.pending(),
+        "dead_letters": await stream_buffer.dead_letter_size(),
+        **batch_flusher.metrics(),
+        **ingest_workers.metrics(),
+    }
+
+
+@app.post("/agent_data_summary/batch")
+async def save_agent_data_summary_batch(summaries: List[AgentDataSummary]):
+    # Summaries are already aggregated by the edge, they go to the store without buffering
+    if summaries and not await run_in_threadpool(store_adapter.save_summaries, summaries):
+        raise HTTPException(status_code=502, detail="Store did not accept the summaries")
     return {"status": "ok"}
 
 
+@app.get("/admin/dead_letter")
+async def get_dead_letters(count: int = Query(100, gt=0, le=1000), start: str = "-"):
+    # Page through with start set to the last id seen, prefixed with "(" to exclude it
+    return {
+        "size": await stream_buffer.dead_letter_size(),
+        "entries": await stream_buffer.dead_letters(count, start),
+        "replay": dead_letter_replay.status(),
+    }
+
+
+@app.post("/admin/dead_letter/replay")
+async def replay_dead_letters(limit: int = Query(None, gt=0), rate: float = Query(DEAD_LETTER_REPLAY_RATE, gt=0)):
+    if dead_letter_replay.running:
+        raise HTTPException(status_code=409, detail="A replay is already running")
+    dead_letter_replay.start(limit, rate)
+    return dead_letter_replay.status()
+
+
+@app.delete("/admin/dead_letter/replay")
+async def stop_dead_letter_replay():
+    await dead_letter_replay.stop()
+    return dead_letter_replay.status()
+
+
 # MQTT
 client = mqtt.Client()
 
@@ -57,39 +175,31 @@ client = mqtt.Client()
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
         logging.info("Connected to MQTT broker")
-        client.subscribe(MQTT_TOPIC)
+        client.subscribe([(MQTT_TOPIC, 0), (MQTT_SUMMARY_TOPIC, 0)])
     else:
         logging.info(f"Failed to connect to MQTT broker with code: {rc}")
 
 
 def on_message(client, userdata, msg):
     try:
-        payload: str = msg.payload.decode("utf-8")
-        # Create ProcessedAgentData instance with the received data
-        processed_agent_data = ProcessedAgentData.model_validate_json(
-            payload, strict=True
-        )
-
-        redis_client.lpush(
-            "processed_agent_data", processed_agent_data.model_dump_json()
-        )
-        processed_agent_data_batch: List[ProcessedAgentData] = []
-        if redis_client.llen("processed_agent_data") >= BATCH_SIZE:
-            for _ in range(BATCH_SIZE):
-                processed_agent_data = ProcessedAgentData.model_validate_json(
-                    redis_client.lpop("processed_agent_data")
-                )
-                processed_agent_data_batch.append(processed_agent_data)
-        store_adapter.save_data(processed_agent_data_batch=processed_agent_data_batch)
-        return {"status": "ok"}
+        if msg.topic == MQTT_SUMMARY_TOPIC:
+            # Not waited for, a slow store must not hold up the network loop
+            asyncio.run_coroutine_threadsafe(save_summary_message(msg.payload), ingest_workers.loop)
+            return
+        # Only blocks the network loop while the ingest queue is full
+        ingest_workers.submit_threadsafe(msg.payload)
     except Exception as e:
         logging.info(f"Error processing MQTT message: {e}")
 
 
-# Connect
+async def save_summary_message(payload: bytes):
+    try:
+        summaries = agent_data_summary_batch_adapter.validate_json(payload)
+        if summaries and not await run_in_threadpool(store_adapter.save_summaries, summaries):
+            logging.info("Store did not accept %s summaries", len(summaries))
+    except Exception as e:
+        logging.info(f"Error processing MQTT summaries: {e}")
+
+
 client.on_connect = on_connect
 client.on_message = on_message
-client.connect(MQTT_BROKER_HOST, MQTT_BROKER_PORT)
-
-# Start
-client.loop_start()
@@ -22,6 +22,24 @@ CREATE TABLE processed_agent_data (
     timestamp TIMESTAMP
 );
 
+CREATE TABLE agent_data_summary (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    window_start TIMESTAMP NOT NULL,
+    window_end TIMESTAMP NOT NULL,
+    count INTEGER NOT NULL,
+    z_min FLOAT,
+    z_max FLOAT,
+    z_mean FLOAT,
+    pm25_min FLOAT,
+    pm25_max FLOAT,
+    pm25_mean FLOAT,
+    temperature_min FLOAT,
+    temperature_max FLOAT,
+    temperature_mean FLOAT,
+    road_states JSONB
+);
+
 CREATE TABLE predictions (
     id SERIAL PRIMARY KEY,
     field_name VARCHAR(50) NOT NULL,
@@ -11,6 +11,7 @@ from sqlalchemy import (
     String,
     Float,
     DateTime,
+    JSON,
     text,
 )
 from sqlalchemy.orm import sessionmaker
@@ -58,6 +59,27 @@ processed_agent_data = Table(
     Column("co2", Float),
     Column("timestamp", DateTime),
 )
+
+# Per-user window summaries sent by the edge
+agent_data_summary = Table(
+    "agent_data_summary",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer),
+    Column("window_start", DateTime),
+    Column("window_end", DateTime),
+    Column("count", Integer),
+    Column("z_min", Float),
+    Column("z_max", Float),
+    Column("z_mean", Float),
+    Column("pm25_min", Float),
+    Column("pm25_max", Float),
+    Column("pm25_mean", Float),
+    Column("temperature_min", Float),
+    Column("temperature_max", Float),
+    Column("temperature_mean", Float),
+    Column("road_states", JSON),
+)
 SessionLocal = sessionmaker(bind=engine)
 
 # FastAPI models
@@ -116,6 +138,22 @@ class ProcessedAgentData(BaseModel):
     air_quality_state: str
     agent_data: AgentData
 
+class FieldSummary(BaseModel):
+    min: float
+    max: float
+    mean: float
+
+
+class AgentDataSummary(BaseModel):
+    user_id: int
+    window_start: datetime
+    window_end: datetime
+    count: int
+    z: FieldSummary
+    pm25: FieldSummary
+    temperature: FieldSummary
+    road_states: Dict[str, int]
+
 # WebSocket subscriptions
 subscriptions: Dict[int, Set[WebSocket]] = {}
 
@@ -174,6 +212,35 @@ async def create_processed_agent_data(data: List[ProcessedAgentData]):
     finally:
         db.close()
 
+@app.post("/agent_data_summary/")
+def create_agent_data_summary(data: List[AgentDataSummary]):
+    db = SessionLocal()
+    try:
+        if data:
+            db.execute(agent_data_summary.insert(), [
+                {
+                    "user_id": summary.user_id,
+                    "window_start": summary.window_start,
+                    "window_end": summary.window_end,
+                    "count": summary.count,
+                    "z_min": summary.z.min,
+                    "z_max": summary.z.max,
+                    "z_mean": summary.z.mean,
+                    "pm25_min": summary.pm25.min,
+                    "pm25_max": summary.pm25.max,
+                    "pm25_mean": summary.pm25.mean,
+                    "temperature_min": summary.temperature.min,
+                    "temperature_max": summary.temperature.max,
+                    "temperature_mean": summary.temperature.mean,
+                    "road_states": summary.road_states,
+                }
+                for summary in data
+            ])
+            db.commit()
+        return {"status": "Summaries saved"}
+    finally:
+        db.close()
+
 @app.get("/processed_agent_data/{processed_agent_data_id}")
 def read_processed_agent_data(processed_agent_data_id: int):
     db = SessionLocal()
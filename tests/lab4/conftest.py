@@ -0,0 +1,127 @@
+"""
+Shared fixtures for Lab 4 (performance) tests.
+
+Unlike the Lab 2 tests these exercise the real service modules.  agent/src,
+edge/ and hub/ all use top-level names such as ``config``, ``main`` and
+``app``, so every fixture purges those from ``sys.modules`` and puts the
+requested service directory first on ``sys.path`` before importing.
+"""
+
+import csv
+import importlib
+import os
+import sys
+
+import pytest
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+SERVICE_DIRS = {
+    "agent": os.path.join(_PROJECT_ROOT, "agent", "src"),
+    "agent_data": os.path.join(_PROJECT_ROOT, "agent", "src", "data"),
+    "edge": os.path.join(_PROJECT_ROOT, "edge"),
+    "hub": os.path.join(_PROJECT_ROOT, "hub"),
+}
+
+# Top-level module names that collide between the services
+_SHARED_NAMES = (
+    "config", "main", "app", "domain", "schema", "utils",
+    "file_datasource", "synthetic_generator",
+)
+
+
+def _purge_shared_modules():
+    for name in list(sys.modules):
+        if name.split(".")[0] in _SHARED_NAMES:
+            del sys.modules[name]
+
+
+@pytest.fixture
+def service_import():
+    """
+    Return ``load(service, module)`` which imports ``module`` from the
+    given service directory with a clean module cache.
+    """
+    inserted = []
+
+    def load(service: str, module: str):
+        path = SERVICE_DIRS[service]
+        if not inserted or inserted[-1] != path:
+            _purge_shared_modules()
+            for other in SERVICE_DIRS.values():
+                while other in sys.path:
+                    sys.path.remove(other)
+            sys.path.insert(0, path)
+            inserted.append(path)
+        return importlib.import_module(module)
+
+    yield load
+
+    _purge_shared_modules()
+    for path in set(inserted):
+        while path in sys.path:
+            sys.path.remove(path)
+
+
+@pytest.fixture
+def agent_data_dir():
+    return os.path.join(SERVICE_DIRS["agent"], "data")
+
+
+@pytest.fixture
+def agent_csv_files(agent_data_dir):
+    """The seven sensor CSV paths in FileDatasource argument order."""
+    return [
+        os.path.join(agent_data_dir, name)
+        for name in (
+            "accelerometer.csv",
+            "gps.csv",
+            "parking.csv",
+            "rain.csv",
+            "temp.csv",
+            "traffic_light.csv",
+            "air_quality.csv",
+        )
+    ]
+
+
+def _write_csv(path, header, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+@pytest.fixture
+def short_csv_files(tmp_path):
+    """Three accelerometer rows, every other sensor has only one row."""
+    return [
+        _write_csv(tmp_path / "accelerometer.csv", ["x", "y", "z"],
+                   [[1, 2, 3], [4, 5, 6], [7, 8, 9]]),
+        _write_csv(tmp_path / "gps.csv", ["longitude", "latitude"],
+                   [[50.45, 30.52]]),
+        _write_csv(tmp_path / "parking.csv", ["empty_count", "longitude", "latitude"],
+                   [[5, 50.45, 30.52]]),
+        _write_csv(tmp_path / "rain.csv", ["intensity"], [[0.5]]),
+        _write_csv(tmp_path / "temp.csv", ["temperature"], [[21.5]]),
+        _write_csv(tmp_path / "traffic_light.csv",
+                   ["state", "duration", "latitude", "longitude"],
+                   [["green", 30, 30.52, 50.45]]),
+        _write_csv(tmp_path / "air_quality.csv", ["pm25", "pm10", "co2"],
+                   [[12.5, 28.3, 420.0]]),
+    ]
+
+
+def _read_all(datasource, count):
+    """Start the datasource, read count readings and stop it."""
+    datasource.startReading()
+    try:
+        return [datasource.read() for _ in range(count)]
+    finally:
+        datasource.stopReading()
+
+
+@pytest.fixture
+def read_all():
+    return _read_all
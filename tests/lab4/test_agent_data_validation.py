@@ -0,0 +1,56 @@
+"""
+Tests for the edge AgentData validation path
+(edge/app/entities/agent_data.py, edge/app/adapters/agent_payload_decoder.py).
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+
+@pytest.fixture
+def agent_data(service_import):
+    return service_import("edge", "app.entities.agent_data")
+
+
+@pytest.fixture
+def decoder(service_import):
+    return service_import("edge", "app.adapters.agent_payload_decoder")
+
+
+class TestTimestampValidator:
+
+    def test_validator_runs(self, agent_data, agent_data_dict):
+        from pydantic import ValidationError
+        with pytest.raises(ValidationError, match="Invalid timestamp format"):
+            agent_data.AgentData(**dict(agent_data_dict, timestamp="yesterday"))
+
+    def test_z_suffix_is_utc(self, agent_data, agent_data_dict):
+        record = agent_data.AgentData(**dict(agent_data_dict, timestamp="2024-01-15T10:30:00Z"))
+        assert record.timestamp == datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+
+    def test_offset_and_naive_timestamps(self, agent_data, agent_data_dict):
+        aware = agent_data.AgentData(**dict(agent_data_dict, timestamp="2024-01-15T12:30:00+02:00"))
+        naive = agent_data.AgentData(**dict(agent_data_dict, timestamp="2024-01-15T10:30:00.123456"))
+        assert aware.timestamp.utcoffset() == timedelta(hours=2)
+        assert naive.timestamp == datetime(2024, 1, 15, 10, 30, 0, 123456)
+
+    def test_parse_iso_timestamp(self, agent_data):
+        assert agent_data.parse_iso_timestamp("2024-01-15T10:30:00Z").tzinfo == timezone.utc
+
+
+class TestBytesValidation:
+
+    def test_json_bytes_are_validated_without_decoding(self, decoder, agent_data, agent_data_dict):
+        payload = json.dumps(agent_data_dict).encode()
+        [record] = decoder.decode_agent_payload(payload)
+        assert record == agent_data.AgentData.model_validate_json(payload.decode("utf-8"), strict=True)
+        assert record.timestamp.tzinfo == timezone.utc
+
+    def test_type_adapters_are_module_level(self, decoder):
+        from pydantic import TypeAdapter
+        assert isinstance(decoder.agent_message_adapter, TypeAdapter)
+        assert isinstance(decoder.agent_message_batch_adapter, TypeAdapter)
@@ -0,0 +1,229 @@
+"""
+Tests for the pluggable road state engines
+(edge/app/usecases/anomaly_detection.py).
+"""
+
+import ast
+import math
+import os
+import random
+import statistics
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+
+@pytest.fixture
+def anomaly_detection(service_import):
+    return service_import("edge", "app.usecases.anomaly_detection")
+
+
+def road_signal(seed, n=3000):
+    """Noisy resting z with bumps and potholes of random width"""
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(seed)
+    x = 16667 + rng.normal(0, 300, n)
+    for _ in range(20):
+        center, half_width = rng.integers(0, n), rng.integers(2, 30)
+        amplitude = rng.choice([1, -1]) * rng.uniform(2000, 12000)
+        lo, hi = max(0, center - half_width), min(n, center + half_width)
+        x[lo:hi] += amplitude * np.hanning(hi - lo)
+    return x
+
+
+MAPVIEW_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "MapView")
+
+
+def mapview_z():
+    """Z column of the recording the offline detection runs on"""
+    with open(os.path.join(MAPVIEW_DIR, "data.csv"), newline="") as f:
+        rows = f.read().splitlines()[1:]
+    return [int(row.split(",")[2]) for row in rows if row]
+
+
+def mapview_params(name):
+    """find_peaks parameters of MapView/fileDatasource.py, which needs pandas to import"""
+    with open(os.path.join(MAPVIEW_DIR, "fileDatasource.py")) as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and node.targets[0].id == name:
+            return ast.literal_eval(node.value)
+    raise KeyError(name)
+
+
+def label_all(detector, values):
+    """(index, state) of every reading, in the order the detector returned them"""
+    labelled = []
+    for index, value in enumerate(values):
+        labelled.extend(detector.label(index, value))
+    labelled.extend(detector.flush())
+    return labelled
+
+
+def stream_peaks(finder, values):
+    peaks = []
+    for value in values:
+        peaks.extend(finder.push(value))
+    peaks.extend(finder.flush())
+    return sorted(peaks)
+
+
+class TestStreamingPeakFinder:
+
+    @pytest.mark.parametrize("seed", range(10))
+    @pytest.mark.parametrize("params, sign", [
+        ("BUMP_PEAK_PARAMS", 1),
+        ("POTHOLE_PEAK_PARAMS", -1),
+        ({"height": 16000, "distance": 5, "prominence": 100, "width": 2, "wlen": 31}, 1),
+        ({"prominence": 200, "wlen": 50}, 1),
+        ({"height": 17000}, 1),
+    ])
+    def test_matches_find_peaks(self, anomaly_detection, seed, params, sign):
+        signal = pytest.importorskip("scipy.signal")
+        if isinstance(params, str):
+            params = getattr(anomaly_detection, params)
+        x = sign * road_signal(seed)
+        expected = signal.find_peaks(x, **params)[0].tolist()
+        finder = anomaly_detection.StreamingPeakFinder(**params)
+        assert [peak.index for peak in stream_peaks(finder, x.tolist())] == expected
+
+    def test_reports_prominence_and_width(self, anomaly_detection):
+        finder = anomaly_detection.StreamingPeakFinder(prominence=1, wlen=10)
+        (peak,) = stream_peaks(finder, [0, 0, 2, 4, 2, 0, 0])
+        assert peak == (3, 4, 4, 2.0)
+
+    def test_plateau_peak_is_its_middle(self, anomaly_detection):
+        finder = anomaly_detection.StreamingPeakFinder()
+        assert [peak.index for peak in stream_peaks(finder, [0, 5, 5, 5, 5, 0])] == [2]
+
+    def test_rising_edge_at_end_is_not_a_peak(self, anomaly_detection):
+        finder = anomaly_detection.StreamingPeakFinder()
+        assert stream_peaks(finder, [0, 1, 2, 3, 3]) == []
+
+    def test_peak_is_decided_within_half_window(self, anomaly_detection):
+        finder = anomaly_detection.StreamingPeakFinder(prominence=1, wlen=10)
+        decided = {i: finder.push(value) for i, value in enumerate([0, 9, 0, 1, 0, 1, 0, 1, 0, 1])}
+        # The peak at 1 is decided by sample 1 + wlen // 2, without waiting for the stream to end
+        assert [peak.index for peak in decided[6]] == [1]
+        assert all(not decided[i] for i in range(6))
+
+    def test_memory_stays_bounded(self, anomaly_detection):
+        finder = anomaly_detection.StreamingPeakFinder(**anomaly_detection.BUMP_PEAK_PARAMS)
+        rng = random.Random(0)
+        for _ in range(20000):
+            finder.push(16667 + rng.randint(-300, 300))
+        assert len(finder.samples) < 3 * anomaly_detection.PEAK_WLEN
+
+    @pytest.mark.parametrize("params, offline_params, sign", [
+        ("BUMP_PEAK_PARAMS", "speed_bump_params", 1),
+        ("POTHOLE_PEAK_PARAMS", "pothole_params", -1),
+    ])
+    def test_matches_offline_detection_on_mapview_data(self, anomaly_detection, params, offline_params, sign):
+        signal = pytest.importorskip("scipy.signal")
+        np = pytest.importorskip("numpy")
+        x = sign * np.array(mapview_z())
+        expected = signal.find_peaks(x, **mapview_params(offline_params))[0].tolist()
+        finder = anomaly_detection.StreamingPeakFinder(**getattr(anomaly_detection, params))
+        assert [peak.index for peak in stream_peaks(finder, x.tolist())] == expected
+        assert expected
+
+    def test_memory_stays_bounded_for_dense_peaks(self, anomaly_detection):
+        finder = anomaly_detection.StreamingPeakFinder(**anomaly_detection.BUMP_PEAK_PARAMS)
+        # A local maximum above height every 10 samples, closer than distance
+        for i in range(20000):
+            finder.push(25000 + 3000 * math.sin(2 * math.pi * i / 10))
+        assert len(finder.samples) < 3 * anomaly_detection.PEAK_WLEN
+
+    def test_prominence_needs_wlen(self, anomaly_detection):
+        with pytest.raises(ValueError):
+            anomaly_detection.StreamingPeakFinder(prominence=500)
+
+
+class TestScoreDetectors:
+
+    @pytest.mark.parametrize("engine", ["zscore", "ewma"])
+    def test_flags_spikes_after_warmup(self, anomaly_detection, engine):
+        detector = anomaly_detection.road_state_detector_factory(engine)()
+        rng = random.Random(0)
+        states = [detector.update(16667 + rng.randint(-300, 300)) for _ in range(100)]
+        assert states[0] == "Not enough data"
+        assert set(states[60:]) == {"Even"}
+        assert detector.update(25000) == "Speeding bump"
+        assert detector.update(8000) == "Pit"
+
+    def test_zscore_matches_window_statistics(self, anomaly_detection):
+        detector = anomaly_detection.RollingZScoreDetector(window=10, threshold=1.0, min_std=0)
+        rng = random.Random(1)
+        values = [rng.uniform(0, 100) for _ in range(500)]
+        for i, z in enumerate(values):
+            state = detector.update(z)
+            if i < 10:
+                assert state == "Not enough data"
+                continue
+            window = values[i - 10:i]
+            score = (z - statistics.fmean(window)) / statistics.pstdev(window)
+            if abs(abs(score) - 1) > 1e-6:
+                assert state == anomaly_detection.classify_score(score, 1.0)
+
+    def test_flat_signal_is_even(self, anomaly_detection):
+        detector = anomaly_detection.RollingZScoreDetector(window=5)
+        states = [detector.update(16667) for _ in range(10)]
+        assert detector.update(16668) == "Even"
+        assert states[5:] == ["Even"] * 5
+
+
+class TestPeakRoadStateDetector:
+
+    def test_bump_and_pothole(self, anomaly_detection):
+        detector = anomaly_detection.PeakRoadStateDetector()
+        flat = [16667] * 100
+        bump = [16667 + 6000 * (1 - abs(i - 15) / 15) for i in range(31)]
+        pothole = [16667 - 30000 * (1 - abs(i - 5) / 5) for i in range(11)]
+        labelled = label_all(detector, flat + bump + flat + pothole + flat)
+        assert [state for _, state in labelled if state != "Even"] == ["Speeding bump", "Pit"]
+        # Each state is on the reading at the peak, not on the one that decided it
+        assert [index for index, state in labelled if state != "Even"] == [115, 236]
+
+    def test_readings_are_held_back_until_decided(self, anomaly_detection):
+        detector = anomaly_detection.PeakRoadStateDetector()
+        assert detector.label("a", 16667) == [("a", "Even")]
+        # Rising above height, this could be the top of a bump
+        assert detector.label("b", 25000) == []
+        # A peak now, kept back until it is measured
+        assert detector.label("c", 16667) == []
+        # Too narrow for a bump
+        assert detector.flush() == [("b", "Even"), ("c", "Even")]
+
+    def test_labels_match_offline_detection_on_mapview_data(self, anomaly_detection):
+        signal = pytest.importorskip("scipy.signal")
+        np = pytest.importorskip("numpy")
+        z = mapview_z()
+        labelled = label_all(anomaly_detection.PeakRoadStateDetector(), z)
+        assert [index for index, _ in labelled] == list(range(len(z)))
+        x = np.array(z)
+        bumps = signal.find_peaks(x, **mapview_params("speed_bump_params"))[0].tolist()
+        pits = signal.find_peaks(-x, **mapview_params("pothole_params"))[0].tolist()
+        assert [index for index, state in labelled if state == "Speeding bump"] == bumps
+        assert [index for index, state in labelled if state == "Pit"] == pits
+        assert len(bumps) == 1 and len(pits) == 9
+
+    def test_held_back_readings_stay_bounded(self, anomaly_detection):
+        detector = anomaly_detection.PeakRoadStateDetector()
+        for i in range(20000):
+            detector.label(i, 25000 + 3000 * math.sin(2 * math.pi * i / 10))
+        assert len(detector.held) < 3 * anomaly_detection.PEAK_WLEN
+
+
+class TestEngineSelection:
+
+    def test_unknown_engine(self, anomaly_detection):
+        with pytest.raises(ValueError, match="zscore"):
+            anomaly_detection.road_state_detector_factory("fft")
+
+    def test_registry_uses_engine(self, service_import, anomaly_detection):
+        road_state_detector = service_import("edge", "app.usecases.road_state_detector")
+        registry = road_state_detector.RoadStateDetectorRegistry(
+            factory=anomaly_detection.road_state_detector_factory("peaks"),
+        )
+        assert isinstance(registry.get(1), anomaly_detection.PeakRoadStateDetector)
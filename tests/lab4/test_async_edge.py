@@ -0,0 +1,300 @@
+"""
+Tests for the asyncio edge runtime: AsyncHubForwarder
+(edge/app/usecases/async_hub_forwarder.py), AgentAsyncMQTTAdapter
+(edge/app/adapters/agent_async_mqtt_adapter.py) and AsyncHubHttpAdapter
+(edge/app/adapters/hub_async_http_adapter.py).
+"""
+
+import asyncio
+import json
+import socket
+from contextlib import asynccontextmanager
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+
+class _SlowGateway:
+    """Async hub gateway that records batches and concurrency."""
+
+    def __init__(self, delay=0.02, result=True):
+        self.delay = delay
+        self.result = result
+        self.batches = []
+        self.active = 0
+        self.max_active = 0
+
+    async def save_batch(self, batch):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        self.batches.append(list(batch))
+        return self.result
+
+
+@pytest.fixture
+def forwarder_module(service_import):
+    return service_import("edge", "app.usecases.async_hub_forwarder")
+
+
+def _payload(agent_data_dict, user_id):
+    return json.dumps(dict(agent_data_dict, user_id=user_id)).encode()
+
+
+class TestAsyncHubForwarder:
+
+    def test_batches_by_size_and_limits_in_flight(self, forwarder_module):
+        gateway = _SlowGateway()
+
+        async def scenario():
+            forwarder = forwarder_module.AsyncHubForwarder(gateway, batch_size=5, max_in_flight=2)
+            for i in range(50):
+                await forwarder.submit([i])
+            await forwarder.drain()
+            return forwarder
+
+        forwarder = asyncio.run(scenario())
+        assert sorted(i for batch in gateway.batches for i in batch) == list(range(50))
+        assert all(len(batch) == 5 for batch in gateway.batches)
+        assert gateway.max_active == 2
+        assert forwarder.metrics()["forwarded"] == 50
+
+    def test_flushes_after_interval(self, forwarder_module):
+        gateway = _SlowGateway(delay=0)
+
+        async def scenario():
+            forwarder = forwarder_module.AsyncHubForwarder(gateway, batch_size=100, flush_interval=0.05)
+            await forwarder.submit(["a", "b"])
+            await asyncio.sleep(0.2)
+            assert gateway.batches == [["a", "b"]]
+            await forwarder.drain()
+
+        asyncio.run(scenario())
+        assert gateway.batches == [["a", "b"]]
+
+    def test_failures_are_counted(self, forwarder_module):
+        gateway = _SlowGateway(delay=0, result=False)
+
+        async def scenario():
+            forwarder = forwarder_module.AsyncHubForwarder(gateway, batch_size=2)
+            await forwarder.submit(["a", "b", "c"])
+            await forwarder.drain()
+            return forwarder.metrics()
+
+        metrics = asyncio.run(scenario())
+        assert metrics["failed"] == 3
+
+
+class TestAgentAsyncMQTTAdapter:
+
+    def test_consume_processes_in_order(self, service_import, forwarder_module, agent_data_dict):
+        pytest.importorskip("aiomqtt")
+        adapter_module = service_import("edge", "app.adapters.agent_async_mqtt_adapter")
+        service_import("edge", "app.usecases.data_processing").road_state_detectors.clear()
+        gateway = _SlowGateway(delay=0.01)
+
+        class Message:
+            def __init__(self, payload):
+                self.payload = payload
+
+        async def messages():
+            for i in range(30):
+                yield Message(_payload(agent_data_dict, i % 3))
+            yield Message(b"garbage")
+
+        async def scenario():
+            forwarder = forwarder_module.AsyncHubForwarder(gateway, batch_size=7, max_in_flight=3)
+            adapter = adapter_module.AgentAsyncMQTTAdapter("localhost", 1883, "agent_data_topic", forwarder)
+            await adapter.consume(messages())
+            await forwarder.drain()
+
+        asyncio.run(scenario())
+        assert sum(map(len, gateway.batches)) == 30
+        first_batch_users = [p.agent_data.user_id for p in gateway.batches[0]]
+        assert first_batch_users == [0, 1, 2, 0, 1, 2, 0]
+
+    def test_reconnects_after_the_broker_connection_drops(self, service_import, forwarder_module):
+        aiomqtt = pytest.importorskip("aiomqtt")
+        adapter_module = service_import("edge", "app.adapters.agent_async_mqtt_adapter")
+        received = []
+        connections = []
+
+        class Message:
+            def __init__(self, payload):
+                self.payload = payload
+
+        class FakeClient:
+            # First attempt is refused, the second connection drops after two messages
+            script = [None, [b"1", b"2"], [b"3"]]
+
+            def __init__(self, host, port):
+                self.payloads = self.script[len(connections)]
+                connections.append(self)
+
+            async def __aenter__(self):
+                if self.payloads is None:
+                    raise aiomqtt.MqttError("connection refused")
+                return self
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+            @asynccontextmanager
+            async def messages(self, queue_class):
+                yield self.iterate()
+
+            async def iterate(self):
+                for payload in self.payloads:
+                    yield Message(payload)
+                if len(connections) == 2:
+                    raise aiomqtt.MqttError("keepalive timeout")
+                await asyncio.Event().wait()
+
+            async def subscribe(self, topic):
+                pass
+
+        async def scenario():
+            stop = asyncio.Event()
+            forwarder = forwarder_module.AsyncHubForwarder(_SlowGateway(delay=0))
+            adapter = adapter_module.AgentAsyncMQTTAdapter(
+                "localhost", 1883, "agent_data_topic", forwarder, reconnect_interval=0.01
+            )
+            adapter.aiomqtt = SimpleNamespace(Client=FakeClient, MqttError=aiomqtt.MqttError)
+
+            async def on_message(payload):
+                received.append(payload)
+                if len(received) == 3:
+                    stop.set()
+
+            adapter.on_message = on_message
+            await asyncio.wait_for(adapter.run(stop), 5)
+            return adapter
+
+        adapter = asyncio.run(scenario())
+        assert received == [b"1", b"2", b"3"]
+        assert len(connections) == 3
+        assert adapter.reconnects == 2
+
+    def test_other_errors_end_the_run(self, service_import, forwarder_module):
+        pytest.importorskip("aiomqtt")
+        adapter_module = service_import("edge", "app.adapters.agent_async_mqtt_adapter")
+
+        async def scenario():
+            forwarder = forwarder_module.AsyncHubForwarder(_SlowGateway(delay=0))
+            adapter = adapter_module.AgentAsyncMQTTAdapter("localhost", 1883, "agent_data_topic", forwarder)
+
+            async def receive(stop):
+                raise RuntimeError("bug")
+
+            adapter.receive = receive
+            await adapter.run(asyncio.Event())
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(scenario())
+
+    def test_full_queue_pauses_instead_of_dropping(self, service_import):
+        adapter_module = service_import("edge", "app.adapters.agent_async_mqtt_adapter")
+        calls = []
+
+        async def scenario():
+            queue = adapter_module.FlowControlQueue(4, lambda: calls.append("pause"), lambda: calls.append("resume"))
+            # aiomqtt puts every received message with put_nowait
+            for i in range(6):
+                queue.put_nowait(i)
+            assert calls == ["pause"]
+            received = [await queue.get() for _ in range(6)]
+            return received
+
+        assert asyncio.run(scenario()) == list(range(6))
+        assert calls == ["pause", "resume"]
+
+    def test_pause_stops_reading_the_broker_socket(self, service_import):
+        pytest.importorskip("aiomqtt")
+        adapter_module = service_import("edge", "app.adapters.agent_async_mqtt_adapter")
+        reads = []
+
+        async def scenario():
+            local, remote = socket.socketpair()
+            loop = asyncio.get_running_loop()
+
+            def loop_read():
+                reads.append(local.recv(100))
+
+            client = SimpleNamespace(
+                _client=SimpleNamespace(socket=lambda: local, loop_read=loop_read),
+                _disconnected=loop.create_future(),
+            )
+            adapter = adapter_module.AgentAsyncMQTTAdapter("localhost", 1883, "agent_data_topic", forwarder=None)
+            adapter.resume_reading(client)
+            remote.send(b"a")
+            await asyncio.sleep(0.05)
+            adapter.pause_reading(client)
+            remote.send(b"b")
+            await asyncio.sleep(0.05)
+            assert reads == [b"a"]
+            adapter.resume_reading(client)
+            await asyncio.sleep(0.05)
+            loop.remove_reader(local.fileno())
+            local.close()
+            remote.close()
+            return adapter.pauses
+
+        assert asyncio.run(scenario()) == 1
+        assert reads == [b"a", b"b"]
+
+
+@pytest.fixture
+def processed(service_import, agent_data_dict):
+    entities = service_import("edge", "app.entities.processed_agent_data")
+    return entities.ProcessedAgentData(
+        road_state="Even",
+        rain_state="Clear",
+        traffic_light_state="Stop",
+        air_quality_state="Good",
+        agent_data=dict(agent_data_dict, timestamp=datetime(2024, 1, 1)),
+    )
+
+
+class TestAsyncHubHttpAdapter:
+
+    def test_posts_batches_through_httpx(self, service_import, processed):
+        httpx = pytest.importorskip("httpx")
+        adapter_module = service_import("edge", "app.adapters.hub_async_http_adapter")
+        received = []
+
+        def handler(request):
+            received.append((request.url.path, json.loads(request.content)))
+            return httpx.Response(200, json={})
+
+        async def scenario():
+            adapter = adapter_module.AsyncHubHttpAdapter("http://hub")
+            adapter.client = httpx.AsyncClient(base_url="http://hub", transport=httpx.MockTransport(handler))
+            assert await adapter.save_batch([processed, processed])
+            assert await adapter.save_data(processed)
+            await adapter.close()
+
+        asyncio.run(scenario())
+        assert [path for path, _ in received] == ["/processed_agent_data/batch", "/processed_agent_data"]
+        assert len(received[0][1]) == 2
+
+    def test_transport_error_returns_false(self, service_import, processed):
+        httpx = pytest.importorskip("httpx")
+        adapter_module = service_import("edge", "app.adapters.hub_async_http_adapter")
+
+        def handler(request):
+            raise httpx.ConnectError("refused")
+
+        async def scenario():
+            adapter = adapter_module.AsyncHubHttpAdapter("http://hub")
+            adapter.client = httpx.AsyncClient(base_url="http://hub", transport=httpx.MockTransport(handler))
+            result = await adapter.save_batch([processed])
+            await adapter.close()
+            return result
+
+        assert asyncio.run(scenario()) is False
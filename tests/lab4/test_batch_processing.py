@@ -0,0 +1,101 @@
+"""
+Tests for the batched, NumPy based classification path
+(process_agent_data_batch in edge/app/usecases/data_processing.py).
+"""
+
+import random
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pydantic")
+
+
+@pytest.fixture
+def data_processing(service_import):
+    module = service_import("edge", "app.usecases.data_processing")
+    module.road_state_detectors.clear()
+    return module
+
+
+@pytest.fixture
+def make_agent_data(data_processing, service_import):
+    agent_data = service_import("edge", "app.entities.agent_data")
+
+    def make(user_id=1, z=16500.0, intensity=0.0, state="green", duration=30, pm25=10.0):
+        return agent_data.AgentData(
+            user_id=user_id,
+            accelerometer={"x": 0, "y": 0, "z": z},
+            gps={"latitude": 50.45, "longitude": 30.52},
+            rain={"intensity": intensity},
+            traffic_light={"state": state, "duration": duration,
+                           "gps": {"latitude": 50.45, "longitude": 30.52}},
+            air_quality={"pm25": pm25, "pm10": pm25 * 1.5, "co2": 420.0},
+            temperature=21.5,
+            timestamp=datetime(2024, 1, 1),
+        )
+
+    return make
+
+
+def random_batch(make_agent_data, seed, size=300):
+    rng = random.Random(seed)
+    return [
+        make_agent_data(
+            user_id=rng.randint(1, 5),
+            z=rng.uniform(10000, 20000),
+            intensity=rng.choice([0, 0.2, 0.4, 0.6, 0.8, 1, -0.1, 1.5, rng.random()]),
+            state=rng.choice(["red", "yellow", "green", "blinking"]),
+            duration=rng.randint(0, 30),
+            pm25=rng.choice([12, 35.4, 55.4, 150.4, 250.4, rng.uniform(0, 400)]),
+        )
+        for _ in range(size)
+    ]
+
+
+class TestProcessAgentDataBatch:
+
+    @pytest.mark.parametrize("seed", range(3))
+    def test_matches_per_message_processing(self, data_processing, make_agent_data, seed):
+        batch = random_batch(make_agent_data, seed)
+        processed = data_processing.process_agent_data_batch(batch)
+        data_processing.road_state_detectors.clear()
+        expected = [data_processing.process_agent_data(data) for data in batch]
+        assert [p.model_dump() for p in processed] == [e.model_dump() for e in expected]
+
+    def test_empty_batch(self, data_processing):
+        assert data_processing.process_agent_data_batch([]) == []
+
+    def test_results_are_plain_strings(self, data_processing, make_agent_data):
+        processed = data_processing.process_agent_data_batch([make_agent_data(), make_agent_data()])
+        assert all(type(p.rain_state) is str for p in processed)
+        assert processed[0].model_dump_json() == data_processing.ProcessedAgentData(
+            **processed[0].model_dump()).model_dump_json()
+
+    @pytest.mark.parametrize("intensity, expected", [
+        (0, "Clear"),
+        (0.2, "Drizzle"),
+        (0.21, "Sprinkle"),
+        (1, "Downpour"),
+        (1.01, "Invalid intensity"),
+        (-0.5, "Invalid intensity"),
+        (float("nan"), "Invalid intensity"),
+    ])
+    def test_rain_bounds(self, data_processing, intensity, expected):
+        assert data_processing.classify_rain(np.array([intensity])).tolist() == [expected]
+
+    @pytest.mark.parametrize("pm25, expected", [
+        (12, "Good"),
+        (12.1, "Moderate"),
+        (250.4, "Very Unhealthy"),
+        (250.5, "Hazardous"),
+    ])
+    def test_air_quality_bounds(self, data_processing, pm25, expected):
+        assert data_processing.classify_air_quality(np.array([pm25])).tolist() == [expected]
+
+    def test_road_state_follows_each_user(self, data_processing, make_agent_data):
+        batch = [make_agent_data(user_id=u, z=z) for u, z in
+                 [(1, 16500), (2, 9000), (1, 16500), (2, 9000), (1, 20000)]]
+        states = [p.road_state for p in data_processing.process_agent_data_batch(batch)]
+        assert states == ["Not enough data", "Not enough data", "Even", "Even", "Speeding bump"]
@@ -0,0 +1,149 @@
+"""
+Tests for batched agent publishing (agent/src/batch_publisher.py) and the
+batch-aware edge AgentMQTTAdapter.on_message.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+
+class _RecordingClient:
+
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, topic, msg):
+        self.messages.append(msg)
+        return (0, len(self.messages))
+
+
+@pytest.fixture
+def agent_modules(service_import):
+    batch_publisher = service_import("agent", "batch_publisher")
+    serializer = service_import("agent", "serializer")
+    return batch_publisher, serializer
+
+
+class TestBatchPublisher:
+
+    def test_single_reading_mode_publishes_plain_messages(self, agent_modules):
+        batch_publisher, serializer = agent_modules
+        client = _RecordingClient()
+        publisher = batch_publisher.BatchPublisher(client, "agent", serializer.TemplateSerializer())
+        assert publisher.add('{"a": 1}') is not None
+        assert client.messages == ['{"a": 1}']
+
+    def test_batches_by_size(self, agent_modules):
+        batch_publisher, serializer = agent_modules
+        client = _RecordingClient()
+        publisher = batch_publisher.BatchPublisher(
+            client, "agent", serializer.TemplateSerializer(), batch_size=3
+        )
+        results = [publisher.add(json.dumps({"i": i})) for i in range(7)]
+        assert [r is not None for r in results] == [False, False, True] * 2 + [False]
+        assert [json.loads(m) for m in client.messages] == [
+            [{"i": 0}, {"i": 1}, {"i": 2}],
+            [{"i": 3}, {"i": 4}, {"i": 5}],
+        ]
+        publisher.flush()
+        assert json.loads(client.messages[-1]) == [{"i": 6}]
+        assert publisher.last_count == 1
+
+    def test_flushes_when_window_elapses(self, agent_modules, monkeypatch):
+        batch_publisher, serializer = agent_modules
+        now = [100.0]
+        monkeypatch.setattr(batch_publisher.time, "monotonic", lambda: now[0])
+        client = _RecordingClient()
+        publisher = batch_publisher.BatchPublisher(
+            client, "agent", serializer.TemplateSerializer(), batch_size=100, flush_interval=1.0
+        )
+        publisher.add('{"i": 0}')
+        now[0] += 0.5
+        publisher.add('{"i": 1}')
+        assert client.messages == []
+        now[0] += 0.6
+        publisher.add('{"i": 2}')
+        assert len(json.loads(client.messages[0])) == 3
+
+    def test_timer_flushes_partial_batch_without_new_readings(self, agent_modules):
+        batch_publisher, serializer = agent_modules
+        client = _RecordingClient()
+        flushed = threading.Event()
+        counts = []
+
+        def on_flush(result, count):
+            counts.append(count)
+            flushed.set()
+
+        publisher = batch_publisher.BatchPublisher(
+            client, "agent", serializer.TemplateSerializer(), batch_size=100, flush_interval=0.05, on_flush=on_flush
+        )
+        publisher.add('{"i": 0}')
+        publisher.add('{"i": 1}')
+        assert flushed.wait(2)
+        assert [json.loads(m) for m in client.messages] == [[{"i": 0}, {"i": 1}]]
+        assert counts == [2]
+
+    def test_size_flush_cancels_the_timer(self, agent_modules):
+        batch_publisher, serializer = agent_modules
+        client = _RecordingClient()
+        publisher = batch_publisher.BatchPublisher(
+            client, "agent", serializer.TemplateSerializer(), batch_size=2, flush_interval=0.05
+        )
+        publisher.add('{"i": 0}')
+        publisher.add('{"i": 1}')
+        time.sleep(0.15)
+        assert len(client.messages) == 1
+
+    def test_batch_size_must_fit_the_binary_header(self, agent_modules):
+        batch_publisher, serializer = agent_modules
+        with pytest.raises(ValueError):
+            batch_publisher.BatchPublisher(_RecordingClient(), "agent", serializer.BinarySerializer(), batch_size=70000)
+        with pytest.raises(ValueError):
+            batch_publisher.BatchPublisher(_RecordingClient(), "agent", serializer.TemplateSerializer(), batch_size=0)
+        batch_publisher.BatchPublisher(_RecordingClient(), "agent", serializer.BinarySerializer(), batch_size=0xFFFF)
+        batch_publisher.BatchPublisher(_RecordingClient(), "agent", serializer.TemplateSerializer(), batch_size=70000)
+
+    def test_batch_envelope_matches_json_dumps(self, agent_modules):
+        _, serializer = agent_modules
+        items = [{"a": 1.5, "b": "x"}, {"a": 2.0, "b": "y"}]
+        batch = serializer.TemplateSerializer().dumps_batch([json.dumps(i) for i in items])
+        assert batch == json.dumps(items)
+
+
+@pytest.fixture
+def edge_adapter(service_import):
+    module = service_import("edge", "app.adapters.agent_mqtt_adapter")
+    hub_gateway = Mock()
+    hub_gateway.save_data.return_value = True
+    return module.AgentMQTTAdapter("localhost", 1883, "agent_data_topic", hub_gateway), hub_gateway
+
+
+def _agent_json(agent_data_dict, user_id):
+    return json.dumps(dict(agent_data_dict, user_id=user_id))
+
+
+class TestEdgeBatchedPayloads:
+
+    def test_single_payload(self, edge_adapter, agent_data_dict):
+        adapter, hub_gateway = edge_adapter
+        adapter.on_message(None, None, Mock(payload=_agent_json(agent_data_dict, 1).encode()))
+        assert hub_gateway.save_data.call_count == 1
+
+    def test_batched_payload(self, edge_adapter, agent_data_dict):
+        adapter, hub_gateway = edge_adapter
+        payload = "[" + ", ".join(_agent_json(agent_data_dict, i) for i in range(5)) + "]"
+        adapter.on_message(None, None, Mock(payload=payload.encode()))
+        assert hub_gateway.save_data.call_count == 5
+        user_ids = [call.args[0].agent_data.user_id for call in hub_gateway.save_data.call_args_list]
+        assert user_ids == [0, 1, 2, 3, 4]
+
+    def test_invalid_batch_is_not_forwarded(self, edge_adapter, agent_data_dict):
+        adapter, hub_gateway = edge_adapter
+        adapter.on_message(None, None, Mock(payload=b'[{"user_id": 1}]'))
+        hub_gateway.save_data.assert_not_called()
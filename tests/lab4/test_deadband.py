@@ -0,0 +1,109 @@
+"""
+Tests for dead-band / delta compression: the agent DeadbandSerializer
+(agent/src/deadband_filter.py) and the edge AgentDataReconstructor
+(edge/app/usecases/delta_reconstruction.py).
+"""
+
+import json
+from unittest.mock import Mock
+
+import pytest
+
+pytest.importorskip("marshmallow")
+pytest.importorskip("pydantic")
+
+
+@pytest.fixture
+def agent_messages(service_import, agent_csv_files, read_all):
+    """Full and dead-band compressed JSON payloads for the same readings."""
+    deadband_filter = service_import("agent", "deadband_filter")
+    file_datasource = service_import("agent", "file_datasource")
+    readings = read_all(file_datasource.FileDatasource(*agent_csv_files), 60)
+    deadband = deadband_filter.DeadbandSerializer(keyframe_interval=10)
+    full = [deadband.schema.dumps(data) for data in readings]
+    compressed = [deadband.dumps(data) for data in readings]
+    return deadband_filter, full, compressed
+
+
+class TestDeadbandSerializer:
+
+    def test_keyframes_are_full_messages(self, agent_messages):
+        _, full, compressed = agent_messages
+        for i in range(0, 60, 10):
+            assert compressed[i] == full[i]
+
+    def test_deltas_only_carry_changed_sensors(self, agent_messages):
+        _, full, compressed = agent_messages
+        delta = json.loads(compressed[1])
+        assert delta["delta"] is True
+        assert {"user_id", "timestamp"} <= delta.keys()
+        assert len(compressed[1]) < len(full[1])
+
+    def test_compression_saves_bandwidth(self, agent_messages):
+        _, full, compressed = agent_messages
+        assert sum(map(len, compressed)) < sum(map(len, full))
+
+    def test_dead_band_suppresses_small_changes(self, agent_messages):
+        deadband_filter, _, _ = agent_messages
+        serializer = deadband_filter.DeadbandSerializer({"temperature": 0.5})
+        base = {group: {"v": 1.0} for group in deadband_filter.SENSOR_GROUPS}
+        base.update(user_id=1, timestamp="t0", temperature=20.0)
+        serializer.filter(dict(base))
+        small = serializer.filter(dict(base, timestamp="t1", temperature=20.4))
+        large = serializer.filter(dict(base, timestamp="t2", temperature=20.6))
+        assert "temperature" not in small
+        assert large["temperature"] == 20.6
+
+    def test_dead_band_is_measured_from_last_sent_value(self, agent_messages):
+        deadband_filter, _, _ = agent_messages
+        serializer = deadband_filter.DeadbandSerializer({"temperature": 0.5})
+        base = {group: {"v": 1.0} for group in deadband_filter.SENSOR_GROUPS}
+        base.update(user_id=1, timestamp="t0", temperature=20.0)
+        serializer.filter(dict(base))
+        sent = [serializer.filter(dict(base, temperature=20.0 + 0.3 * i)) for i in range(1, 4)]
+        # 20.3 and 20.6 vs the sent 20.0: only the second crosses the dead-band
+        assert ["temperature" in message for message in sent] == [False, True, False]
+
+    def test_users_are_tracked_separately(self, agent_messages):
+        deadband_filter, _, _ = agent_messages
+        serializer = deadband_filter.DeadbandSerializer()
+        base = {group: {"v": 1.0} for group in deadband_filter.SENSOR_GROUPS}
+        base.update(timestamp="t0", temperature=20.0)
+        assert "delta" not in serializer.filter(dict(base, user_id=1))
+        assert "delta" not in serializer.filter(dict(base, user_id=2))
+        assert serializer.filter(dict(base, user_id=1))["delta"] is True
+
+
+@pytest.fixture
+def edge_adapter(agent_messages, service_import):
+    module = service_import("edge", "app.adapters.agent_mqtt_adapter")
+    hub_gateway = Mock()
+    hub_gateway.save_data.return_value = True
+    return module.AgentMQTTAdapter("localhost", 1883, "agent_data_topic", hub_gateway), hub_gateway
+
+
+class TestEdgeReconstruction:
+
+    def _received(self, adapter, hub_gateway, payloads):
+        for payload in payloads:
+            adapter.on_message(None, None, Mock(payload=payload.encode()))
+        return [call.args[0].agent_data for call in hub_gateway.save_data.call_args_list]
+
+    def test_reconstructs_full_records(self, agent_messages, edge_adapter, service_import):
+        deadband_filter, full, compressed = agent_messages
+        adapter, hub_gateway = edge_adapter
+        received = self._received(adapter, hub_gateway, compressed)
+        assert len(received) == 60
+        # Sensors without a dead-band are reproduced exactly
+        decoder = service_import("edge", "app.adapters.agent_payload_decoder")
+        expected = [decoder.decode_agent_payload(p.encode())[0] for p in full]
+        for got, want in zip(received, expected):
+            assert got.accelerometer == want.accelerometer
+            assert got.traffic_light == want.traffic_light
+            assert got.timestamp == want.timestamp
+
+    def test_delta_without_keyframe_is_dropped(self, agent_messages, edge_adapter):
+        _, _, compressed = agent_messages
+        adapter, hub_gateway = edge_adapter
+        received = self._received(adapter, hub_gateway, compressed[1:12])
+        assert len(received) == 2  # the keyframe at index 10 and the delta after it
@@ -0,0 +1,235 @@
+"""
+Tests for the edge windowed aggregation
+(edge/app/usecases/windowed_aggregator.py and
+edge/app/adapters/aggregating_hub_gateway.py).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+class _RecordingHub:
+    """HubGateway stand-in keeping what it was sent."""
+
+    def __init__(self):
+        self.records = []
+        self.summaries = []
+
+    def save_batch(self, batch):
+        self.records.extend(batch)
+        return True
+
+    def save_summaries(self, summaries):
+        self.summaries.extend(summaries)
+        return True
+
+
+@pytest.fixture
+def aggregator_module(service_import):
+    return service_import("edge", "app.usecases.windowed_aggregator")
+
+
+@pytest.fixture
+def processed(service_import, agent_data_dict):
+    entities = service_import("edge", "app.entities.processed_agent_data")
+
+    def make(user_id, seconds, z=16667.0, pm25=10.0, temperature=20.0, road_state="Even"):
+        agent_data = dict(
+            agent_data_dict,
+            user_id=user_id,
+            accelerometer={"x": 0, "y": 0, "z": z},
+            air_quality={"pm25": pm25, "pm10": 0, "co2": 0},
+            temperature=temperature,
+            timestamp=START + timedelta(seconds=seconds),
+        )
+        return entities.ProcessedAgentData(
+            road_state=road_state,
+            rain_state="Clear",
+            traffic_light_state="Stop",
+            air_quality_state="Good",
+            agent_data=agent_data,
+        )
+
+    return make
+
+
+class TestWindowedAggregator:
+
+    def test_summary_statistics(self, aggregator_module, processed):
+        aggregator = aggregator_module.WindowedAggregator(window=10)
+        raw, summaries = aggregator.add([
+            processed(1, 0, z=100, pm25=5, temperature=10),
+            processed(1, 3, z=300, pm25=15, temperature=20, road_state="Pit"),
+            processed(1, 9, z=200, pm25=10, temperature=30),
+        ])
+        assert len(raw) == 3 and summaries == []
+        (summary,) = aggregator.flush()
+        assert summary.user_id == 1
+        assert (summary.window_start, summary.window_end) == (START, START + timedelta(seconds=10))
+        assert summary.count == 3
+        assert (summary.z.min, summary.z.max, summary.z.mean) == (100, 300, 200)
+        assert summary.pm25.mean == 10
+        assert summary.temperature.max == 30
+        assert summary.road_states == {"Even": 2, "Pit": 1}
+
+    def test_next_window_closes_the_previous(self, aggregator_module, processed):
+        aggregator = aggregator_module.WindowedAggregator(window=10)
+        aggregator.add([processed(1, 1), processed(1, 2)])
+        _, summaries = aggregator.add([processed(1, 12)])
+        assert [s.count for s in summaries] == [2]
+        assert summaries[0].window_end == START + timedelta(seconds=10)
+
+    def test_users_have_separate_windows(self, aggregator_module, processed):
+        aggregator = aggregator_module.WindowedAggregator(window=10)
+        aggregator.add([processed(1, 1), processed(2, 2), processed(1, 3)])
+        summaries = sorted(aggregator.flush(), key=lambda s: s.user_id)
+        assert [(s.user_id, s.count) for s in summaries] == [(1, 2), (2, 1)]
+
+    def test_instead_keeps_only_anomalies(self, aggregator_module, processed):
+        aggregator = aggregator_module.WindowedAggregator(window=10, mode="instead")
+        raw, _ = aggregator.add([
+            processed(1, 0),
+            processed(1, 1, road_state="Speeding bump"),
+            processed(1, 2, road_state="Pit"),
+            processed(1, 3),
+        ])
+        assert [r.road_state for r in raw] == ["Speeding bump", "Pit"]
+        assert aggregator.flush()[0].count == 4
+
+    def test_silent_users_expire(self, aggregator_module, processed):
+        aggregator = aggregator_module.WindowedAggregator(window=10)
+        aggregator.add([processed(1, 1), processed(2, 1)])
+        _, summaries = aggregator.add([processed(2, 15)])
+        assert [s.user_id for s in summaries] == [2]
+        _, summaries = aggregator.add([processed(2, 25)])
+        # User 1's window ended at 10, a full window before the newest record
+        assert sorted(s.user_id for s in summaries) == [1, 2]
+        assert list(aggregator.windows) == [2]
+
+    def test_late_records_are_forwarded_raw(self, aggregator_module, processed):
+        aggregator = aggregator_module.WindowedAggregator(window=10, mode="instead")
+        aggregator.add([processed(1, 12)])
+        raw, _ = aggregator.add([processed(1, 5)])
+        assert len(raw) == 1
+        assert aggregator.flush()[0].count == 1
+
+    def test_aware_timestamps(self, aggregator_module, processed):
+        aggregator = aggregator_module.WindowedAggregator(window=60)
+        record = processed(1, 0)
+        record.agent_data.timestamp = datetime(2024, 1, 1, 12, 0, 42, tzinfo=timezone.utc)
+        aggregator.add([record])
+        assert aggregator.flush()[0].window_start == datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+    def test_naive_and_aware_timestamps_mix(self, aggregator_module, processed):
+        aggregator = aggregator_module.WindowedAggregator(window=10)
+        aware = processed(2, 0)
+        # 14:00:05 at UTC+2 is START + 5 s, naive timestamps are UTC
+        aware.agent_data.timestamp = datetime(2024, 1, 1, 14, 0, 5, tzinfo=timezone(timedelta(hours=2)))
+        aggregator.add([processed(1, 1), aware, processed(2, 7)])
+        _, summaries = aggregator.add([processed(1, 25)])
+        assert [(s.user_id, s.count) for s in summaries] == [(1, 1), (2, 2)]
+        assert summaries[1].window_start.utcoffset() == timedelta(hours=2)
+
+    def test_unknown_mode(self, aggregator_module):
+        with pytest.raises(ValueError):
+            aggregator_module.WindowedAggregator(mode="sometimes")
+
+
+class TestAggregatingHubGateway:
+
+    def test_forwards_summaries_and_anomalies(self, service_import, aggregator_module, processed):
+        gateway_module = service_import("edge", "app.adapters.aggregating_hub_gateway")
+        hub = _RecordingHub()
+        gateway = gateway_module.AggregatingHubGateway(
+            hub, aggregator_module.WindowedAggregator(window=10, mode="instead")
+        )
+        batch = [processed(1, second) for second in range(30)]
+        batch[14] = processed(1, 14, road_state="Pit")
+        assert gateway.save_batch(batch)
+        assert gateway.flush()
+        assert [r.road_state for r in hub.records] == ["Pit"]
+        assert [s.count for s in hub.summaries] == [10, 10, 10]
+        assert gateway.metrics() == {"received": 30, "forwarded": 1, "summaries": 3, "open_windows": 0}
+
+    def test_hub_errors_reach_the_caller(self, service_import, aggregator_module, processed):
+        gateway_module = service_import("edge", "app.adapters.aggregating_hub_gateway")
+
+        class BrokenHub(_RecordingHub):
+            def save_summaries(self, summaries):
+                raise ConnectionError("hub down")
+
+        gateway = gateway_module.AggregatingHubGateway(BrokenHub(), aggregator_module.WindowedAggregator(window=10))
+        gateway.save_batch([processed(1, 0)])
+        with pytest.raises(ConnectionError):
+            gateway.flush()
+
+    def test_summaries_are_spooled_while_hub_is_down(self, service_import, aggregator_module, processed, tmp_path):
+        gateway_module = service_import("edge", "app.adapters.aggregating_hub_gateway")
+        spool_module = service_import("edge", "app.adapters.spooling_hub_gateway")
+
+        class OfflineHub(_RecordingHub):
+            online = False
+
+            def save_batch(self, batch):
+                return self.online and super().save_batch(batch)
+
+            def save_summaries(self, summaries):
+                return self.online and super().save_summaries(summaries)
+
+        hub = OfflineHub()
+        spooling = spool_module.SpoolingHubGateway(hub, spool_module.SqliteSpool(str(tmp_path / "spool.db")))
+        gateway = gateway_module.AggregatingHubGateway(
+            spooling, aggregator_module.WindowedAggregator(window=10, mode="instead")
+        )
+        assert gateway.save_batch([processed(1, second) for second in range(20)])
+        assert gateway.flush()
+        assert spooling.metrics()["depth"] == 2
+        hub.online = True
+        while spooling.replay():
+            pass
+        assert [s.count for s in hub.summaries] == [10, 10]
+        spooling.stop()
+
+    def test_mqtt_adapter_publishes_summaries(self, service_import, aggregator_module, processed, monkeypatch):
+        pytest.importorskip("paho")
+        adapter_module = service_import("edge", "app.adapters.hub_mqtt_adapter")
+        published = []
+
+        class Client:
+            def publish(self, topic, msg):
+                published.append((topic, msg))
+                return (0, 1)
+
+        monkeypatch.setattr(adapter_module.HubMqttAdapter, "_connect_mqtt", staticmethod(lambda broker, port: Client()))
+        adapter = adapter_module.HubMqttAdapter("localhost", 1883, "processed_agent_data_topic")
+        aggregator = aggregator_module.WindowedAggregator(window=10)
+        aggregator.add([processed(1, 0), processed(2, 0)])
+        assert adapter.save_summaries(aggregator.flush())
+        ((topic, msg),) = published
+        assert topic == "agent_data_summary_topic"
+        assert b'"user_id":2' in msg
+
+    def test_spooling_gateway_passes_summaries_through(self, service_import, tmp_path):
+        spool_module = service_import("edge", "app.adapters.spooling_hub_gateway")
+        hub = _RecordingHub()
+        spooling = spool_module.SpoolingHubGateway(hub, spool_module.SqliteSpool(str(tmp_path / "spool.db")))
+        assert spooling.save_summaries(["summary"])
+        assert hub.summaries == ["summary"]
+        spooling.stop()
+
+    def test_http_adapter_posts_summaries(self, service_import, aggregator_module, processed):
+        adapter_module = service_import("edge", "app.adapters.hub_http_adapter")
+        aggregator = aggregator_module.WindowedAggregator(window=10)
+        aggregator.add([processed(1, 0, z=1), processed(1, 1, z=3)])
+        posted = []
+        adapter = adapter_module.HubHttpAdapter("http://hub")
+        adapter._post = lambda path, data: posted.append((path, data)) or True
+        assert adapter.save_summaries(aggregator.flush())
+        ((path, data),) = posted
+        assert path == "/agent_data_summary/batch"
+        assert b'"z":{"min":1.0,"max":3.0,"mean":2.0}' in data
@@ -0,0 +1,150 @@
+"""
+Tests for the edge hot-path logging setup (edge/logging_config.py) and
+its use in the processing path.
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+
+@pytest.fixture
+def logging_config(service_import):
+    return service_import("edge", "logging_config")
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    root.handlers = handlers
+    root.setLevel(level)
+
+
+class TestLogSampler:
+
+    def test_lets_every_nth_call_through(self, logging_config):
+        sampler = logging_config.LogSampler(3)
+        assert [sampler() for _ in range(7)] == [True, False, False, True, False, False, True]
+
+    def test_zero_disables(self, logging_config):
+        sampler = logging_config.LogSampler(0)
+        assert not any(sampler() for _ in range(5))
+
+    def test_one_logs_everything(self, logging_config):
+        sampler = logging_config.LogSampler(1)
+        assert all(sampler() for _ in range(5))
+
+
+class TestConfigureLogging:
+
+    def test_records_are_written_by_the_listener(self, logging_config, tmp_path, restore_root_logger):
+        log_file = tmp_path / "edge.log"
+        listener = logging_config.configure_logging("INFO", str(log_file))
+        try:
+            root = logging.getLogger()
+            assert len(root.handlers) == 1 and isinstance(root.handlers[0], QueueHandler)
+            logging.info("value is %s", 42)
+            logging.debug("hidden")
+        finally:
+            listener.stop()
+        content = log_file.read_text()
+        assert "value is 42" in content
+        assert "hidden" not in content
+
+    def test_arguments_are_formatted_on_the_listener_thread(self, logging_config, tmp_path, restore_root_logger):
+        formatted_on = []
+
+        class Expensive:
+            def __repr__(self):
+                formatted_on.append(threading.current_thread())
+                return "Expensive()"
+
+        log_file = tmp_path / "edge.log"
+        listener = logging_config.configure_logging("INFO", str(log_file))
+        try:
+            logging.info("received %r", Expensive())
+        finally:
+            listener.stop()
+        assert "received Expensive()" in log_file.read_text()
+        assert formatted_on and threading.current_thread() not in formatted_on
+
+    def test_file_is_rotated(self, logging_config, tmp_path, restore_root_logger):
+        log_file = tmp_path / "edge.log"
+        listener = logging_config.configure_logging("INFO", str(log_file), max_bytes=500, backup_count=2)
+        try:
+            for i in range(100):
+                logging.info("message number %s", i)
+        finally:
+            listener.stop()
+        assert (tmp_path / "edge.log.1").exists()
+        assert not (tmp_path / "edge.log.3").exists()
+
+
+class _Unformattable:
+    def __str__(self):
+        raise AssertionError("payload was formatted although the log is disabled")
+
+    __repr__ = __str__
+
+
+class TestHotPathLogging:
+
+    def test_disabled_debug_logs_do_not_format_payloads(self, service_import, restore_root_logger):
+        adapter_module = service_import("edge", "app.adapters.hub_http_adapter")
+        logging.getLogger().setLevel(logging.INFO)
+        adapter = adapter_module.HubHttpAdapter("http://hub")
+        adapter._post = lambda path, data: True
+        payload = _Unformattable()
+        payload.model_dump_json = lambda: "{}"
+        assert adapter.save_data(payload)
+
+    def test_processed_data_log_is_sampled(self, service_import, agent_data_dict, caplog):
+        data_processing = service_import("edge", "app.usecases.data_processing")
+        logging_config = service_import("edge", "logging_config")
+        agent_data = service_import("edge", "app.entities.agent_data")
+        data_processing.processed_log_sampler = logging_config.LogSampler(10)
+        record = agent_data.AgentData(**dict(agent_data_dict, timestamp=datetime(2024, 1, 1)))
+        with caplog.at_level(logging.INFO):
+            for _ in range(25):
+                data_processing.process_agent_data(record)
+        assert len([r for r in caplog.records if r.getMessage().startswith("Processed agent data")]) == 3
+
+
+    def _rejected_messages(self, caplog, level, post):
+        caplog.clear()
+        with caplog.at_level(level):
+            assert not post("/processed_agent_data/batch", '{"secret": 1}')
+        return " ".join(r.getMessage() for r in caplog.records)
+
+    def test_rejected_body_is_logged_only_at_debug(self, service_import, caplog):
+        adapter_module = service_import("edge", "app.adapters.hub_http_adapter")
+        adapter = adapter_module.HubHttpAdapter("http://hub")
+        adapter.session.post = lambda url, **kwargs: SimpleNamespace(status_code=422)
+        info = self._rejected_messages(caplog, logging.INFO, adapter._post)
+        assert "13 bytes to /processed_agent_data/batch" in info
+        assert "secret" not in info
+        assert "secret" in self._rejected_messages(caplog, logging.DEBUG, adapter._post)
+
+    def test_async_rejected_body_is_logged_only_at_debug(self, service_import, caplog):
+        httpx = pytest.importorskip("httpx")
+        adapter_module = service_import("edge", "app.adapters.hub_async_http_adapter")
+        adapter = adapter_module.AsyncHubHttpAdapter("http://hub")
+        transport = httpx.MockTransport(lambda request: httpx.Response(422))
+        adapter.client = httpx.AsyncClient(base_url="http://hub", transport=transport)
+
+        def post(path, data):
+            return asyncio.run(adapter._post(path, data))
+
+        info = self._rejected_messages(caplog, logging.INFO, post)
+        assert "13 bytes to /processed_agent_data/batch" in info
+        assert "secret" not in info
+        assert "secret" in self._rejected_messages(caplog, logging.DEBUG, post)
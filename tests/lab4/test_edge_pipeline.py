@@ -0,0 +1,241 @@
+"""
+Tests for the edge worker pipeline: BoundedQueue backpressure policies
+(edge/app/usecases/bounded_queue.py) and ProcessingPipeline / HubForwarder
+(edge/app/usecases/processing_pipeline.py).
+"""
+
+import json
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+
+@pytest.fixture
+def bounded_queue(service_import):
+    return service_import("edge", "app.usecases.bounded_queue")
+
+
+@pytest.fixture
+def pipeline_module(service_import):
+    module = service_import("edge", "app.usecases.processing_pipeline")
+    service_import("edge", "app.usecases.data_processing").road_state_detectors.clear()
+    return module
+
+
+def _payload(agent_data_dict, user_id, z=16500):
+    data = dict(agent_data_dict, user_id=user_id)
+    data["accelerometer"] = dict(data["accelerometer"], z=z)
+    return json.dumps(data).encode()
+
+
+class TestBoundedQueue:
+
+    def test_fifo_with_sequence_numbers(self, bounded_queue):
+        q = bounded_queue.BoundedQueue(10)
+        for item in (b"a", b"b", b"c"):
+            assert q.put(item)
+        assert [q.get(timeout=0) for _ in range(3)] == [(0, b"a"), (1, b"b"), (2, b"c")]
+        assert q.get(timeout=0) is None
+
+    def test_block_policy_times_out_when_full(self, bounded_queue):
+        q = bounded_queue.BoundedQueue(2, "block")
+        assert q.put(b"a") and q.put(b"b")
+        assert not q.put(b"c", timeout=0.01)
+        assert q.metrics()["dropped"] == 1
+
+    def test_block_policy_waits_for_room(self, bounded_queue):
+        q = bounded_queue.BoundedQueue(1, "block")
+        q.put(b"a")
+        threading.Timer(0.05, q.get).start()
+        assert q.put(b"b", timeout=5)
+        assert q.get(timeout=0) == (1, b"b")
+
+    def test_drop_oldest_policy(self, bounded_queue):
+        q = bounded_queue.BoundedQueue(2, "drop_oldest")
+        for item in (b"a", b"b", b"c"):
+            assert q.put(item)
+        assert [q.get(timeout=0)[1] for _ in range(2)] == [b"b", b"c"]
+        assert q.metrics()["dropped"] == 1
+
+    def test_spill_policy_keeps_everything_in_order(self, bounded_queue, tmp_path):
+        q = bounded_queue.BoundedQueue(3, "spill", str(tmp_path / "spill.bin"))
+        items = [bytes([i]) * (i + 1) for i in range(10)]
+        for item in items[:6]:
+            assert q.put(item)
+        assert q.metrics()["spill_depth"] == 3
+        received = [q.get(timeout=0)[1] for _ in range(4)]
+        for item in items[6:]:
+            q.put(item)
+        received += [q.get(timeout=0)[1] for _ in range(6)]
+        assert received == items
+        assert (tmp_path / "spill.bin").stat().st_size == 0
+        q.release()
+        assert not (tmp_path / "spill.bin").exists()
+
+    def test_spill_policy_needs_a_path(self, bounded_queue):
+        with pytest.raises(ValueError):
+            bounded_queue.BoundedQueue(3, "spill")
+
+    def test_unknown_policy(self, bounded_queue):
+        with pytest.raises(ValueError):
+            bounded_queue.BoundedQueue(3, "lossy")
+
+    def test_closed_queue_drains_then_returns_none(self, bounded_queue):
+        q = bounded_queue.BoundedQueue(3)
+        q.put(b"a")
+        q.close()
+        assert not q.put(b"b")
+        assert q.get() == (0, b"a")
+        assert q.get() is None
+
+    def test_metrics(self, bounded_queue):
+        q = bounded_queue.BoundedQueue(5)
+        for item in (b"a", b"b", b"c"):
+            q.put(item)
+        q.get()
+        metrics = q.metrics()
+        assert metrics["depth"] == 2
+        assert metrics["high_watermark"] == 3
+        assert metrics["enqueued"] == 3 and metrics["dequeued"] == 1
+
+
+class TestProcessingPipeline:
+
+    def test_all_messages_reach_the_hub_in_batches(self, pipeline_module, agent_data_dict):
+        hub_gateway = Mock()
+        hub_gateway.save_batch.return_value = True
+        pipeline = pipeline_module.ProcessingPipeline(hub_gateway, workers=4, hub_batch_size=10)
+        pipeline.start()
+        for i in range(40):
+            assert pipeline.submit(_payload(agent_data_dict, i % 4))
+        pipeline.stop()
+        batches = [call.args[0] for call in hub_gateway.save_batch.call_args_list]
+        assert sum(map(len, batches)) == 40
+        assert max(map(len, batches)) <= 10
+        metrics = pipeline.metrics()
+        assert metrics["hub"]["forwarded"] == 40
+        assert metrics["queue"]["dequeued"] == 40
+
+    def test_stateful_steps_see_arrival_order(self, pipeline_module, agent_data_dict):
+        hub_gateway = Mock()
+        hub_gateway.save_batch.return_value = True
+        pipeline = pipeline_module.ProcessingPipeline(hub_gateway, workers=8, hub_batch_size=1000)
+        pipeline.start()
+        values = [round(1000 * 1.05 ** i) for i in range(100)]
+        for z in values:
+            pipeline.submit(_payload(agent_data_dict, 1, z))
+        pipeline.stop()
+        records = [p for call in hub_gateway.save_batch.call_args_list for p in call.args[0]]
+        assert [p.agent_data.accelerometer.z for p in records] == values
+        # z grows by 5% per reading: every reading after the first is a bump
+        assert [p.road_state for p in records[1:]] == ["Speeding bump"] * 99
+
+    def test_results_reach_the_forwarder_in_arrival_order(self, pipeline_module, agent_data_dict):
+        hub_gateway = Mock()
+        hub_gateway.save_batch.return_value = True
+        pipeline = pipeline_module.ProcessingPipeline(hub_gateway, workers=4, hub_batch_size=1000)
+        submit = pipeline.forwarder.submit
+
+        def slow_first_submit(processed_batch):
+            # Without the turn, the next workers would overtake the first one here
+            if processed_batch[0].agent_data.user_id == 0:
+                time.sleep(0.1)
+            submit(processed_batch)
+
+        pipeline.forwarder.submit = slow_first_submit
+        pipeline.start()
+        for i in range(8):
+            pipeline.submit(_payload(agent_data_dict, i))
+        pipeline.stop()
+        records = [p for call in hub_gateway.save_batch.call_args_list for p in call.args[0]]
+        assert [p.agent_data.user_id for p in records] == list(range(8))
+
+    def test_peak_states_land_on_the_peak_readings(self, pipeline_module, service_import, agent_data_dict):
+        data_processing = service_import("edge", "app.usecases.data_processing")
+        anomaly_detection = service_import("edge", "app.usecases.anomaly_detection")
+        factory = data_processing.road_state_detectors.factory
+        data_processing.road_state_detectors.factory = anomaly_detection.PeakRoadStateDetector
+        try:
+            hub_gateway = Mock()
+            hub_gateway.save_batch.return_value = True
+            pipeline = pipeline_module.ProcessingPipeline(hub_gateway, workers=2, hub_batch_size=1000)
+            pipeline.start()
+            values = [16667] * 50 + [16667 + 6000 * (1 - abs(i - 15) / 15) for i in range(31)] + [16667] * 50
+            for z in values:
+                pipeline.submit(_payload(agent_data_dict, 1, round(z)))
+            pipeline.stop()
+        finally:
+            data_processing.road_state_detectors.factory = factory
+        records = [p for call in hub_gateway.save_batch.call_args_list for p in call.args[0]]
+        # The readings held back for the decision are sent when the pipeline stops
+        assert [p.agent_data.accelerometer.z for p in records] == [round(z) for z in values]
+        assert [i for i, p in enumerate(records) if p.road_state != "Even"] == [65]
+
+    def test_invalid_payload_does_not_stall_the_pipeline(self, pipeline_module, agent_data_dict):
+        hub_gateway = Mock()
+        hub_gateway.save_batch.return_value = True
+        pipeline = pipeline_module.ProcessingPipeline(hub_gateway, workers=2)
+        pipeline.start()
+        pipeline.submit(b"not json")
+        pipeline.submit(_payload(agent_data_dict, 1))
+        pipeline.stop()
+        assert pipeline.metrics()["hub"]["forwarded"] == 1
+
+    def test_slow_hub_does_not_block_intake(self, pipeline_module, agent_data_dict):
+        release = threading.Event()
+        hub_gateway = Mock()
+        hub_gateway.save_batch.side_effect = lambda batch: release.wait(5)
+        pipeline = pipeline_module.ProcessingPipeline(hub_gateway, workers=2, hub_batch_size=1)
+        pipeline.start()
+        started = time.monotonic()
+        for i in range(20):
+            pipeline.submit(_payload(agent_data_dict, i))
+        assert time.monotonic() - started < 1
+        release.set()
+        pipeline.stop()
+        assert pipeline.metrics()["hub"]["forwarded"] == 20
+
+    def test_failed_batches_are_counted(self, pipeline_module, agent_data_dict):
+        hub_gateway = Mock()
+        hub_gateway.save_batch.side_effect = ConnectionError("hub down")
+        pipeline = pipeline_module.ProcessingPipeline(hub_gateway, workers=1)
+        pipeline.start()
+        pipeline.submit(_payload(agent_data_dict, 1))
+        pipeline.stop()
+        assert pipeline.metrics()["hub"]["failed"] == 1
+
+    def test_adapter_hands_payload_to_pipeline(self, pipeline_module, service_import, agent_data_dict):
+        adapter_module = service_import("edge", "app.adapters.agent_mqtt_adapter")
+        pipeline = Mock()
+        adapter = adapter_module.AgentMQTTAdapter(
+            "localhost", 1883, "agent_data_topic", Mock(), pipeline=pipeline
+        )
+        payload = _payload(agent_data_dict, 1)
+        adapter.on_message(None, None, Mock(payload=payload))
+        pipeline.submit.assert_called_once_with(payload)
+
+
+class TestHubGatewaySaveBatch:
+
+    def test_default_save_batch_saves_each_record(self, service_import):
+        hub_gateway = service_import("edge", "app.interfaces.hub_gateway")
+
+        class Gateway(hub_gateway.HubGateway):
+            def __init__(self):
+                self.saved = []
+
+            def save_data(self, processed_data):
+                self.saved.append(processed_data)
+                return processed_data != "bad"
+
+            def save_summaries(self, summaries):
+                return True
+
+        gateway = Gateway()
+        assert gateway.save_batch(["a", "b"])
+        assert not gateway.save_batch(["bad", "c"])
+        assert gateway.saved == ["a", "b", "bad", "c"]
@@ -0,0 +1,105 @@
+"""
+Tests for the agent FileDatasource replay modes
+(agent/src/file_datasource.py).
+"""
+
+import pytest
+
+
+@pytest.fixture
+def file_datasource(service_import):
+    return service_import("agent", "file_datasource")
+
+
+class TestStreamingMode:
+
+    def test_streaming_matches_eager(self, file_datasource, agent_csv_files, read_all):
+        eager = read_all(file_datasource.FileDatasource(*agent_csv_files), 50)
+        streaming = read_all(
+            file_datasource.FileDatasource(*agent_csv_files, streaming=True), 50
+        )
+        for a, b in zip(eager, streaming):
+            assert a.accelerometer == b.accelerometer
+            assert a.gps == b.gps
+            assert a.traffic_light == b.traffic_light
+            assert a.air_quality == b.air_quality
+            assert a.temperature == b.temperature
+
+    def test_streaming_does_not_materialize_rows(self, file_datasource, agent_csv_files):
+        datasource = file_datasource.FileDatasource(*agent_csv_files, streaming=True)
+        datasource.startReading()
+        try:
+            assert not isinstance(datasource.agr_data, list)
+        finally:
+            datasource.stopReading()
+
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_short_sensor_files_are_padded(self, file_datasource, short_csv_files, streaming, read_all):
+        datasource = file_datasource.FileDatasource(*short_csv_files, streaming=streaming)
+        first, second, third = read_all(datasource, 3)
+        assert first.rain.intensity == 0.5
+        assert first.temperature == 21.5
+        assert third.accelerometer.z == 9
+        assert third.rain.intensity == 0
+        assert third.traffic_light.state == "red"
+        assert third.air_quality.pm25 == 0.0
+        assert third.temperature is None
+
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_exhausted_datasource_returns_default(self, file_datasource, short_csv_files, streaming, read_all):
+        datasource = file_datasource.FileDatasource(*short_csv_files, streaming=streaming)
+        readings = read_all(datasource, 5)
+        assert readings[3].accelerometer.z == 0
+        assert readings[4].accelerometer.z == 0
+
+
+class TestLoopingMode:
+
+    def test_cycles_forever_without_defaults(self, file_datasource, short_csv_files):
+        datasource = file_datasource.LoopingFileDatasource(*short_csv_files)
+        datasource.startReading()
+        zs = [datasource.read().accelerometer.z for _ in range(7)]
+        assert zs == [3, 6, 9, 3, 6, 9, 3]
+
+    def test_files_are_closed_after_loading(self, file_datasource, short_csv_files):
+        datasource = file_datasource.LoopingFileDatasource(*short_csv_files)
+        datasource.startReading()
+        assert datasource.accel_file.closed
+        assert datasource.air_quality_file.closed
+
+    def test_start_index_offsets_replay(self, file_datasource, short_csv_files):
+        datasource = file_datasource.LoopingFileDatasource(*short_csv_files, start_index=2)
+        datasource.startReading()
+        assert [datasource.read().accelerometer.z for _ in range(3)] == [9, 3, 6]
+
+    def test_fixed_step_timestamps_increase_across_loops(self, file_datasource, short_csv_files):
+        datasource = file_datasource.LoopingFileDatasource(*short_csv_files, timestamp_step=0.5)
+        datasource.startReading()
+        timestamps = [datasource.read().timestamp for _ in range(10)]
+        deltas = {(b - a).total_seconds() for a, b in zip(timestamps, timestamps[1:])}
+        assert deltas == {0.5}
+
+    def test_real_time_timestamps_never_go_backwards(self, file_datasource, short_csv_files):
+        datasource = file_datasource.LoopingFileDatasource(*short_csv_files)
+        datasource.startReading()
+        timestamps = [datasource.read().timestamp for _ in range(10)]
+        assert timestamps == sorted(timestamps)
+
+    def test_rows_round_trip_through_flat_tuples(self, file_datasource, agent_csv_files, read_all):
+        eager = read_all(file_datasource.FileDatasource(*agent_csv_files), 20)
+        for data in eager:
+            row = file_datasource.flatten(data)
+            restored = file_datasource.unflatten(row, data.timestamp, data.user_id)
+            assert restored == data
+
+
+class TestInfiniteRepetitiveRange:
+
+    def test_start_offset_wraps(self, service_import):
+        module = service_import("agent", "utils.infinite_repetitive_range")
+        indices = module.InfiniteRepetitiveRange.infinite_repetitive_range(3, start=4)
+        assert [next(indices) for _ in range(5)] == [1, 2, 0, 1, 2]
+
+    def test_empty_range_is_exhausted(self, service_import):
+        module = service_import("agent", "utils.infinite_repetitive_range")
+        assert list(module.InfiniteRepetitiveRange.infinite_repetitive_range(0)) == []
@@ -0,0 +1,64 @@
+"""
+Tests for the agent fleet simulator (agent/src/fleet.py).
+"""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("marshmallow")
+
+
+class _RecordingClient:
+    """Stand-in for a paho client that records published messages."""
+
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, topic, msg):
+        self.messages.append((topic, msg))
+        return (0, len(self.messages))
+
+
+@pytest.fixture
+def fleet(service_import):
+    return service_import("agent", "fleet")
+
+
+@pytest.fixture
+def table(service_import, short_csv_files):
+    sensor_table = service_import("agent", "sensor_table")
+    return sensor_table.SensorTable.from_files(*short_csv_files)
+
+
+class TestFleetSimulator:
+
+    def test_agents_get_distinct_user_ids_and_offsets(self, fleet, table):
+        simulator = fleet.FleetSimulator(
+            _RecordingClient(), "agent", table, size=3, rate=30, user_id_start=100
+        )
+        readings = [agent.read() for agent in simulator.agents]
+        assert [r.user_id for r in readings] == [100, 101, 102]
+        assert [r.accelerometer.z for r in readings] == [3, 6, 9]
+
+    def test_aggregate_rate(self, fleet, table):
+        client = _RecordingClient()
+        simulator = fleet.FleetSimulator(client, "agent", table, size=20, rate=200)
+        asyncio.run(simulator.run(duration=0.5))
+        # ~100 messages expected; allow for scheduler slack on busy CI hosts
+        assert 60 <= len(client.messages) <= 110
+        assert simulator.sent == len(client.messages)
+        user_ids = {json.loads(msg)["user_id"] for _, msg in client.messages}
+        assert user_ids == set(range(1, 21))
+
+    def test_failed_publishes_are_counted(self, fleet, table):
+        class FailingClient(_RecordingClient):
+            def publish(self, topic, msg):
+                return (4, 0)
+
+        simulator = fleet.FleetSimulator(FailingClient(), "agent", table, size=2, rate=100)
+        asyncio.run(simulator.run(duration=0.1))
+        assert simulator.sent == 0
+        assert simulator.failed > 0
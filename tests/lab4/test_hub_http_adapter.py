@@ -0,0 +1,117 @@
+"""
+Tests for the pooled edge HubHttpAdapter
+(edge/app/adapters/hub_http_adapter.py).
+"""
+
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+
+import pytest
+
+pytest.importorskip("pydantic")
+requests = pytest.importorskip("requests")
+
+
+class _HubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append((self.path, json.loads(body), self.client_address))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def hub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _HubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def adapter_module(service_import):
+    return service_import("edge", "app.adapters.hub_http_adapter")
+
+
+@pytest.fixture
+def processed(service_import, agent_data_dict):
+    entities = service_import("edge", "app.entities.processed_agent_data")
+
+    def make(user_id=1):
+        return entities.ProcessedAgentData(
+            road_state="Even",
+            rain_state="Clear",
+            traffic_light_state="Stop",
+            air_quality_state="Good",
+            agent_data=dict(agent_data_dict, user_id=user_id, timestamp=datetime(2024, 1, 1)),
+        )
+
+    return make
+
+
+def _url(server):
+    host, port = server.server_address
+    return f"http://{host}:{port}"
+
+
+class TestHubHttpAdapter:
+
+    def test_single_records_reuse_one_connection(self, adapter_module, hub_server, processed):
+        adapter = adapter_module.HubHttpAdapter(_url(hub_server))
+        for i in range(5):
+            assert adapter.save_data(processed(i))
+        paths = {path for path, _, _ in hub_server.requests}
+        clients = {client for _, _, client in hub_server.requests}
+        assert paths == {"/processed_agent_data"}
+        assert [body["agent_data"]["user_id"] for _, body, _ in hub_server.requests] == list(range(5))
+        assert len(clients) == 1
+
+    def test_save_batch_posts_one_list(self, adapter_module, hub_server, processed):
+        adapter = adapter_module.HubHttpAdapter(_url(hub_server))
+        assert adapter.save_batch([processed(i) for i in range(4)])
+        [(path, body, _)] = hub_server.requests
+        assert path == "/processed_agent_data/batch"
+        assert [item["agent_data"]["user_id"] for item in body] == [0, 1, 2, 3]
+        assert body[0]["agent_data"]["timestamp"] == "2024-01-01T00:00:00"
+
+    def test_save_data_reports_hub_rejection(self, adapter_module, processed):
+        adapter = adapter_module.HubHttpAdapter("http://hub")
+        adapter.session = Mock()
+        adapter.session.post.return_value = Mock(status_code=503)
+        # Nothing is buffered, the caller learns right away that the record was not saved
+        assert not adapter.save_data(processed())
+        assert adapter.session.post.call_count == 1
+
+    def test_uses_configured_timeouts(self, adapter_module, processed):
+        adapter = adapter_module.HubHttpAdapter("http://hub", connect_timeout=1, read_timeout=2)
+        adapter.session = Mock()
+        adapter.session.post.return_value = Mock(status_code=200)
+        adapter.save_data(processed())
+        assert adapter.session.post.call_args.kwargs["timeout"] == (1, 2)
+
+    def test_connection_error_returns_false(self, adapter_module, processed):
+        adapter = adapter_module.HubHttpAdapter("http://hub")
+        adapter.session = Mock()
+        adapter.session.post.side_effect = requests.ConnectionError("refused")
+        assert not adapter.save_data(processed())
+        assert not adapter.save_batch([processed()])
+
+    def test_error_status_returns_false(self, adapter_module, processed):
+        adapter = adapter_module.HubHttpAdapter("http://hub")
+        adapter.session = Mock()
+        adapter.session.post.return_value = Mock(status_code=500)
+        assert not adapter.save_data(processed())
@@ -0,0 +1,463 @@
+"""
+Tests for the hub Redis stream buffer, background flusher, MQTT ingest
+workers and dead letter replay (hub/app/adapters/redis_stream_buffer.py,
+hub/app/usecases/batch_flusher.py, hub/app/usecases/ingest_workers.py,
+hub/app/usecases/dead_letter_replay.py), run against fakeredis.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("fastapi")
+
+
+@pytest.fixture
+def buffer_module(service_import):
+    return service_import("hub", "app.adapters.redis_stream_buffer")
+
+
+@pytest.fixture
+def make_buffer(buffer_module):
+    def make(consumer="hub-1", redis_client=None, min_idle=30):
+        return buffer_module.RedisStreamBuffer(
+            redis_client or fakeredis.FakeAsyncRedis(),
+            stream="test",
+            consumer=consumer,
+            min_idle=min_idle,
+        )
+
+    return make
+
+
+class _Store:
+    """StoreGateway stand-in recording the user ids of every saved batch."""
+
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.batches = []
+
+    def save_data(self, processed_agent_data_batch):
+        self.batches.append([p.agent_data.user_id for p in processed_agent_data_batch])
+        return self.accept
+
+
+@pytest.fixture
+def payload(agent_data_dict):
+    def make(user_id):
+        return json.dumps({
+            "road_state": "Even",
+            "rain_state": "Clear",
+            "traffic_light_state": "Stop",
+            "air_quality_state": "Good",
+            "agent_data": dict(agent_data_dict, user_id=user_id),
+        })
+
+    return make
+
+
+class TestRedisStreamBuffer:
+
+    def test_reads_in_order_and_ack_removes(self, make_buffer):
+        async def scenario():
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            await buffer.ensure_group()
+            await buffer.append(["a", "b", "c"])
+            entries = await buffer.read(2, block=0.01)
+            pending = await buffer.pending()
+            await buffer.ack([entry_id for entry_id, _ in entries])
+            return [payload for _, payload in entries], pending, await buffer.pending(), await buffer.size()
+
+        assert asyncio.run(scenario()) == ([b"a", b"b"], 2, 0, 1)
+
+    def test_consumers_share_entries(self, make_buffer):
+        async def scenario():
+            redis_client = fakeredis.FakeAsyncRedis()
+            first, second = make_buffer("hub-1", redis_client), make_buffer("hub-2", redis_client)
+            await first.ensure_group()
+            await first.append([str(i) for i in range(10)])
+            return await first.read(6), await second.read(6), await first.read(6, block=0.01)
+
+        first, second, rest = asyncio.run(scenario())
+        assert [p for _, p in first + second] == [str(i).encode() for i in range(10)]
+        assert rest == []
+
+    def test_stale_entries_are_claimed(self, make_buffer):
+        async def scenario():
+            redis_client = fakeredis.FakeAsyncRedis()
+            crashed = make_buffer("hub-1", redis_client, min_idle=0)
+            survivor = make_buffer("hub-2", redis_client, min_idle=0)
+            await crashed.ensure_group()
+            await crashed.append(["a", "b"])
+            await crashed.read(2)
+            claimed = await survivor.claim_stale(10)
+            return claimed, survivor.claimed_all()
+
+        claimed, done = asyncio.run(scenario())
+        assert [p for _, p in claimed] == [b"a", b"b"]
+        assert done
+
+    def test_touched_entries_are_not_claimed(self, make_buffer):
+        async def scenario():
+            redis_client = fakeredis.FakeAsyncRedis()
+            busy = make_buffer("hub-1", redis_client, min_idle=0.1)
+            other = make_buffer("hub-2", redis_client, min_idle=0.1)
+            await busy.ensure_group()
+            await busy.append(["a", "b"])
+            entries = await busy.read(2)
+            await asyncio.sleep(0.15)
+            await busy.touch([entries[0][0]])
+            return await other.claim_stale(10)
+
+        assert [p for _, p in asyncio.run(scenario())] == [b"b"]
+
+    def test_requeued_entries_are_read_again(self, make_buffer):
+        async def scenario():
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            await buffer.append(["a", "b", "c"])
+            entries = await buffer.read(2)
+            await buffer.requeue(entries)
+            return await buffer.pending(), [p for _, p in await buffer.read(10)]
+
+        pending, payloads = asyncio.run(scenario())
+        assert pending == 0
+        assert payloads == [b"c", b"a", b"b"]
+
+    def test_requeue_counts_failed_attempts(self, make_buffer):
+        async def scenario():
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            await buffer.append(["a"])
+            attempts = []
+            for _ in range(3):
+                [entry] = await buffer.read(1)
+                attempts.append(buffer.failed_attempts(entry[0]))
+                await buffer.requeue([entry])
+            return attempts, buffer.attempts
+
+        attempts, held = asyncio.run(scenario())
+        assert attempts == [0, 1, 2]
+        assert held == {}
+
+    def test_dead_letters_can_be_inspected_and_replayed(self, make_buffer):
+        async def scenario():
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            await buffer.append(["a", "b", "c"])
+            await buffer.dead_letter(await buffer.read(3), "broken")
+            first = await buffer.dead_letters(2)
+            rest = await buffer.dead_letters(10, start="(" + first[-1]["id"])
+            sizes = await buffer.dead_letter_size(), await buffer.size(), await buffer.pending()
+            replayed = await buffer.replay_dead_letters(2), await buffer.replay_dead_letters(2)
+            entries = await buffer.read(10)
+            return first + rest, sizes, replayed, entries, [buffer.failed_attempts(e[0]) for e in entries]
+
+        dead, sizes, replayed, entries, attempts = asyncio.run(scenario())
+        assert [(d["data"], d["reason"], d["attempts"]) for d in dead] == [
+            ("a", "broken", 1),
+            ("b", "broken", 1),
+            ("c", "broken", 1),
+        ]
+        assert sizes == (3, 0, 0)
+        assert replayed == (2, 1)
+        assert [p for _, p in entries] == [b"a", b"b", b"c"]
+        assert attempts == [0, 0, 0]
+
+
+@pytest.fixture
+def flusher_module(service_import):
+    return service_import("hub", "app.usecases.batch_flusher")
+
+
+class TestBatchFlusher:
+
+    def test_full_batch_is_sent_right_away(self, flusher_module, make_buffer, payload):
+        async def scenario():
+            store = _Store()
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            flusher = flusher_module.BatchFlusher(buffer, store, batch_size=2, max_age=60)
+            flusher.next_claim = float("inf")
+            await buffer.append([payload(1), payload(2), payload(3)])
+            await flusher.flush_once()
+            await flusher.drain()
+            return store.batches, [p for _, p in flusher.batch], await buffer.size()
+
+        batches, collected, left = asyncio.run(scenario())
+        assert batches == [[1, 2]]
+        assert collected == []
+        # Acknowledged entries are removed, the third one was not read yet
+        assert left == 1
+
+    def test_partial_batch_is_sent_after_max_age(self, flusher_module, make_buffer, payload):
+        now = [0.0]
+
+        async def scenario():
+            store = _Store()
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            flusher = flusher_module.BatchFlusher(buffer, store, batch_size=10, max_age=5, clock=lambda: now[0])
+            flusher.next_claim = float("inf")
+            await buffer.append([payload(1)])
+            await flusher.flush_once()
+            now[0] = 3
+            await buffer.append([payload(2)])
+            await flusher.flush_once()
+            assert store.batches == []
+            now[0] = 5
+            await flusher.flush_once()
+            await flusher.drain()
+            return store.batches
+
+        assert asyncio.run(scenario()) == [[1, 2]]
+
+    def test_failed_batch_is_requeued_and_retried(self, flusher_module, make_buffer, payload):
+        async def scenario():
+            store = _Store(accept=False)
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            flusher = flusher_module.BatchFlusher(buffer, store, batch_size=2, max_age=60)
+            flusher.next_claim = float("inf")
+            await buffer.append([payload(1), payload(2), payload(3)])
+            await flusher.flush_once()
+            await flusher.drain()
+            pending = await buffer.pending()
+            store.accept = True
+            await flusher.flush_once()
+            await flusher.drain()
+            return store.batches, pending, await buffer.size(), flusher.metrics()
+
+        batches, pending, left, metrics = asyncio.run(scenario())
+        assert batches == [[1, 2], [3, 1]]
+        assert pending == 0
+        assert left == 1
+        assert metrics["failed_batches"] == 1
+        assert metrics["requeued_records"] == 2
+
+    def test_repeatedly_failing_records_are_dead_lettered(self, flusher_module, make_buffer, payload):
+        async def scenario():
+            store = _Store(accept=False)
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            flusher = flusher_module.BatchFlusher(buffer, store, batch_size=1, max_age=60, max_attempts=3)
+            flusher.next_claim = float("inf")
+            await buffer.append([payload(1)])
+            for _ in range(4):
+                await flusher.flush_once()
+                await flusher.drain()
+            return store.batches, await buffer.size(), await buffer.dead_letters(10), flusher.metrics()
+
+        batches, left, dead, metrics = asyncio.run(scenario())
+        assert batches == [[1], [1], [1]]
+        assert left == 0
+        assert [(d["reason"], d["attempts"]) for d in dead] == [("store write failed 3 times", 3)]
+        assert json.loads(dead[0]["data"])["agent_data"]["user_id"] == 1
+        assert metrics["requeued_records"] == 2
+        assert metrics["dead_lettered_records"] == 1
+
+    def test_invalid_records_are_dead_lettered(self, flusher_module, make_buffer, payload):
+        async def scenario():
+            store = _Store()
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            flusher = flusher_module.BatchFlusher(buffer, store, batch_size=3, max_age=60)
+            flusher.next_claim = float("inf")
+            await buffer.append([payload(1), "not json", payload(2)])
+            await flusher.flush_once()
+            await flusher.drain()
+            return store.batches, await buffer.size(), await buffer.dead_letters(10)
+
+        batches, left, dead = asyncio.run(scenario())
+        assert batches == [[1, 2]]
+        assert left == 0
+        assert [(d["data"], d["reason"]) for d in dead] == [("not json", "invalid record")]
+
+    def test_stale_entries_are_claimed(self, flusher_module, make_buffer, payload):
+        async def scenario():
+            redis_client = fakeredis.FakeAsyncRedis()
+            crashed = make_buffer("hub-1", redis_client, min_idle=0.05)
+            await crashed.ensure_group()
+            await crashed.append([payload(1), payload(2)])
+            await crashed.read(2)
+            store = _Store()
+            flusher = flusher_module.BatchFlusher(make_buffer("hub-2", redis_client, min_idle=0.05), store, batch_size=2)
+            await asyncio.sleep(0.1)
+            await flusher.claim()
+            await flusher.drain()
+            return store.batches, await crashed.pending(), flusher.metrics()
+
+        batches, pending, metrics = asyncio.run(scenario())
+        assert batches == [[1, 2]]
+        assert pending == 0
+        assert metrics["claimed_records"] == 2
+
+    def test_batches_in_flight_are_bounded(self, flusher_module, make_buffer, payload):
+        class SlowStore(_Store):
+            def __init__(self):
+                super().__init__()
+                self.lock = threading.Lock()
+                self.running = self.most_running = 0
+
+            def save_data(self, processed_agent_data_batch):
+                with self.lock:
+                    self.running += 1
+                    self.most_running = max(self.most_running, self.running)
+                time.sleep(0.05)
+                with self.lock:
+                    self.running -= 1
+                return super().save_data(processed_agent_data_batch)
+
+        async def scenario():
+            store = SlowStore()
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            flusher = flusher_module.BatchFlusher(buffer, store, batch_size=1, max_age=60, max_in_flight=3)
+            flusher.next_claim = float("inf")
+            await buffer.append([payload(i) for i in range(9)])
+            for _ in range(9):
+                await flusher.flush_once()
+            await flusher.drain()
+            return store, await buffer.size(), flusher.metrics()
+
+        store, left, metrics = asyncio.run(scenario())
+        assert sorted(user_id for [user_id] in store.batches) == list(range(9))
+        assert store.most_running == 3
+        assert left == 0
+        assert metrics["batches_in_flight"] == 0
+
+    def test_slow_saves_are_not_claimed_by_other_consumers(self, flusher_module, make_buffer, payload):
+        class SlowStore(_Store):
+            def save_data(self, processed_agent_data_batch):
+                # Several times the buffers' min_idle, like a store write with retries
+                time.sleep(0.5)
+                return super().save_data(processed_agent_data_batch)
+
+        async def scenario():
+            redis_client = fakeredis.FakeAsyncRedis()
+            store = SlowStore()
+            saving = flusher_module.BatchFlusher(
+                make_buffer("hub-1", redis_client, min_idle=0.15), store, batch_size=2, claim_interval=60
+            )
+            claiming = flusher_module.BatchFlusher(
+                make_buffer("hub-2", redis_client, min_idle=0.15), store, max_age=0.05, claim_interval=0.05
+            )
+            await saving.buffer.ensure_group()
+            await saving.buffer.append([payload(1), payload(2)])
+            saving.start()
+            await asyncio.sleep(0.05)
+            claiming.start()
+            await asyncio.sleep(0.7)
+            await claiming.stop()
+            await saving.stop()
+            metrics = [flusher.metrics()["claimed_records"] for flusher in (saving, claiming)]
+            return store.batches, await saving.buffer.size(), metrics
+
+        batches, left, claimed = asyncio.run(scenario())
+        assert batches == [[1, 2]]
+        assert left == 0
+        assert claimed == [0, 0]
+
+    def test_heartbeat_must_be_shorter_than_min_idle(self, flusher_module, make_buffer):
+        with pytest.raises(ValueError):
+            flusher_module.BatchFlusher(make_buffer(min_idle=1), _Store(), heartbeat_interval=1)
+
+    def test_background_task_flushes_on_stop(self, flusher_module, make_buffer, payload):
+        async def scenario():
+            store = _Store()
+            buffer = make_buffer()
+            flusher = flusher_module.BatchFlusher(buffer, store, batch_size=3, max_age=0.05)
+            flusher.start()
+            await asyncio.sleep(0.01)
+            await buffer.append([payload(i) for i in range(4)])
+            await asyncio.sleep(0.3)
+            await flusher.stop()
+            return store.batches
+
+        assert asyncio.run(scenario()) == [[0, 1, 2], [3]]
+
+    def test_empty_batches_are_not_saved(self, flusher_module, make_buffer):
+        async def scenario():
+            store = _Store()
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            flusher = flusher_module.BatchFlusher(buffer, store, max_age=0.01)
+            for _ in range(3):
+                await flusher.flush_once()
+            return store.batches
+
+        assert asyncio.run(scenario()) == []
+
+
+class TestIngestWorkerPool:
+
+    def test_messages_from_another_thread_reach_the_stream(self, service_import, make_buffer, payload):
+        workers_module = service_import("hub", "app.usecases.ingest_workers")
+
+        async def scenario():
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            pool = workers_module.IngestWorkerPool(buffer, workers=2, queue_size=4)
+            pool.start()
+            messages = [payload(i).encode() for i in range(20)] + [b"not json"]
+            thread = threading.Thread(target=lambda: [pool.submit_threadsafe(m) for m in messages])
+            thread.start()
+            await asyncio.to_thread(thread.join)
+            await pool.stop()
+            entries = await buffer.read(100)
+            return [json.loads(p)["agent_data"]["user_id"] for _, p in entries], pool.metrics()
+
+        user_ids, metrics = asyncio.run(scenario())
+        assert sorted(user_ids) == list(range(20))
+        assert metrics == {"queued": 0, "appended": 20, "invalid": 1}
+
+
+class TestDeadLetterReplay:
+
+    def test_replays_at_the_given_rate(self, service_import, make_buffer):
+        replay_module = service_import("hub", "app.usecases.dead_letter_replay")
+
+        async def scenario():
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            await buffer.append([str(i) for i in range(25)])
+            await buffer.dead_letter(await buffer.read(25), "broken")
+            sleeps = []
+
+            async def sleep(seconds):
+                sleeps.append(seconds)
+
+            replay = replay_module.DeadLetterReplay(buffer, chunk_size=100, sleep=sleep)
+            replay.start(limit=20, rate=8)
+            await replay.task
+            return sleeps, replay.status(), await buffer.dead_letter_size(), await buffer.size()
+
+        sleeps, status, dead_left, waiting = asyncio.run(scenario())
+        # Chunks of one second's worth of records
+        assert sleeps == [1, 1]
+        assert status == {"running": False, "replayed": 20, "limit": 20, "rate": 8}
+        assert (dead_left, waiting) == (5, 20)
+
+    def test_stops_when_drained_and_refuses_a_second_replay(self, service_import, make_buffer):
+        replay_module = service_import("hub", "app.usecases.dead_letter_replay")
+
+        async def scenario():
+            buffer = make_buffer()
+            await buffer.ensure_group()
+            await buffer.append(["a", "b", "c"])
+            await buffer.dead_letter(await buffer.read(3), "broken")
+            replay = replay_module.DeadLetterReplay(buffer, chunk_size=2)
+            replay.start(rate=1000)
+            with pytest.raises(RuntimeError):
+                replay.start()
+            await replay.task
+            return replay.status(), await buffer.dead_letter_size()
+
+        status, dead_left = asyncio.run(scenario())
+        assert status["replayed"] == 3
+        assert dead_left == 0
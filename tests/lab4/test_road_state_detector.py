@@ -0,0 +1,131 @@
+"""
+Tests for the per-user road state detectors
+(edge/app/usecases/road_state_detector.py).
+"""
+
+import random
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+
+@pytest.fixture
+def detector_module(service_import):
+    return service_import("edge", "app.usecases.road_state_detector")
+
+
+def reference_road_states(values, max_points=5, threshold=0.01):
+    """The original list based implementation, one shared stream."""
+    points, states = [], []
+    for z in values:
+        points.append(z)
+        if len(points) > max_points:
+            points.pop(0)
+        if len(points) < 2:
+            states.append("Not enough data")
+            continue
+        last, prev = points[-1], points[:-1]
+        if all(last > p * (1 + threshold) for p in prev):
+            states.append("Speeding bump")
+        elif all(last < p * (1 - threshold) for p in prev):
+            states.append("Pit")
+        else:
+            states.append("Even")
+    return states
+
+
+class TestRoadStateDetector:
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_matches_original_algorithm(self, detector_module, seed):
+        rng = random.Random(seed)
+        values = [rng.choice([rng.randint(-20000, 20000), rng.randint(16000, 17000)])
+                  for _ in range(500)]
+        detector = detector_module.RoadStateDetector()
+        assert [detector.update(z) for z in values] == reference_road_states(values)
+
+    def test_first_reading_is_not_enough_data(self, detector_module):
+        detector = detector_module.RoadStateDetector()
+        assert detector.update(16500) == "Not enough data"
+        assert detector.update(16500) == "Even"
+
+    def test_bump_and_pit(self, detector_module):
+        detector = detector_module.RoadStateDetector()
+        for z in (16500, 16400, 16600):
+            detector.update(z)
+        assert detector.update(20000) == "Speeding bump"
+        assert detector.update(10000) == "Pit"
+
+    def test_window_forgets_old_readings(self, detector_module):
+        detector = detector_module.RoadStateDetector(window=3)
+        for z in (30000, 100, 100):
+            detector.update(z)
+        # 30000 fell out of the window of the last two readings
+        assert detector.update(200) == "Speeding bump"
+
+
+class TestRoadStateDetectorRegistry:
+
+    def test_users_do_not_share_state(self, detector_module):
+        registry = detector_module.RoadStateDetectorRegistry()
+        assert registry.get(1).update(16500) == "Not enough data"
+        assert registry.get(2).update(30000) == "Not enough data"
+        assert registry.get(1).update(16500) == "Even"
+
+    def test_least_recently_seen_user_is_evicted(self, detector_module):
+        registry = detector_module.RoadStateDetectorRegistry(max_users=2)
+        first = registry.get(1)
+        registry.get(2)
+        registry.get(1)
+        registry.get(3)
+        assert len(registry) == 2
+        assert registry.get(1) is first
+        assert 2 not in registry.detectors
+
+    def test_idle_users_expire(self, detector_module):
+        now = [0.0]
+        registry = detector_module.RoadStateDetectorRegistry(ttl=10, clock=lambda: now[0])
+        first = registry.get(1)
+        now[0] = 5
+        registry.get(2)
+        now[0] = 12
+        registry.get(2)
+        assert 1 not in registry.detectors
+        assert registry.get(1) is not first
+
+
+    def test_evicted_detectors_are_reported(self, detector_module):
+        evicted = []
+        registry = detector_module.RoadStateDetectorRegistry(max_users=1, on_evict=evicted.append)
+        first = registry.get(1)
+        registry.get(2)
+        assert evicted == [first]
+
+
+class TestProcessRoadState:
+
+    def test_interleaved_vehicles(self, service_import):
+        data_processing = service_import("edge", "app.usecases.data_processing")
+        agent_data = service_import("edge", "app.entities.agent_data")
+        data_processing.road_state_detectors.clear()
+
+        def reading(user_id, z):
+            return agent_data.AgentData(
+                user_id=user_id,
+                accelerometer={"x": 0, "y": 0, "z": z},
+                gps={"latitude": 0, "longitude": 0},
+                rain={"intensity": 0},
+                traffic_light={"state": "red", "duration": 0, "gps": {"latitude": 0, "longitude": 0}},
+                air_quality={"pm25": 0, "pm10": 0, "co2": 0},
+                temperature=0,
+                timestamp=datetime(2024, 1, 1),
+            )
+
+        states = []
+        for _ in range(3):
+            states.append(data_processing.process_road_state(reading(1, 16500)))
+            states.append(data_processing.process_road_state(reading(2, 5000)))
+        # Each vehicle only sees its own flat road
+        assert states[2:] == ["Even"] * 4
@@ -0,0 +1,82 @@
+"""
+Tests for the agent deadline scheduler (agent/src/utils/scheduler.py).
+
+A fake clock is injected so the tests are deterministic.
+"""
+
+import pytest
+
+
+class _FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def scheduler_module(service_import):
+    return service_import("agent", "utils.scheduler")
+
+
+def _scheduler(module, period=1.0, policy="catch_up"):
+    fake = _FakeClock()
+    return module.DeadlineScheduler(period, policy, clock=fake.clock, sleep=fake.sleep), fake
+
+
+class TestDeadlineScheduler:
+
+    def test_processing_time_does_not_drift(self, scheduler_module):
+        scheduler, fake = _scheduler(scheduler_module)
+        wake_times = []
+        for _ in range(10):
+            scheduler.wait()
+            wake_times.append(fake.now)
+            fake.now += 0.3  # work done between sends
+        assert wake_times == pytest.approx([float(i) for i in range(1, 11)])
+        assert scheduler.stats.max_lateness == pytest.approx(0.0)
+
+    def test_catch_up_fires_missed_ticks_back_to_back(self, scheduler_module):
+        scheduler, fake = _scheduler(scheduler_module, policy="catch_up")
+        scheduler.wait()
+        fake.now += 3.5  # stall for several periods
+        wake_times = []
+        for _ in range(4):
+            scheduler.wait()
+            wake_times.append(fake.now)
+        assert wake_times == pytest.approx([4.5, 4.5, 4.5, 5.0])
+        assert scheduler.stats.skipped == 0
+
+    def test_skip_drops_missed_ticks(self, scheduler_module):
+        scheduler, fake = _scheduler(scheduler_module, policy="skip")
+        scheduler.wait()
+        fake.now += 3.5
+        wake_times = []
+        for _ in range(3):
+            scheduler.wait()
+            wake_times.append(fake.now)
+        assert wake_times == pytest.approx([4.5, 5.0, 6.0])
+        assert scheduler.stats.skipped == 2
+
+    def test_stats(self, scheduler_module):
+        scheduler, fake = _scheduler(scheduler_module, period=0.5)
+        for lateness in (0.0, 0.1, 0.0, 0.1):
+            fake.now = scheduler.next_deadline + lateness
+            scheduler.wait()
+        stats = scheduler.stats
+        assert stats.ticks == 4
+        assert stats.mean_lateness == pytest.approx(0.05)
+        assert stats.jitter == pytest.approx(0.05)
+        assert stats.max_lateness == pytest.approx(0.1)
+        assert "ticks" in stats.summary(fake.now)
+
+    def test_unknown_policy(self, scheduler_module):
+        with pytest.raises(ValueError):
+            scheduler_module.DeadlineScheduler(1.0, "burst")
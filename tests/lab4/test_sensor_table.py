@@ -0,0 +1,63 @@
+"""
+Tests for the columnar NumPy sensor table (agent/src/sensor_table.py).
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def sensor_table(service_import):
+    return service_import("agent", "sensor_table")
+
+
+@pytest.fixture
+def file_datasource(sensor_table):
+    # Imported by sensor_table from the same agent path
+    import file_datasource
+    return file_datasource
+
+
+class TestSensorTable:
+
+    def test_rows_match_file_datasource(self, sensor_table, file_datasource, agent_csv_files, read_all):
+        table = sensor_table.SensorTable.from_files(*agent_csv_files)
+        eager = read_all(file_datasource.FileDatasource(*agent_csv_files), len(table))
+        for index, data in enumerate(eager):
+            assert table.row(index) == file_datasource.flatten(data)
+
+    def test_padding_matches_file_datasource(self, sensor_table, file_datasource, short_csv_files, read_all):
+        table = sensor_table.SensorTable.from_files(*short_csv_files)
+        eager = read_all(file_datasource.FileDatasource(*short_csv_files), 3)
+        assert len(table) == 3
+        for index, data in enumerate(eager):
+            assert table.row(index) == file_datasource.flatten(data)
+        assert table.row(2)[9] == "red"
+        assert table.row(2)[-1] is None
+
+    def test_table_is_a_single_structured_array(self, sensor_table, agent_csv_files):
+        table = sensor_table.SensorTable.from_files(*agent_csv_files)
+        assert table.rows.dtype == sensor_table.ROW_DTYPE
+        assert table.rows.dtype.itemsize < 128
+
+    def test_aggregated_builds_requested_row(self, sensor_table, agent_csv_files):
+        table = sensor_table.SensorTable.from_files(*agent_csv_files)
+        data = table.aggregated(0, timestamp=None, user_id=42)
+        assert data.user_id == 42
+        assert data.accelerometer.z == int(table.rows["z"][0])
+
+
+class TestColumnarFileDatasource:
+
+    def test_single_pass_then_default(self, sensor_table, short_csv_files):
+        datasource = sensor_table.ColumnarFileDatasource(*short_csv_files)
+        datasource.startReading()
+        zs = [datasource.read().accelerometer.z for _ in range(5)]
+        assert zs == [3, 6, 9, 0, 0]
+
+    def test_loop(self, sensor_table, short_csv_files):
+        datasource = sensor_table.ColumnarFileDatasource(*short_csv_files, loop=True)
+        datasource.startReading()
+        zs = [datasource.read().accelerometer.z for _ in range(5)]
+        assert zs == [3, 6, 9, 3, 6]
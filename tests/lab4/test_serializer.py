@@ -0,0 +1,72 @@
+"""
+Tests for the agent serializer layer (agent/src/serializer.py).
+
+The template serializer must produce byte-identical JSON to the
+marshmallow AggregatedDataSchema path.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("marshmallow")
+
+
+@pytest.fixture
+def serializer(service_import):
+    return service_import("agent", "serializer")
+
+
+@pytest.fixture
+def file_datasource(serializer):
+    import file_datasource
+    return file_datasource
+
+
+def _row(**overrides):
+    row = {
+        "x": -17, "y": 4, "z": 16516,
+        "gps_longitude": 30.524547100067142, "gps_latitude": 50.450386085935094,
+        "empty_count": 35, "parking_longitude": 30.5, "parking_latitude": 50.4,
+        "intensity": 0.25,
+        "state": "green", "duration": 43,
+        "traffic_light_longitude": 30.524547, "traffic_light_latitude": 50.450386,
+        "pm25": 2.0, "pm10": 5.0, "co2": 388.8,
+        "temperature": 25.56,
+    }
+    row.update(overrides)
+    return tuple(row.values())
+
+
+class TestTemplateSerializer:
+
+    def test_identical_to_marshmallow_for_replay_data(self, serializer, agent_csv_files, read_all, file_datasource):
+        marshmallow = serializer.MarshmallowSerializer()
+        template = serializer.TemplateSerializer()
+        for data in read_all(file_datasource.FileDatasource(*agent_csv_files), 200):
+            assert template.dumps(data) == marshmallow.dumps(data)
+
+    def test_identical_for_default_reading(self, serializer, file_datasource):
+        data = file_datasource.AggregatedData.default()
+        assert (serializer.TemplateSerializer().dumps(data)
+                == serializer.MarshmallowSerializer().dumps(data))
+
+    @pytest.mark.parametrize("overrides", [
+        {"temperature": None},
+        {"temperature": float("nan")},
+        {"pm25": float("inf"), "pm10": float("-inf")},
+        {"x": 1.9, "duration": 7.0},
+        {"state": 'réd "quoted"'},
+        {"empty_count": 0, "intensity": 0},
+        {"gps_longitude": 1e-7, "gps_latitude": 1e21},
+    ])
+    def test_identical_for_edge_values(self, serializer, overrides):
+        row = _row(**overrides)
+        for timestamp in (datetime(2024, 1, 15, 10, 30), datetime(2024, 1, 15, tzinfo=timezone.utc)):
+            assert (serializer.TemplateSerializer().dumps_row(row, timestamp, 7)
+                    == serializer.MarshmallowSerializer().dumps_row(row, timestamp, 7))
+
+    def test_create_serializer(self, serializer):
+        assert isinstance(serializer.create_serializer("template"), serializer.TemplateSerializer)
+        with pytest.raises(ValueError):
+            serializer.create_serializer("pickle")
@@ -0,0 +1,280 @@
+"""
+Tests for the durable store-and-forward spool
+(edge/app/adapters/spooling_hub_gateway.py).
+"""
+
+import sqlite3
+import time
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+
+class _FlakyHub:
+    """HubGateway stand-in that can be switched offline."""
+
+    def __init__(self):
+        self.online = True
+        self.batches = []
+        self.summaries = []
+
+    def save_data(self, processed_data):
+        return self.save_batch([processed_data])
+
+    def save_batch(self, batch):
+        if not self.online:
+            return False
+        self.batches.append([p.agent_data.user_id for p in batch])
+        return True
+
+    def save_summaries(self, summaries):
+        if not self.online:
+            return False
+        self.summaries.append([s.user_id for s in summaries])
+        return True
+
+    @property
+    def received(self):
+        return [user_id for batch in self.batches for user_id in batch]
+
+
+@pytest.fixture
+def spool_module(service_import):
+    return service_import("edge", "app.adapters.spooling_hub_gateway")
+
+
+@pytest.fixture
+def processed(service_import, agent_data_dict):
+    entities = service_import("edge", "app.entities.processed_agent_data")
+
+    def make(user_id):
+        return entities.ProcessedAgentData(
+            road_state="Even",
+            rain_state="Clear",
+            traffic_light_state="Stop",
+            air_quality_state="Good",
+            agent_data=dict(agent_data_dict, user_id=user_id, timestamp=datetime(2024, 1, 1)),
+        )
+
+    return make
+
+
+@pytest.fixture
+def summary(service_import):
+    entities = service_import("edge", "app.entities.agent_data_summary")
+
+    def make(user_id):
+        field = entities.FieldSummary(min=0, max=1, mean=0.5)
+        return entities.AgentDataSummary(
+            user_id=user_id,
+            window_start=datetime(2024, 1, 1),
+            window_end=datetime(2024, 1, 1, 0, 0, 10),
+            count=10,
+            z=field,
+            pm25=field,
+            temperature=field,
+            road_states={"Even": 10},
+        )
+
+    return make
+
+
+@pytest.fixture
+def spool_path(tmp_path):
+    return str(tmp_path / "spool.db")
+
+
+class TestSqliteSpool:
+
+    def test_fifo_and_remove(self, spool_module, spool_path):
+        spool = spool_module.SqliteSpool(spool_path)
+        spool.append(["a", "b", "c"])
+        rows = spool.peek(2)
+        assert [payload for _, _, payload in rows] == ["a", "b"]
+        spool.remove_through(rows[-1][0])
+        assert len(spool) == 1
+        assert [payload for _, _, payload in spool.peek(10)] == ["c"]
+
+    def test_evicts_oldest_above_cap(self, spool_module, spool_path):
+        spool = spool_module.SqliteSpool(spool_path, max_records=3)
+        spool.append(["a", "b"])
+        spool.append(["c", "d", "e"])
+        assert len(spool) == 3
+        assert spool.evicted == 2
+        assert [payload for _, _, payload in spool.peek(10)] == ["c", "d", "e"]
+
+    def test_survives_restart(self, spool_module, spool_path):
+        spool = spool_module.SqliteSpool(spool_path)
+        spool.append(["a", "b"])
+        spool.close()
+        reopened = spool_module.SqliteSpool(spool_path)
+        assert len(reopened) == 2
+        assert [payload for _, _, payload in reopened.peek(10)] == ["a", "b"]
+
+    def test_rows_keep_their_kind(self, spool_module, spool_path):
+        spool = spool_module.SqliteSpool(spool_path)
+        spool.append(["a"])
+        spool.append(["b"], spool_module.AGENT_DATA_SUMMARY)
+        assert [kind for _, kind, _ in spool.peek(10)] == [
+            spool_module.PROCESSED_AGENT_DATA, spool_module.AGENT_DATA_SUMMARY
+        ]
+
+    def test_upgrades_spool_without_kinds(self, spool_module, spool_path):
+        connection = sqlite3.connect(spool_path)
+        connection.execute("CREATE TABLE spool (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)")
+        connection.execute("INSERT INTO spool (payload) VALUES ('a')")
+        connection.commit()
+        connection.close()
+        spool = spool_module.SqliteSpool(spool_path)
+        assert spool.peek(10) == [(1, spool_module.PROCESSED_AGENT_DATA, "a")]
+
+
+class TestSpoolingHubGateway:
+
+    def test_passes_through_while_hub_is_up(self, spool_module, spool_path, processed):
+        hub = _FlakyHub()
+        gateway = spool_module.SpoolingHubGateway(hub, spool_module.SqliteSpool(spool_path))
+        assert gateway.save_data(processed(1))
+        assert hub.received == [1]
+        assert gateway.metrics()["depth"] == 0
+
+    def test_spools_and_replays_in_bulk_and_in_order(self, spool_module, spool_path, processed):
+        hub = _FlakyHub()
+        gateway = spool_module.SpoolingHubGateway(
+            hub, spool_module.SqliteSpool(spool_path), replay_batch_size=4
+        )
+        hub.online = False
+        assert gateway.save_batch([processed(i) for i in range(5)])
+        hub.online = True
+        # Spool is not empty yet: new records queue up behind it
+        assert gateway.save_data(processed(5))
+        assert hub.received == []
+        while gateway.replay():
+            pass
+        assert hub.received == list(range(6))
+        assert hub.batches == [[0, 1, 2, 3], [4, 5]]
+        assert gateway.metrics()["replayed"] == 6
+
+    def test_live_records_skip_the_backlog_once_hub_is_back(self, spool_module, spool_path, processed):
+        hub = _FlakyHub()
+        gateway = spool_module.SpoolingHubGateway(
+            hub, spool_module.SqliteSpool(spool_path), replay_batch_size=2
+        )
+        hub.online = False
+        gateway.save_batch([processed(i) for i in range(5)])
+        hub.online = True
+        assert gateway.replay()
+        # The replay reached the hub, new records no longer wait behind the backlog
+        assert gateway.save_data(processed(5))
+        assert hub.batches == [[0, 1], [5]]
+        while gateway.replay():
+            pass
+        assert sorted(hub.received) == list(range(6))
+        assert gateway.metrics()["depth"] == 0
+        # A failed live send puts the gateway back into spooling
+        hub.online = False
+        gateway.save_data(processed(6))
+        hub.online = True
+        gateway.save_data(processed(7))
+        assert gateway.metrics()["depth"] == 2
+
+    def test_summaries_are_spooled_with_the_records(self, spool_module, spool_path, processed, summary):
+        hub = _FlakyHub()
+        gateway = spool_module.SpoolingHubGateway(
+            hub, spool_module.SqliteSpool(spool_path), replay_batch_size=10
+        )
+        hub.online = False
+        assert gateway.save_batch([processed(1), processed(2)])
+        assert gateway.save_summaries([summary(1), summary(2)])
+        assert gateway.save_data(processed(3))
+        assert gateway.metrics()["depth"] == 5
+        hub.online = True
+        # One kind per batch, in spool order
+        assert gateway.replay()
+        assert (hub.batches, hub.summaries) == ([[1, 2]], [])
+        assert gateway.replay()
+        assert (hub.batches, hub.summaries) == ([[1, 2]], [[1, 2]])
+        assert gateway.replay()
+        assert (hub.batches, hub.summaries) == ([[1, 2], [3]], [[1, 2]])
+        assert not gateway.replay()
+        assert gateway.save_summaries([summary(3)])
+        assert hub.summaries == [[1, 2], [3]]
+
+    def test_corrupt_rows_are_quarantined(self, spool_module, spool_path, processed):
+        hub = _FlakyHub()
+        spool = spool_module.SqliteSpool(spool_path)
+        gateway = spool_module.SpoolingHubGateway(hub, spool, replay_batch_size=10)
+        hub.online = False
+        gateway.save_data(processed(1))
+        spool.append(["not json"])
+        gateway.save_data(processed(2))
+        hub.online = True
+        assert gateway.replay()
+        assert hub.received == [1, 2]
+        metrics = gateway.metrics()
+        assert (metrics["depth"], metrics["quarantined"], metrics["replayed"]) == (0, 1, 2)
+        [(payload, error)] = spool.connection.execute("SELECT payload, error FROM quarantine").fetchall()
+        assert payload == "not json" and error
+
+    def test_replay_thread_survives_errors(self, spool_module, spool_path, processed):
+        hub = _FlakyHub()
+        gateway = spool_module.SpoolingHubGateway(
+            hub, spool_module.SqliteSpool(spool_path), retry_interval=0.01
+        )
+        hub.online = False
+        gateway.save_data(processed(1))
+        hub.online = True
+        peek = gateway.spool.peek
+        failures = [RuntimeError("disk I/O error")]
+
+        def flaky_peek(limit):
+            if failures:
+                raise failures.pop()
+            return peek(limit)
+
+        gateway.spool.peek = flaky_peek
+        gateway.start()
+        deadline = time.monotonic() + 5
+        while not hub.received and time.monotonic() < deadline:
+            time.sleep(0.01)
+        gateway.stop()
+        assert hub.received == [1]
+
+    def test_failed_replay_keeps_records(self, spool_module, spool_path, processed):
+        hub = _FlakyHub()
+        gateway = spool_module.SpoolingHubGateway(hub, spool_module.SqliteSpool(spool_path))
+        hub.online = False
+        gateway.save_data(processed(1))
+        assert not gateway.replay()
+        assert gateway.metrics()["depth"] == 1
+
+    def test_exceptions_from_hub_are_spooled(self, spool_module, spool_path, processed):
+        class BrokenHub:
+            def save_batch(self, batch):
+                raise ConnectionError("hub down")
+
+        gateway = spool_module.SpoolingHubGateway(BrokenHub(), spool_module.SqliteSpool(spool_path))
+        assert gateway.save_data(processed(1))
+        assert gateway.metrics()["spooled"] == 1
+
+    def test_background_replay_is_rate_limited(self, spool_module, spool_path, processed):
+        hub = _FlakyHub()
+        gateway = spool_module.SpoolingHubGateway(
+            hub, spool_module.SqliteSpool(spool_path),
+            replay_batch_size=5, replay_rate=100, retry_interval=0.01,
+        )
+        hub.online = False
+        gateway.save_batch([processed(i) for i in range(20)])
+        hub.online = True
+        started = time.monotonic()
+        gateway.start()
+        deadline = started + 5
+        while len(hub.received) < 20 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        elapsed = time.monotonic() - started
+        gateway.stop()
+        assert hub.received == list(range(20))
+        # 4 batches of 5 at 100 records/s: at least three pauses of 50 ms
+        assert elapsed >= 0.15
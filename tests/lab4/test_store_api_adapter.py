@@ -0,0 +1,139 @@
+"""
+Tests for the pooled, retrying hub StoreApiAdapter
+(hub/app/adapters/store_api_adapter.py).
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("requests")
+
+
+class _StoreHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.server.requests.append((self.path, json.loads(body), self.client_address, status))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def store_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StoreHandler)
+    server.requests = []
+    # Status codes of the next responses, 200 once they are used up
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def adapter_module(service_import):
+    return service_import("hub", "app.adapters.store_api_adapter")
+
+
+@pytest.fixture
+def make_adapter(adapter_module, store_server):
+    def make(**kwargs):
+        host, port = store_server.server_address
+        sleeps = []
+        adapter = adapter_module.StoreApiAdapter(f"http://{host}:{port}", sleep=sleeps.append, **kwargs)
+        return adapter, sleeps
+
+    return make
+
+
+@pytest.fixture
+def processed(service_import, agent_data_dict):
+    entities = service_import("hub", "app.entities.processed_agent_data")
+
+    def make(user_id=1):
+        return entities.ProcessedAgentData(
+            road_state="Even",
+            rain_state="Clear",
+            traffic_light_state="Stop",
+            air_quality_state="Good",
+            agent_data=dict(agent_data_dict, user_id=user_id, timestamp=datetime(2024, 1, 1)),
+        )
+
+    return make
+
+
+class TestStoreApiAdapter:
+
+    def test_batch_is_sent_as_one_json_array(self, make_adapter, store_server, processed):
+        adapter, _ = make_adapter()
+        assert adapter.save_data([processed(1), processed(2)])
+        [(path, body, _, _)] = store_server.requests
+        assert path == "/processed_agent_data"
+        assert [record["agent_data"]["user_id"] for record in body] == [1, 2]
+        assert body[0]["agent_data"]["timestamp"] == "2024-01-01T00:00:00"
+
+    def test_empty_batch_is_not_sent(self, make_adapter, store_server):
+        adapter, _ = make_adapter()
+        assert adapter.save_data([])
+        assert store_server.requests == []
+
+    def test_connection_is_kept_alive(self, make_adapter, store_server, processed):
+        adapter, _ = make_adapter()
+        for i in range(5):
+            assert adapter.save_data([processed(i)])
+        assert len({client for _, _, client, _ in store_server.requests}) == 1
+
+    def test_concurrent_batches_share_the_pool(self, make_adapter, store_server, processed):
+        adapter, _ = make_adapter(pool_size=4)
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(lambda i: adapter.save_data([processed(i)]), range(20)))
+        assert all(results)
+        assert len(store_server.requests) == 20
+        assert len({client for _, _, client, _ in store_server.requests}) <= 4
+
+    def test_server_errors_are_retried_with_backoff(self, make_adapter, store_server, processed):
+        store_server.statuses = [503, 500, 429]
+        adapter, sleeps = make_adapter(max_retries=3, backoff=1)
+        assert adapter.save_data([processed()])
+        assert [status for *_, status in store_server.requests] == [503, 500, 429, 200]
+        # 1, 2 and 4 seconds, each shortened by at most half
+        assert len(sleeps) == 3
+        assert all(low <= s <= high for s, low, high in zip(sleeps, [0.5, 1, 2], [1, 2, 4]))
+
+    def test_gives_up_after_max_retries(self, make_adapter, store_server, processed):
+        store_server.statuses = [500] * 5
+        adapter, sleeps = make_adapter(max_retries=2, backoff=1, max_backoff=1.5)
+        assert not adapter.save_data([processed()])
+        assert len(store_server.requests) == 3
+        assert len(sleeps) == 2 and max(sleeps) <= 1.5
+
+    def test_client_errors_are_not_retried(self, make_adapter, store_server, processed):
+        store_server.statuses = [422]
+        adapter, sleeps = make_adapter()
+        assert not adapter.save_data([processed()])
+        assert len(store_server.requests) == 1
+        assert sleeps == []
+
+    def test_unreachable_store_is_retried(self, adapter_module, store_server, processed):
+        host, port = store_server.server_address
+        store_server.shutdown()
+        store_server.server_close()
+        sleeps = []
+        adapter = adapter_module.StoreApiAdapter(f"http://{host}:{port}", max_retries=2, sleep=sleeps.append)
+        assert not adapter.save_data([processed()])
+        assert len(sleeps) == 2
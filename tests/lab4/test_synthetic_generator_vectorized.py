@@ -0,0 +1,98 @@
+"""
+Tests for the vectorized synthetic data generator and its chunked writers
+(agent/src/data/synthetic_generator.py).
+"""
+
+import csv
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def generator(service_import):
+    return service_import("agent_data", "synthetic_generator")
+
+
+class TestVectorizedTrafficLight:
+
+    def test_cycle_and_duration_bounds(self, generator):
+        columns = generator.traffic_light_columns(3000, rng=np.random.default_rng(1))
+        states = columns["state"]
+        assert list(states[:6]) == ["green", "yellow", "red"] * 2
+        for state in ("green", "yellow", "red"):
+            params = generator.TRAFFIC_LIGHT_PARAMS[state]
+            durations = columns["duration"][states == state]
+            assert durations.min() >= params["min"]
+            assert durations.max() <= params["max"]
+            assert abs(durations.mean() - params["mean_duration"]) < 2
+
+    def test_route_binding(self, generator):
+        route_lat, route_lon = generator.load_route_gps()
+        columns = generator.traffic_light_columns(len(route_lat) + 10, rng=np.random.default_rng(1))
+        assert columns["latitude"][0] == round(route_lat[0], 6)
+        assert columns["longitude"][len(route_lat) - 1] == round(route_lon[-1], 6)
+        assert abs(columns["latitude"][-1] - 50.45) < 0.05
+
+    def test_stochastic_chain(self, generator, monkeypatch):
+        transitions = {
+            "green": {"yellow": 0.5, "red": 0.5},
+            "yellow": {"red": 1.0},
+            "red": {"green": 1.0},
+        }
+        monkeypatch.setitem(generator.TRAFFIC_LIGHT_PARAMS, "transitions", transitions)
+        phases = generator.traffic_light_phases(5000, rng=np.random.default_rng(3))
+        states = np.array(generator.TRAFFIC_LIGHT_STATES)[phases]
+        after_green = states[1:][states[:-1] == "green"]
+        assert set(after_green) == {"yellow", "red"}
+        assert set(states[1:][states[:-1] == "yellow"]) == {"red"}
+
+    def test_rows_interface_is_kept(self, generator):
+        rows = generator.generate_traffic_light(5)
+        assert set(rows[0]) == {"state", "duration", "latitude", "longitude"}
+        assert isinstance(rows[0]["duration"], int)
+
+
+class TestVectorizedAirQuality:
+
+    def test_bounds_correlation_and_constraint(self, generator):
+        columns = generator.air_quality_columns(20000, rng=np.random.default_rng(2))
+        params = generator.AIR_QUALITY_PARAMS
+        for name in ("pm25", "co2"):
+            assert columns[name].min() >= params[name]["min"]
+            assert columns[name].max() <= params[name]["max"]
+        assert np.all(columns["pm10"] >= columns["pm25"] * 1.2 - 0.2)
+        assert np.corrcoef(columns["pm25"], columns["co2"])[0, 1] > 0.3
+
+
+class TestChunkedWriters:
+
+    def test_chunked_csv_matches_row_count_and_continues_cycle(self, generator, tmp_path, monkeypatch):
+        monkeypatch.setattr(generator, "Path", lambda _: tmp_path / "data" / "x")
+        (tmp_path / "data").mkdir()
+        rng = np.random.default_rng(5)
+        generator.write_traffic_light_csv("tl.csv", n=1000, chunk_size=64, rng=rng)
+        with open(tmp_path / "data" / "tl.csv") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 1000
+        order = {"green": "yellow", "yellow": "red", "red": "green"}
+        assert all(order[a["state"]] == b["state"] for a, b in zip(rows, rows[1:]))
+
+    def test_chunked_air_quality_csv(self, generator, tmp_path):
+        path = tmp_path / "aq.csv"
+        generator.write_chunks(path, ["pm25", "pm10", "co2"],
+                               generator.air_quality_chunks(250, chunk_size=100), "csv")
+        with open(path) as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 250
+        assert float(rows[0]["pm10"]) >= 5.0
+
+    def test_parquet(self, generator, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "aq.parquet"
+        generator.write_chunks(path, ["pm25", "pm10", "co2"],
+                               generator.air_quality_chunks(250, chunk_size=100), "parquet")
+        table = pq.read_table(path)
+        assert table.num_rows == 250
+        assert pq.ParquetFile(path).num_row_groups == 3
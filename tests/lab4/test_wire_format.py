@@ -0,0 +1,68 @@
+"""
+Tests for the compact binary wire format between the agent
+(agent/src/serializer.py BinarySerializer) and the edge
+(edge/app/adapters/agent_payload_decoder.py).
+"""
+
+import pytest
+
+pytest.importorskip("marshmallow")
+pytest.importorskip("pydantic")
+
+
+@pytest.fixture
+def agent_payloads(service_import, agent_csv_files, read_all):
+    """(json, binary) payload pairs for the first replay readings."""
+    serializer = service_import("agent", "serializer")
+    file_datasource = service_import("agent", "file_datasource")
+    readings = read_all(file_datasource.FileDatasource(*agent_csv_files), 100)
+    json_serializer = serializer.TemplateSerializer()
+    binary_serializer = serializer.BinarySerializer()
+    json_payloads = [json_serializer.dumps(data) for data in readings]
+    binary_payloads = [binary_serializer.dumps(data) for data in readings]
+    return serializer, json_payloads, binary_payloads
+
+
+@pytest.fixture
+def decoder(agent_payloads, service_import):
+    return service_import("edge", "app.adapters.agent_payload_decoder")
+
+
+class TestBinaryWireFormat:
+
+    def test_binary_decodes_to_same_agent_data_as_json(self, agent_payloads, decoder):
+        _, json_payloads, binary_payloads = agent_payloads
+        for json_payload, binary_payload in zip(json_payloads, binary_payloads):
+            assert (decoder.decode_agent_payload(binary_payload)
+                    == decoder.decode_agent_payload(json_payload.encode()))
+
+    def test_binary_batch(self, agent_payloads, decoder):
+        serializer, json_payloads, binary_payloads = agent_payloads
+        batch = serializer.BinarySerializer().dumps_batch(binary_payloads[:10])
+        json_batch = serializer.TemplateSerializer().dumps_batch(json_payloads[:10])
+        assert decoder.decode_agent_payload(batch) == decoder.decode_agent_payload(json_batch.encode())
+
+    def test_payload_is_over_60_percent_smaller(self, agent_payloads):
+        _, json_payloads, binary_payloads = agent_payloads
+        json_size = sum(len(p.encode()) for p in json_payloads)
+        binary_size = sum(len(p) for p in binary_payloads)
+        assert binary_size < 0.4 * json_size
+
+    def test_layouts_match(self, agent_payloads, decoder):
+        serializer, _, _ = agent_payloads
+        assert serializer.BINARY_RECORD.format == decoder.BINARY_RECORD.format
+        assert serializer.BINARY_HEADER.format == decoder.BINARY_HEADER.format
+        assert serializer.TRAFFIC_LIGHT_STATES == decoder.TRAFFIC_LIGHT_STATES
+
+    def test_truncated_payload_is_rejected(self, agent_payloads, decoder):
+        _, _, binary_payloads = agent_payloads
+        with pytest.raises(ValueError):
+            decoder.decode_agent_payload(binary_payloads[0][:-1])
+
+    def test_unknown_state_cannot_be_encoded(self, agent_payloads, service_import):
+        serializer, _, _ = agent_payloads
+        file_datasource = service_import("agent", "file_datasource")
+        data = file_datasource.AggregatedData.default()
+        data.traffic_light.state = "flashing"
+        with pytest.raises(ValueError):
+            serializer.BinarySerializer().dumps(data)